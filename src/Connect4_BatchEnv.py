@@ -0,0 +1,201 @@
+from Connect4_Globals import *
+from Connect4_Utilities import ColumnFullException
+from Connect4_GameLog import GameLogWriter
+import argparse
+
+class BatchEnvironment():
+    """A class that holds N connect 4 games in one array and steps all of
+    them together"""
+
+    # (row step, column step) of the horizontal, vertical and both diagonal
+    # lines, where row 0 is the top row like in Board.get_state
+    DIRECTIONS = ((0, 1), (1, 0), (1, 1), (-1, 1))
+
+    def __init__(self, num_games, num_rows=BOARD_SIZE[0], num_columns=BOARD_SIZE[1]):
+        """
+        Initialize num_games empty boards with num_rows rows and num_columns
+        columns
+        """
+        self.num_games = num_games
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        self.n_in_a_row = 4
+        self.boards = np.zeros((num_games, num_rows, num_columns), dtype=np.int8)
+        self.heights = np.zeros((num_games, num_columns), dtype=np.int8)
+        self.current_player = np.ones(num_games, dtype=np.int8)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.winner = np.zeros(num_games, dtype=np.int8)
+        # the columns played in every game, in order, and the coin type that
+        # moved first
+        self.moves = np.zeros((num_games, num_rows * num_columns), dtype=np.int8)
+        self.num_moves = np.zeros(num_games, dtype=np.int64)
+        self.first_player = np.ones(num_games, dtype=np.int8)
+        self.reset()
+
+    def reset(self):
+        """
+        Empty every board and pick a random coin type to move first in each
+        game
+        """
+        self.boards[:] = 0
+        self.heights[:] = 0
+        self.done[:] = False
+        self.winner[:] = 0
+        self.num_moves[:] = 0
+        self.current_player[:] = np.random.randint(1, 3, size=self.num_games)
+        self.first_player[:] = self.current_player
+
+    def get_legal_moves(self):
+        """
+        Return a boolean array with a row of playable columns for every game,
+        all False for the games that are over
+        """
+        return (self.heights < self.num_rows) & ~self.done[:, None]
+
+    def get_states(self, games):
+        """
+        Return the board states of the given games in the same 2d tuple form
+        as Board.get_state
+        """
+        return [tuple(map(tuple, board)) for board in self.boards[games].tolist()]
+
+    def step(self, actions):
+        """
+        Drop a piece of the player to move in column actions[i] of every game
+        i that is not over yet. Return the reward of the player that moved in
+        each game (1 for a win, 0.5 for a tie and 0 otherwise) and whether
+        each game is over
+        """
+        games = np.flatnonzero(~self.done)
+        cols = np.asarray(actions)[games]
+        pieces = self.current_player[games]
+        heights = self.heights[games, cols]
+        if (heights >= self.num_rows).any():
+            raise ColumnFullException('Column is already filled!')
+
+        self.boards[games, self.num_rows - 1 - heights, cols] = pieces
+        self.heights[games, cols] = heights + 1
+        self.moves[games, self.num_moves[games]] = cols
+        self.num_moves[games] += 1
+        won = self.check_wins(games, pieces)
+        tie = ~won & (self.heights[games] == self.num_rows).all(axis=1)
+
+        rewards = np.zeros(self.num_games)
+        rewards[games[won]] = 1
+        rewards[games[tie]] = 0.5
+        self.winner[games[won]] = pieces[won]
+        self.done[games[won | tie]] = True
+        self.current_player[games] = 3 - pieces
+        return (rewards, self.done.copy())
+
+    def check_wins(self, games, pieces):
+        """
+        Return for each of the given games whether the coin type in pieces
+        has four in a row, checking every line of every board at once
+        """
+        n = self.n_in_a_row
+        coins = self.boards[games] == pieces[:, None, None]
+        won = np.zeros(len(games), dtype=bool)
+        for (dr, dc) in BatchEnvironment.DIRECTIONS:
+            # window of the first slot of every line in this direction
+            r_lo = max(0, -dr * (n - 1))
+            r_hi = self.num_rows - max(0, dr * (n - 1))
+            c_hi = self.num_columns - dc * (n - 1)
+            line = coins[:, r_lo:r_hi, :c_hi]
+            for k in range(1, n):
+                line = line & coins[:, r_lo + k*dr:r_hi + k*dr, k*dc:c_hi + k*dc]
+            won |= line.any(axis=(1, 2))
+        return won
+
+    def get_rewards(self, coin_type):
+        """
+        Return the reward of every game from the point of view of coin_type
+        the same way the tabular learners score a finished game: 1 for a win,
+        -2 for a loss, 0.5 for a tie and 0 while the game is still going
+        """
+        rewards = np.zeros(self.num_games)
+        rewards[self.done & (self.winner == coin_type)] = 1
+        rewards[self.done & (self.winner != coin_type) & (self.winner != 0)] = -2
+        rewards[self.done & (self.winner == 0)] = 0.5
+        return rewards
+
+    def get_moves(self, game):
+        """
+        Return the columns played in a game, in order
+        """
+        return self.moves[game, :self.num_moves[game]].tolist()
+
+def play_batch_games(p1, p2, num_games, batch_size=1024, game_log=None):
+    """
+    Play num_games games between two players with different coin types,
+    batch_size games at a time, and return the coin type of the winner of
+    each game, 0 for a tie. Players choose their moves through choose_actions
+    and the ones with an update method learn from every move they make.
+    Every game is appended to the GameLogWriter game_log if one is given
+    """
+    players = {p1.get_coin_type(): p1, p2.get_coin_type(): p2}
+    winners = []
+    while len(winners) < num_games:
+        env = BatchEnvironment(min(batch_size, num_games - len(winners)))
+        actions = np.zeros(env.num_games, dtype=np.int64)
+        while not env.done.all():
+            legal_moves = env.get_legal_moves()
+            movers = []
+            for (coin_type, player) in players.items():
+                games = np.flatnonzero(~env.done & (env.current_player == coin_type))
+                if len(games) == 0:
+                    continue
+                if hasattr(player, 'update'):
+                    # the states are built once for choosing and learning
+                    states = env.get_states(games)
+                    actions[games] = player.choose_actions(env.boards[games], legal_moves[games], states)
+                    movers.append((player, games, states))
+                else:
+                    actions[games] = player.choose_actions(env.boards[games], legal_moves[games])
+
+            (rewards, done) = env.step(actions)
+            for (player, games, prev_states) in movers:
+                result_states = env.get_states(games)
+                chosen = actions[games].tolist()
+                player_rewards = rewards[games].tolist()
+                legal_rows = legal_moves[games].tolist()
+                for i in range(len(games)):
+                    player.update(prev_states[i], chosen[i], player_rewards[i], result_states[i],
+                                  [a for a, legal in enumerate(legal_rows[i]) if legal])
+        if game_log is not None:
+            for (game, (winner, first_type)) in enumerate(zip(env.winner.tolist(), env.first_player.tolist())):
+                game_log.append(env.get_moves(game), winner, first_type)
+        winners.extend(env.winner.tolist())
+    return winners
+
+def main(argv=None):
+    """
+    Command line entry point that plays N games between two player types on
+    the batch environment and prints the win rates and the time it took
+    """
+    from Connect4_RLPlayers import ComputerPlayer
+    parser = argparse.ArgumentParser(description='Play Connect 4 games in vectorized batches')
+    parser.add_argument('player_type_1', help='qlearner, sarsalearner or random')
+    parser.add_argument('player_type_2', help='qlearner, sarsalearner or random')
+    parser.add_argument('-n', '--games', type=int, default=10000, help='number of games to play')
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--epsilon', type=float, default=0.2)
+    parser.add_argument('--alpha', type=float, default=0.3)
+    parser.add_argument('--gamma', type=float, default=0.9)
+    parser.add_argument('--game-log', default=None, help='append every game to this binary game log')
+    args = parser.parse_args(argv)
+
+    p1 = ComputerPlayer(1, args.player_type_1, args.epsilon, args.alpha, args.gamma).player
+    p2 = ComputerPlayer(2, args.player_type_2, args.epsilon, args.alpha, args.gamma).player
+    start_time = time.perf_counter()
+    game_log = GameLogWriter(args.game_log) if args.game_log is not None else None
+    winners = np.array(play_batch_games(p1, p2, args.games, args.batch_size, game_log))
+    if game_log is not None:
+        game_log.close()
+    duration = time.perf_counter() - start_time
+    print('Player 1 Win Rate: ', np.mean(winners == 1))
+    print('Player 2 Win Rate: ', np.mean(winners == 2))
+    print('Played %d games in %f seconds.' % (args.games, duration))
+
+if __name__ == "__main__":
+    main()
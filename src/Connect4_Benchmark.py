@@ -0,0 +1,289 @@
+from Connect4_Globals import *
+from Connect4_Utilities import Board
+from Connect4_GameLogic import GameLogic
+from Connect4_RLPlayers import ComputerPlayer, MiniMaxPlayer, QLearningPlayer
+from Connect4_Headless import HeadlessMatch
+from Connect4_BatchEnv import play_batch_games
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+PLAYER_TYPES = ('random', 'qlearner', 'sarsalearner', 'minimax', 'montecarlo', 'solver')
+# the player types that choose moves for a whole batch of games
+BATCH_PLAYER_TYPES = ('random', 'qlearner', 'sarsalearner')
+
+def measure(func, number, repeat=5):
+    """
+    Call func number times in a row, repeat times, and return the seconds per
+    call of the fastest round
+    """
+    best = math.inf
+    for r in range(repeat):
+        start = time.perf_counter()
+        for i in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def make_result(group, name, metric, value, unit, better):
+    """
+    Return one benchmark result, where better is 'lower' or 'higher'
+    """
+    return {'group': group, 'name': name, 'metric': metric, 'value': value, 'unit': unit, 'better': better}
+
+def sample_boards(num_boards, num_moves, seed=0):
+    """
+    Return num_boards headless boards, each with num_moves random moves played
+    and the game not over yet, and their game logic
+    """
+    generator = random.Random(seed)
+    boards = []
+    while len(boards) < num_boards:
+        board = Board(BOARD_SIZE[0], BOARD_SIZE[1], headless=True)
+        game_logic = GameLogic(board)
+        piece = 1
+        game_over = False
+        for i in range(num_moves):
+            game_over = board.insert_piece(generator.choice(board.get_available_actions()), piece, game_logic)
+            piece = 3 - piece
+            if game_over:
+                break
+        if not game_over:
+            boards.append((board, game_logic))
+    return boards
+
+def micro_benchmarks(number=10000, repeat=5):
+    """
+    Time the operations of the engine that the players use in their inner
+    loops on a position in the middle of a game
+    """
+    (board, game_logic) = sample_boards(1, 16)[0]
+    piece = board.current_player
+    col = board.get_available_actions()[0]
+    row = board.determine_row_to_insert(col)
+    minimax = MiniMaxPlayer(piece)
+    position = board.copy()
+    position.evaluator = minimax.get_evaluator(position)
+    learner = QLearningPlayer(piece)
+    state = board.get_state()
+    for action in board.get_available_actions():
+        learner.setQ(state, action, 0.5)
+    copies = [board.copy() for i in range(number)]
+
+    def drop_piece():
+        copies.pop().drop_piece(row, col, piece)
+    def make_undo_move():
+        position.make_move(col, piece)
+        position.undo_move()
+    def get_state():
+        board.cached_state = None
+        board.get_state()
+
+    operations = [('Board.drop_piece', drop_piece),
+                  ('Position.make_move+undo_move', make_undo_move),
+                  ('Board.is_winning_move', lambda: board.is_winning_move(piece)),
+                  ('Position.is_last_move_win', board.is_last_move_win),
+                  ('Board.get_available_actions', board.get_available_actions),
+                  ('Board.copy', board.copy),
+                  ('Board.get_state', get_state),
+                  ('GameLogic.check_game_over', game_logic.check_game_over),
+                  ('MiniMaxPlayer.score_position', lambda: minimax.score_position(board, piece)),
+                  ('WindowEvaluator.get_score', lambda: minimax.score_position(position, piece)),
+                  ('TabularLearningPlayer.getQ', lambda: learner.getQ(state, col))]
+    results = []
+    for (name, func) in operations:
+        # drop_piece uses up one copy per call
+        if name == 'Board.drop_piece':
+            seconds = measure(func, number, 1)
+        else:
+            seconds = measure(func, number, repeat)
+        results.append(make_result('micro', name, 'time_per_call', seconds * 1e6, 'us', 'lower'))
+    return results
+
+def make_player(player_type, coin_type, time_budget=0.5, mcts_playouts=2000):
+    """
+    Return a computer player of a type with the search limits of a benchmark:
+    time_budget seconds per move for the solver and montecarlo, which also
+    stops after mcts_playouts playouts. Minimax searches its default depth so
+    that it does the same work in every run
+    """
+    if player_type == 'montecarlo':
+        player = ComputerPlayer(coin_type, player_type)
+        player.player.itermax = mcts_playouts
+        player.player.timeout = time_budget
+        return player
+    if player_type == 'minimax':
+        return ComputerPlayer(coin_type, player_type)
+    return ComputerPlayer(coin_type, player_type, time_budget=time_budget)
+
+def get_work(player):
+    """
+    Return the amount of search work done by a player so far and its unit
+    """
+    if hasattr(player, 'solver'):
+        return (player.solver.nodes, 'nodes')
+    if hasattr(player, 'nodes'):
+        return (player.nodes, 'nodes')
+    if hasattr(player, 'playouts'):
+        return (player.playouts, 'playouts')
+    return (None, None)
+
+def player_benchmarks(player_types=PLAYER_TYPES, num_positions=10, num_moves=8, time_budget=0.5, mcts_playouts=2000):
+    """
+    Time the move choice of every player type on the same sample positions
+    and measure how much search work each does per second
+    """
+    boards = sample_boards(num_positions, num_moves, seed=1)
+    results = []
+    for player_type in player_types:
+        latencies = []
+        work_done = 0
+        unit = None
+        for (board, game_logic) in boards:
+            coin_type = board.current_player
+            computer = make_player(player_type, coin_type, time_budget, mcts_playouts)
+            actions = board.get_available_actions()
+            (work_before, unit) = get_work(computer.player)
+            start = time.perf_counter()
+            computer.choose_action(board.get_state(), actions, board=board, game_logic=game_logic)
+            latencies.append(time.perf_counter() - start)
+            (work_after, unit) = get_work(computer.player)
+            if unit == 'playouts':
+                work_done += work_after
+            elif unit is not None:
+                work_done += work_after - work_before
+        latencies = np.array(latencies)
+        name = 'ComputerPlayer(%s)' % player_type
+        results.append(make_result('player', name, 'latency_mean', float(latencies.mean()) * 1e3, 'ms', 'lower'))
+        results.append(make_result('player', name, 'latency_p50', float(np.percentile(latencies, 50)) * 1e3, 'ms', 'lower'))
+        results.append(make_result('player', name, 'latency_p95', float(np.percentile(latencies, 95)) * 1e3, 'ms', 'lower'))
+        results.append(make_result('player', name, 'latency_max', float(latencies.max()) * 1e3, 'ms', 'lower'))
+        if unit is not None:
+            results.append(make_result('player', name, unit + '_per_second', work_done / latencies.sum(), unit + '/s', 'higher'))
+    return results
+
+def game_benchmarks(pairings, num_games=20, time_budget=0.5, mcts_playouts=2000):
+    """
+    Play num_games headless games for each pairing of player types and
+    measure the games played per second
+    """
+    results = []
+    for (type_1, type_2) in pairings:
+        p1 = make_player(type_1, 1, time_budget, mcts_playouts)
+        p2 = make_player(type_2, 2, time_budget, mcts_playouts)
+        start = time.perf_counter()
+        outcome = HeadlessMatch(p1, p2).run(num_games)
+        duration = time.perf_counter() - start
+        name = '%s vs %s' % (type_1, type_2)
+        results.append(make_result('game', name, 'games_per_second', num_games / duration, 'games/s', 'higher'))
+        results.append(make_result('game', name, 'p1_win_rate', outcome['p1_win_rate'], 'fraction', None))
+    return results
+
+class MoveCounter():
+    """A class that takes the place of a GameLogWriter to count the moves of
+    the games played"""
+
+    def __init__(self):
+        self.num_moves = 0
+
+    def append(self, moves, winner, first_type):
+        self.num_moves += len(moves)
+
+def batch_benchmarks(player_types, num_games=20000, batch_size=1024):
+    """
+    Play num_games games of each player type against the random player on
+    the batch environment, the learners learning from every move, and
+    measure the moves played per second
+    """
+    results = []
+    for player_type in player_types:
+        p1 = ComputerPlayer(1, player_type).player
+        p2 = ComputerPlayer(2, 'random').player
+        counter = MoveCounter()
+        start = time.perf_counter()
+        play_batch_games(p1, p2, num_games, batch_size, counter)
+        duration = time.perf_counter() - start
+        results.append(make_result('batch', '%s vs random' % player_type, 'moves_per_second',
+                                   counter.num_moves / duration, 'moves/s', 'higher'))
+    return results
+
+def get_metadata():
+    """
+    Return where and when the benchmarks were run
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'commit': commit}
+
+def compare_results(results, baseline, threshold=0.1):
+    """
+    Return the results that are worse than the same result in a baseline by
+    more than threshold, as (result, baseline value, relative change)
+    """
+    baseline_values = {(r['group'], r['name'], r['metric']): r['value'] for r in baseline}
+    regressions = []
+    for result in results:
+        old = baseline_values.get((result['group'], result['name'], result['metric']))
+        if old is None or old == 0 or result['better'] is None:
+            continue
+        change = (result['value'] - old) / old
+        if (result['better'] == 'lower' and change > threshold) or (result['better'] == 'higher' and change < -threshold):
+            regressions.append((result, old, change))
+    return regressions
+
+def main(argv=None):
+    """
+    Command line entry point that runs the benchmark suite, prints every
+    result and writes them all as JSON
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the Connect 4 engine and players')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file to write the results to')
+    parser.add_argument('--types', nargs='+', default=list(PLAYER_TYPES), help='player types to benchmark')
+    parser.add_argument('--games', type=int, default=20, help='games per pairing, 0 to skip the game benchmarks')
+    parser.add_argument('--batch-games', type=int, default=20000, help='games per player type on the batch environment, 0 to skip them')
+    parser.add_argument('--positions', type=int, default=10, help='sample positions per player type')
+    parser.add_argument('--time-budget', type=float, default=0.5, help='seconds per move of the searching players')
+    parser.add_argument('--mcts-playouts', type=int, default=2000, help='playouts per move of montecarlo players')
+    parser.add_argument('--number', type=int, default=10000, help='calls per round of each micro benchmark')
+    parser.add_argument('--compare', default=None, help='baseline JSON file to check the results against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change counted as a regression')
+    args = parser.parse_args(argv)
+
+    results = micro_benchmarks(args.number)
+    results += player_benchmarks(args.types, args.positions, time_budget=args.time_budget, mcts_playouts=args.mcts_playouts)
+    if args.games > 0:
+        pairings = [(args.types[i], args.types[j]) for i in range(len(args.types)) for j in range(i, len(args.types))]
+        results += game_benchmarks(pairings, args.games, args.time_budget, args.mcts_playouts)
+    if args.batch_games > 0:
+        batch_types = [player_type for player_type in args.types if player_type in BATCH_PLAYER_TYPES]
+        results += batch_benchmarks(batch_types, args.batch_games)
+
+    for result in results:
+        print('%-8s %-36s %-20s %14.4f %s' % (result['group'], result['name'], result['metric'], result['value'], result['unit']))
+    with open(args.output, 'w') as f:
+        json.dump({'metadata': get_metadata(), 'results': results}, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare_results(results, baseline, args.threshold)
+        for (result, old, change) in regressions:
+            print('REGRESSION %s %s %s: %.4f -> %.4f %s (%+.1f%%)' % (result['group'], result['name'], result['metric'],
+                                                                  old, result['value'], result['unit'], change * 100))
+        if not regressions:
+            print('No regressions against %s' % args.compare)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+from Connect4_Globals import *
+from Connect4_Utilities import Board
+from Connect4_GameLogic import GameLogic
+import argparse
+import itertools
+import mmap
+import os
+import struct
+import tempfile
+
+# File layout of a game log:
+#   header  - GAMELOG_HEADER, padded to GAMELOG_HEADER_SIZE bytes
+#   records - one record_size byte record per game, appended as games end:
+#             the number of moves, a byte of flags with the winner in bits
+#             0-1 and the coin type that moved first minus 1 in bit 2, and
+#             the column of every move packed bits_per_ply bits each from
+#             the lowest bit of the first byte up
+GAMELOG_MAGIC = b'C4GAMES\0'
+GAMELOG_VERSION = 1
+GAMELOG_HEADER = struct.Struct('<8sHBBBB')
+GAMELOG_HEADER_SIZE = 16
+
+def get_record_layout(num_rows, num_columns):
+    """
+    Return the bits per ply, the bytes of packed moves and the NumPy record
+    type of the games of a board size
+    """
+    bits_per_ply = max(1, (num_columns - 1).bit_length())
+    move_bytes = (bits_per_ply * num_rows * num_columns + 7) // 8
+    dtype = np.dtype([('num_moves', np.uint8), ('flags', np.uint8), ('moves', np.uint8, (move_bytes,))])
+    return (bits_per_ply, move_bytes, dtype)
+
+class GameLogWriter():
+    """A class that appends finished games to a game log file"""
+
+    def __init__(self, path, num_rows=BOARD_SIZE[0], num_columns=BOARD_SIZE[1]):
+        """
+        Open the game log at path for appending, writing its header first if
+        the file is new. An existing log must be for the same board size
+        """
+        (self.bits_per_ply, self.move_bytes, dtype) = get_record_layout(num_rows, num_columns)
+        self.record_size = dtype.itemsize
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                (magic, version, rows, columns, bits_per_ply, record_size) = GAMELOG_HEADER.unpack(f.read(GAMELOG_HEADER.size))
+            if magic != GAMELOG_MAGIC or version != GAMELOG_VERSION or (rows, columns) != (num_rows, num_columns):
+                raise ValueError('%s is not a version %d game log of %dx%d boards' % (path, GAMELOG_VERSION, num_rows, num_columns))
+            self.file = open(path, 'ab')
+        else:
+            self.file = open(path, 'wb')
+            header = GAMELOG_HEADER.pack(GAMELOG_MAGIC, GAMELOG_VERSION, num_rows, num_columns, self.bits_per_ply, self.record_size)
+            self.file.write(header.ljust(GAMELOG_HEADER_SIZE, b'\0'))
+        self.path = path
+
+    def append(self, moves, winner, first_type):
+        """
+        Append a game given the columns of its moves in order, the coin type
+        of the winner, 0 for a tie, and the coin type that moved first
+        """
+        packed = 0
+        for (ply, col) in enumerate(moves):
+            packed |= col << (ply * self.bits_per_ply)
+        flags = winner | ((first_type - 1) << 2)
+        self.file.write(bytes((len(moves), flags)) + packed.to_bytes(self.move_bytes, 'little'))
+
+    def append_log(self, path):
+        """
+        Append every game of the game log at path, which must be for the
+        same board size, copying the records as they are. Return the number
+        of games appended
+        """
+        with open(path, 'rb') as f:
+            (magic, version, rows, columns, bits_per_ply, record_size) = GAMELOG_HEADER.unpack(f.read(GAMELOG_HEADER.size))
+            if magic != GAMELOG_MAGIC or version != GAMELOG_VERSION or record_size != self.record_size or bits_per_ply != self.bits_per_ply:
+                raise ValueError('%s is not a version %d game log of the same board size' % (path, GAMELOG_VERSION))
+            f.seek(GAMELOG_HEADER_SIZE)
+            records = f.read()
+        # a record cut short by a writer that has not finished is left out
+        num_games = len(records) // self.record_size
+        self.file.write(records[:num_games * self.record_size])
+        return num_games
+
+    def flush(self):
+        """
+        Write the buffered games to the file
+        """
+        self.file.flush()
+
+    def close(self):
+        """
+        Write the buffered games and close the file
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def create_worker_log(game_log):
+    """
+    Return the path of a new empty file next to the GameLogWriter game_log
+    for a worker process to log its games to, None if game_log is None
+    """
+    if game_log is None:
+        return None
+    (fd, path) = tempfile.mkstemp(suffix='.c4log', dir=os.path.dirname(os.path.abspath(game_log.path)))
+    os.close(fd)
+    return path
+
+def merge_worker_log(game_log, path):
+    """
+    Append the games of a worker log made by create_worker_log to the
+    GameLogWriter game_log and delete the worker log
+    """
+    if path is None:
+        return 0
+    num_games = game_log.append_log(path) if os.path.getsize(path) > 0 else 0
+    os.remove(path)
+    return num_games
+
+class GameLog():
+    """A class that replays a game log straight from a read-only memory map.
+    The records are a NumPy view of the file, so games are decoded in
+    batches without copying the file into memory"""
+
+    def __init__(self, path):
+        """
+        Map the file at path and read its header. A record cut short by a
+        writer that has not finished is left out
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, num_rows, num_columns, bits_per_ply, record_size) = GAMELOG_HEADER.unpack_from(self.mmap)
+        if magic != GAMELOG_MAGIC or version != GAMELOG_VERSION:
+            raise ValueError('%s is not a version %d game log' % (path, GAMELOG_VERSION))
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        (self.bits_per_ply, self.move_bytes, dtype) = get_record_layout(num_rows, num_columns)
+        self.num_games = (len(self.mmap) - GAMELOG_HEADER_SIZE) // record_size
+        self.records = np.frombuffer(self.mmap, dtype=dtype, count=self.num_games, offset=GAMELOG_HEADER_SIZE)
+
+    def __len__(self):
+        return self.num_games
+
+    def decode(self, start=0, stop=None):
+        """
+        Return the games from start up to stop as arrays: the moves, one row
+        per game padded with -1 after its last move, the number of moves,
+        the winners and the coin types that moved first
+        """
+        records = self.records[start:stop]
+        max_plies = self.num_rows * self.num_columns
+        bits = np.unpackbits(records['moves'], axis=1, bitorder='little')[:, :max_plies * self.bits_per_ply]
+        bits = bits.reshape(len(records), max_plies, self.bits_per_ply)
+        moves = np.zeros((len(records), max_plies), dtype=np.uint8)
+        for k in range(self.bits_per_ply):
+            moves |= bits[:, :, k] << k
+        moves = moves.astype(np.int8)
+        num_moves = records['num_moves']
+        moves[np.arange(max_plies) >= num_moves[:, None]] = -1
+        return (moves, num_moves, records['flags'] & 3, (records['flags'] >> 2) + 1)
+
+    def iter_batches(self, batch_size=65536):
+        """
+        Yield the games batch_size at a time, decoded as by decode
+        """
+        for start in range(0, self.num_games, batch_size):
+            yield self.decode(start, start + batch_size)
+
+    def __iter__(self):
+        """
+        Yield the moves, winner and first coin type of every game
+        """
+        for (moves, num_moves, winners, first_types) in self.iter_batches():
+            for (row, n, winner, first_type) in zip(moves.tolist(), num_moves.tolist(), winners.tolist(), first_types.tolist()):
+                yield (row[:n], winner, first_type)
+
+    def get_game(self, index):
+        """
+        Return the moves, winner and first coin type of a game
+        """
+        (moves, num_moves, winners, first_types) = self.decode(index, index + 1)
+        return (moves[0, :num_moves[0]].tolist(), int(winners[0]), int(first_types[0]))
+
+    def iter_boards(self, index):
+        """
+        Yield a headless Board after every move of a game, replayed with
+        insert_piece so that it holds the same state as during the game. The
+        same board is changed in place by every move
+        """
+        (moves, winner, first_type) = self.get_game(index)
+        board = Board(self.num_rows, self.num_columns, headless=True)
+        game_logic = GameLogic(board)
+        piece = first_type
+        for col in moves:
+            board.insert_piece(col, piece, game_logic)
+            piece = 3 - piece
+            yield board
+
+    def get_board(self, index, ply=None):
+        """
+        Return a headless Board of a game after ply moves, after its last
+        move if ply is not given
+        """
+        board = Board(self.num_rows, self.num_columns, headless=True)
+        for board in itertools.islice(self.iter_boards(index), ply):
+            pass
+        return board
+
+    def close(self):
+        """
+        Release the memory map
+        """
+        self.records = None
+        self.mmap.close()
+
+def main(argv=None):
+    """
+    Command line entry point that scans a game log and prints the outcomes
+    and lengths of its games, or the moves and final board of one game
+    """
+    parser = argparse.ArgumentParser(description='Scan a Connect 4 game log')
+    parser.add_argument('path', help='game log file')
+    parser.add_argument('--show', type=int, default=None, help='print the moves and final board of this game')
+    args = parser.parse_args(argv)
+
+    log = GameLog(args.path)
+    if args.show is not None:
+        (moves, winner, first_type) = log.get_game(args.show)
+        print('Game %d: coin type %d moved first, winner %d' % (args.show, first_type, winner))
+        print('Columns: %s' % ' '.join(str(col + 1) for col in moves))
+        for row in log.get_board(args.show).get_state():
+            print(' '.join('.XO'[value] for value in row))
+        return log
+
+    start_time = time.perf_counter()
+    outcomes = np.zeros(3, dtype=np.int64)
+    total_moves = 0
+    for (moves, num_moves, winners, first_types) in log.iter_batches():
+        outcomes += np.bincount(winners, minlength=3)
+        total_moves += int(num_moves.sum())
+    duration = time.perf_counter() - start_time
+    games = max(len(log), 1)
+    print('%d games, %d moves scanned in %f seconds.' % (len(log), total_moves, duration))
+    print('Coin type 1 wins: %f, coin type 2 wins: %f, ties: %f' % (outcomes[1] / games, outcomes[2] / games, outcomes[0] / games))
+    print('Average game length: %f moves' % (total_moves / games))
+    return log
+
+if __name__ == "__main__":
+    main()
@@ -18,32 +18,14 @@ class GameLogic():
         Check whether the game is over which can be because of a tie or one
         of two players have won
         """
-        (last_visited_nodes, player_value) = self.board.get_last_filled_information()
-        representation = self.board.get_representation()        
-        player_won = self.search_win(last_visited_nodes, representation)
+        # the bitboard checks every line through the last piece, including
+        # the ones where it fills a gap
+        player_won = self.board.is_last_move_win()
         if player_won:
-            self.winner_value = player_value
+            self.winner_value = self.board.prev_player
             
         return ( player_won or self.board.check_board_filled() )
            
-    def search_win(self, last_visited_nodes, representation):
-        """
-        Determine whether one of the players have won
-        """
-        for indices in last_visited_nodes:
-            current_node = representation[indices[0]][indices[1]]
-            if ( current_node.top_left_score == GameLogic.WIN_SEQUENCE_LENGTH or 
-                 current_node.top_score == GameLogic.WIN_SEQUENCE_LENGTH or
-                 current_node.top_right_score == GameLogic.WIN_SEQUENCE_LENGTH or
-                 current_node.left_score == GameLogic.WIN_SEQUENCE_LENGTH or
-                 current_node.right_score == GameLogic.WIN_SEQUENCE_LENGTH or
-                 current_node.bottom_left_score == GameLogic.WIN_SEQUENCE_LENGTH or
-                 current_node.bottom_score == GameLogic.WIN_SEQUENCE_LENGTH or
-                 current_node.bottom_right_score == GameLogic.WIN_SEQUENCE_LENGTH ):
-                return True
-            
-        return False
-    
     def determine_winner_name(self):
         """
         Return the winner's name
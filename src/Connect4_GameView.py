@@ -1,8 +1,11 @@
 from Connect4_Globals import *
-from Connect4_Utilities import ColumnFullException, Slot, Board, Coin, SlotTrackerNode
+from Connect4_Utilities import ColumnFullException, Slot, Board, Coin
 from Connect4_Players import Player, HumanPlayer, RandomPlayer
 from Connect4_RLPlayers import ComputerPlayer, QLearningPlayer, SarsaLearningPlayer, MiniMaxPlayer, MonteCarloPlayer
 from Connect4_GameLogic import GameLogic
+from Connect4_Metrics import GameMetrics, plot_metrics
+import os
+import tempfile
 
 class GameView(object):
     """A class that represents the displays in the game"""
@@ -22,6 +25,9 @@ class GameView(object):
         self.font = pygame.font.SysFont('mono', 20, bold=True)
         self.trainedComputer = None
         self.win_list = [0,0]
+        self.game_log = None
+        self.show_plot = True
+        self.ponder = False
           
     def initialize_game_variables(self, game_mode, p1, p2, epsilon, alpha, gamma, exploration_coeff):
         """
@@ -36,24 +42,40 @@ class GameView(object):
         if game_mode == "single":
             self.p1 = p1
             if (self.trainedComputer == None):
-                self.p2 = ComputerPlayer(second_coin_type, "qlearner", epsilon, alpha, gamma) 
+                self.p2 = ComputerPlayer(second_coin_type, "qlearner", epsilon, alpha, gamma, ponder=self.ponder) 
                 self.trainedComputer = self.p2
             else:
                 self.trainedComputer.set_coin_type(second_coin_type)
+                self.trainedComputer.set_ponder(self.ponder)
                 self.p2 = self.trainedComputer
         elif game_mode == "two_player":
             self.p1 = p1
             self.p2 = p2
         else:
+            if self.trainedComputer is not None and self.trainedComputer not in (p1, p2):
+                self.trainedComputer.close()
             self.trainedComputer = None
             self.win_list = [0,0]
             self.p1 = p1
             self.p2 = p2 
             
-    def main_menu(self, PlayerType_1="", PlayerType_2="", iterations=20, epsilon=0.2, alpha=0.3, gamma=0.9, exp_alpha=0, exp_gamma=0, exploration_coeff=1):
+    def main_menu(self, PlayerType_1="", PlayerType_2="", iterations=20, epsilon=0.2, alpha=0.3, gamma=0.9, exploration_coeff=1, metrics_path=None, game_log=None, show_plot=None, ponder=None):
         """
-        Display the main menu screen
+        Display the main menu screen. The metrics of a training session are
+        streamed to metrics_path when it is given, and the games played are
+        appended to a GameLogWriter when one is given, in this and every
+        later session. show_plot turns the plot after training on or off
+        for this and every later session. With ponder, a MonteCarlo or 
+        Minimax computer keeps searching while the human decides on a move
+        in this and every later session; computers training against each 
+        other never ponder since they share one process
         """
+        if game_log is not None:
+            self.game_log = game_log
+        if show_plot is not None:
+            self.show_plot = show_plot
+        if ponder is not None:
+            self.ponder = ponder
         main_menu = True
         play_game = False
         game_mode = ""
@@ -106,29 +128,32 @@ class GameView(object):
             p2 = ComputerPlayer(second_coin_type, PlayerType_2, epsilon, alpha, gamma, exploration_coeff=exploration_coeff)
         
         if not play_game:
-            pygame.quit()
+            self.quit(p1, p2)
             
         elif game_mode == "train":
-            self.run(game_mode, p1, p2, iterations, epsilon, alpha, gamma, exp_alpha, exp_gamma, exploration_coeff=exploration_coeff)
+            self.run(game_mode, p1, p2, iterations, epsilon, alpha, gamma, exploration_coeff=exploration_coeff, metrics_path=metrics_path, game_log=self.game_log, show_plot=self.show_plot)
         
         else:
             iterations = 1
-            self.run(game_mode, p1, p2, iterations, epsilon, alpha, gamma, exploration_coeff=exploration_coeff)
+            self.run(game_mode, p1, p2, iterations, epsilon, alpha, gamma, exploration_coeff=exploration_coeff, game_log=self.game_log)
 
-    def run(self, game_mode, p1=None, p2=None, iterations=1, epsilon=0.2, alpha=0.3, gamma=0.9, exp_alpha=0, exp_gamma=0, exploration_coeff=1):
+    def run(self, game_mode, p1=None, p2=None, iterations=1, epsilon=0.2, alpha=0.3, gamma=0.9, exploration_coeff=1, metrics_path=None, game_log=None, show_plot=True):
         """
-        Main loop in the game
+        Main loop in the game. In trainer mode the outcome and time of every
+        game are streamed to a metrics file at metrics_path, or to a 
+        temporary one, and plotted from it once training is over if 
+        show_plot is set. Without show_plot the metrics file can be plotted
+        in another process with Connect4_Metrics.py. Every game played to 
+        the end is appended to the GameLogWriter game_log if one is given
         """
-        p1_win   = 0
-        p2_win   = 0
-        draw     = 0
-        count    = 0
-        p1_wins  = []
-        p2_wins  = []
-        draws    = []
-        counts   = []
-        game_time = []
-        num_games = iterations
+        sink_path = None
+        if game_mode == "train":
+            if metrics_path is not None:
+                sink_path = metrics_path
+            elif show_plot:
+                (fd, sink_path) = tempfile.mkstemp(suffix='.csv')
+                os.close(fd)
+        metrics = GameMetrics(sink_path)
         
         while (iterations > 0):
             start_time = time.process_time()
@@ -139,6 +164,9 @@ class GameView(object):
             turn_ended = False
             uninitialized = True
             current_type = random.randint(1,2)
+            first_type = current_type
+            self.p1.start_game(self.game_board)
+            self.p2.start_game(self.game_board)
             if game_mode == "single":
                 human_turn = (self.p1.get_coin_type() == current_type)
                 
@@ -205,58 +233,20 @@ class GameView(object):
                     game_over_screen = True
                     
                     if (winner == "RED"):
-                        p1_win = p1_win + 1
+                        metrics.record_game(1, end_time - start_time)
                     elif (winner == "BLUE"):
-                        p2_win = p2_win + 1
+                        metrics.record_game(2, end_time - start_time)
                     else:
-                        draw = draw + 1
-                
-                    count = count + 1
-                    p1_wins.append(p1_win*100.0/num_games)
-                    p2_wins.append(p2_win*100.0/num_games)
-                    game_time.append(end_time - start_time)
-                    draws.append(draw*100.0/num_games)
-                    counts.append(count)
-                    
-                    # save episode outcomes
-                    if (len(ep_outcomes_table_alpha['ep']) < num_games):
-                        ep_outcomes_table_alpha['ep'].append(count)
-            
-                    if (len(ep_outcomes_table_gamma['ep']) < num_games):
-                        ep_outcomes_table_gamma['ep'].append(count)
-
-                    if (len(ep_outcomes_table_exp_coeff['ep']) < num_games):
-                        ep_outcomes_table_exp_coeff['ep'].append(count)
-        
-                    # save outcome for different values of alpha (lr)
-                    if (exp_alpha == 1):
-                        ep_outcomes_table_alpha['one'].append(p1_win*100.0/num_games)
-                    elif (exp_alpha == 2):
-                        ep_outcomes_table_alpha['two'].append(p1_win*100.0/num_games)
-                    elif (exp_alpha == 3):
-                        ep_outcomes_table_alpha['three'].append(p1_win*100.0/num_games)
-                    elif (exp_alpha == 4):
-                        ep_outcomes_table_alpha['four'].append(p1_win*100.0/num_games)
-        
-                    # save outcome for different values of gamma (discount)
-                    if (exp_gamma == 1):
-                        ep_outcomes_table_gamma['one'].append(p1_win*100.0/num_games)
-                    elif (exp_gamma == 2):
-                        ep_outcomes_table_gamma['two'].append(p1_win*100.0/num_games)
-                    elif (exp_gamma == 3):
-                        ep_outcomes_table_gamma['three'].append(p1_win*100.0/num_games)
-                    elif (exp_gamma == 4):
-                        ep_outcomes_table_gamma['four'].append(p1_win*100.0/num_games)
-
-                    if (exploration_coeff == 0.8):
-                        ep_outcomes_table_exp_coeff['0.8'].append(p1_win*100.0/num_games)
-                    elif (exploration_coeff == 1):
-                        ep_outcomes_table_exp_coeff['1'].append(p1_win*100.0/num_games)
-                    elif (exploration_coeff == 1.4):
-                        ep_outcomes_table_exp_coeff['1.4'].append(p1_win*100.0/num_games)
-                    elif (exploration_coeff == 1.6):
-                        ep_outcomes_table_exp_coeff['1.6'].append(p1_win*100.0/num_games)
-
+                        metrics.record_game(0, end_time - start_time)
+                    # games quit before they ended are not learnt from and
+                    # are left out of the log
+                    finished = winner_value > 0 or self.game_board.check_board_filled()
+                    if finished:
+                        self.p1.finish_game(self.game_board, self.game_logic)
+                        self.p2.finish_game(self.game_board, self.game_logic)
+                    if game_log is not None and finished:
+                        game_log.append(self.game_board.played_columns, winner_value, first_type)
+                        game_log.flush()
 
                 if coin_inserted:
                     if game_mode == "single":
@@ -273,34 +263,33 @@ class GameView(object):
             
         if game_mode == "train":  
             # Print Summary of Final Results
-            avg_time = sum(game_time)/len(game_time)
-            print('Player 1 Win Rate: ', p1_win/count)
-            print('Player 2 Win Rate: ', p2_win/count)
-            print('Average game play in %f seconds.' % avg_time)
-            
-            fig, axes = plt.subplots(nrows=1, ncols=2, figsize=(10, 6))
-            fig.tight_layout(pad=5)
-            
-            # Plot game outcome
-            axes[0].set(ylabel = 'Game outcomes in %')
-            axes[0].set(xlabel = 'Game number')
-            axes[0].plot(counts, draws, 'r-', label='Draw')
-            axes[0].plot(counts, p1_wins, 'g-', label='Player 1 wins')
-            axes[0].plot(counts, p2_wins, 'b-', label='Player 2 wins')
-            axes[0].legend(loc="best", shadow=True, fancybox=True, framealpha =0.7)
+            summary = metrics.get_summary()
+            metrics.close()
+            print('Player 1 Win Rate: ', summary['p1_win_rate'])
+            print('Player 2 Win Rate: ', summary['p2_win_rate'])
+            print('Average game play in %f seconds.' % summary['avg_time'])
             
-            # Plot game time
-            axes[1].set(ylabel = 'Game Playtime in seconds')
-            axes[1].set(xlabel = 'Game number')
-            axes[1].plot(counts, game_time, 'r-')
-            axes[1].axhline(y=avg_time, ls='--',color='black', label='average')
-            plt.legend()
+            if show_plot:
+                plot_metrics(sink_path)
+            if metrics_path is None and sink_path is not None:
+                os.remove(sink_path)
             index = self.win_list.index(max(self.win_list))
             self.trainedComputer = self.p1 if index == 0 else self.p2
+            (self.p2 if index == 0 else self.p1).close()
             self.main_menu()
         else:
             self.game_over_view(winner)
     
+    def quit(self, *players):
+        """
+        Shut down the players of the last game, the trained computer and any
+        other players given, with their worker processes, and then pygame
+        """
+        for player in (getattr(self, 'p1', None), getattr(self, 'p2', None), self.trainedComputer) + players:
+            if player is not None:
+                player.close()
+        pygame.quit()
+    
     def draw_menu(self):
         """
         Draw the elements for the main menu screen
@@ -365,7 +354,7 @@ class GameView(object):
             self.screen.blit(self.background, (0, 0))            
             
         if not main_menu:
-            pygame.quit()
+            self.quit()
             
         else:
             self.main_menu()        
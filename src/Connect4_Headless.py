@@ -0,0 +1,196 @@
+from Connect4_Globals import *
+from Connect4_Utilities import Board
+from Connect4_RLPlayers import ComputerPlayer
+from Connect4_GameLogic import GameLogic
+from Connect4_Instrumentation import MoveInstrumentation
+from Connect4_Metrics import GameMetrics
+from Connect4_GameLog import GameLogWriter
+import argparse
+import json
+
+class HeadlessMatch():
+    """A class that plays two computer players against each other without a
+    display, an event loop or a frame limiter"""
+
+    def __init__(self, p1, p2, game_log=None, ponder=False):
+        """
+        Initialize a match between two ComputerPlayers with different coin
+        types. Every game is appended to the GameLogWriter game_log if one
+        is given. Both players search in this process, so a player that
+        ponders takes CPU time from the other one's search: pondering is
+        turned off unless ponder is set
+        """
+        self.p1 = p1
+        self.p2 = p2
+        if not ponder:
+            p1.ponder = False
+            p2.ponder = False
+        self.win_list = [0,0]
+        self.game_log = game_log
+        # the columns played in the last game, in order
+        self.last_moves = []
+
+    def play_game(self, first_type=None):
+        """
+        Play a single game where the coin type first_type moves first, a 
+        random one if it is not given, and return the coin type of the 
+        winner, 0 if it was a tie
+        """
+        board = Board(BOARD_SIZE[0], BOARD_SIZE[1], headless=True)
+        game_logic = GameLogic(board)
+        current_type = first_type if first_type is not None else random.randint(1,2)
+        p1_turn = (self.p1.get_coin_type() == current_type)
+        self.p1.start_game(board)
+        self.p2.start_game(board)
+        game_over = False
+        while not game_over:
+            current_player = self.p1 if p1_turn else self.p2
+            game_over = current_player.play_move(board, game_logic)
+            p1_turn = not p1_turn
+
+        self.p1.finish_game(board, game_logic)
+        self.p2.finish_game(board, game_logic)
+        winner = game_logic.get_winner()
+        self.last_moves = board.played_columns
+        if self.game_log is not None:
+            self.game_log.append(board.played_columns, winner, current_type)
+        return winner
+
+    def run(self, iterations=20, metrics=None, keep_curves=True):
+        """
+        Play iterations games and return the same outcome statistics that
+        GameView.run gathers in trainer mode: the running win and draw
+        percentages after every game, the game numbers, the time spent on
+        each game and the final win rates. Every game is also recorded in a
+        GameMetrics if one is given. Without keep_curves the per game lists
+        stay empty, so that memory does not grow with the number of games
+        """
+        p1_win   = 0
+        p2_win   = 0
+        draw     = 0
+        count    = 0
+        p1_wins  = []
+        p2_wins  = []
+        draws    = []
+        counts   = []
+        game_time = []
+        total_time = 0.0
+        num_games = iterations
+
+        for i in range(num_games):
+            start_time = time.process_time()
+            winner_value = self.play_game()
+            end_time = time.process_time()
+            if (winner_value > 0):
+                self.win_list[winner_value - 1] += 1
+
+            if (winner_value == 0):
+                draw = draw + 1
+                outcome = 0
+            elif (winner_value == self.p1.get_coin_type()):
+                p1_win = p1_win + 1
+                outcome = 1
+            else:
+                p2_win = p2_win + 1
+                outcome = 2
+
+            count = count + 1
+            total_time += end_time - start_time
+            if metrics is not None:
+                metrics.record_game(outcome, end_time - start_time)
+            if keep_curves:
+                p1_wins.append(p1_win*100.0/num_games)
+                p2_wins.append(p2_win*100.0/num_games)
+                game_time.append(end_time - start_time)
+                draws.append(draw*100.0/num_games)
+                counts.append(count)
+
+        return {'p1_wins': p1_wins,
+                'p2_wins': p2_wins,
+                'draws': draws,
+                'counts': counts,
+                'game_time': game_time,
+                'p1_win_rate': p1_win/count,
+                'p2_win_rate': p2_win/count,
+                'draw_rate': draw/count,
+                'avg_time': total_time/count}
+
+    def close(self):
+        """
+        Shut down the worker processes and threads of both players
+        """
+        self.p1.close()
+        self.p2.close()
+
+    def get_trained_player(self):
+        """
+        Return the player with the most wins so far, like the trained computer
+        GameView keeps after a training session
+        """
+        index = self.win_list.index(max(self.win_list))
+        return self.p1 if index == 0 else self.p2
+
+def main(argv=None):
+    """
+    Command line entry point that plays N games between two computer player
+    types and prints the summary that GameView.run prints in trainer mode
+    """
+    parser = argparse.ArgumentParser(description='Play Connect 4 computer players against each other without a display')
+    parser.add_argument('player_type_1', help='qlearner, sarsalearner, montecarlo, minimax, solver or random')
+    parser.add_argument('player_type_2', help='qlearner, sarsalearner, montecarlo, minimax, solver or random')
+    parser.add_argument('-n', '--games', type=int, default=20, help='number of games to play')
+    parser.add_argument('--epsilon', type=float, default=0.2)
+    parser.add_argument('--alpha', type=float, default=0.3)
+    parser.add_argument('--gamma', type=float, default=0.9)
+    parser.add_argument('--exploration-coeff', type=float, default=1)
+    parser.add_argument('--trace-decay', type=float, default=None, help='lambda of the eligibility traces of the tabular learners, updating once per game')
+    parser.add_argument('--symmetric', action='store_true', help='let tabular learners share entries between mirrored positions')
+    parser.add_argument('--mcts-workers', type=int, default=None, help='search every montecarlo move root-parallel on this many processes')
+    parser.add_argument('--ponder', action='store_true', help='let search players keep searching during the opponent\'s turn, which slows the opponent\'s search down as both run in this process')
+    parser.add_argument('--seed', type=int, default=None, help='seed for the random module')
+    parser.add_argument('--output', default=None, help='write the statistics of every game as JSON to this file')
+    parser.add_argument('--metrics', default=None, help='stream the running win rates and game times to this CSV or JSON lines file')
+    parser.add_argument('--metrics-every', type=int, default=1, help='games between the rows written to the metrics file')
+    parser.add_argument('--metrics-drop', action='store_true', help='drop metrics rows instead of waiting when 10000 rows are queued for the file')
+    parser.add_argument('--game-log', default=None, help='append every game to this binary game log')
+    parser.add_argument('--instrument', default=None, help='record the cost of every move and write it as JSON lines to this file')
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+    first_coin_type = random.randint(1,2)
+    second_coin_type = 2 if first_coin_type == 1 else 1
+    instrumentation = MoveInstrumentation() if args.instrument is not None else None
+    p1 = ComputerPlayer(first_coin_type, args.player_type_1, args.epsilon, args.alpha, args.gamma, exploration_coeff=args.exploration_coeff,
+                        symmetric=args.symmetric, num_workers=args.mcts_workers, ponder=args.ponder, instrumentation=instrumentation,
+                        trace_decay=args.trace_decay)
+    p2 = ComputerPlayer(second_coin_type, args.player_type_2, args.epsilon, args.alpha, args.gamma, exploration_coeff=args.exploration_coeff,
+                        symmetric=args.symmetric, num_workers=args.mcts_workers, ponder=args.ponder, instrumentation=instrumentation,
+                        trace_decay=args.trace_decay)
+
+    metrics = GameMetrics(args.metrics, log_every=args.metrics_every, block=not args.metrics_drop) if args.metrics is not None else None
+    game_log = GameLogWriter(args.game_log) if args.game_log is not None else None
+    # the per game lists are only needed for the JSON output
+    match = HeadlessMatch(p1, p2, game_log, args.ponder)
+    results = match.run(args.games, metrics, keep_curves=args.output is not None)
+    match.close()
+    if metrics is not None:
+        metrics.close()
+        if metrics.sink.dropped:
+            print('Dropped %d metrics rows.' % metrics.sink.dropped)
+    if game_log is not None:
+        game_log.close()
+    print('Player 1 Win Rate: ', results['p1_win_rate'])
+    print('Player 2 Win Rate: ', results['p2_win_rate'])
+    print('Average game play in %f seconds.' % results['avg_time'])
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f)
+    if instrumentation is not None:
+        instrumentation.export_jsonl(args.instrument)
+
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+from Connect4_Globals import *
+import json
+
+# upper bounds in seconds of the buckets of the latency histograms, the last
+# bucket holds everything slower
+LATENCY_BOUNDS = (0.0001, 0.0003, 0.001, 0.003, 0.01, 0.03, 0.1, 0.3, 1, 3, 10)
+# the timers of every move: the whole move, choosing the action, learning
+# from it and the rest of the move such as drawing the coin and updating the
+# board
+TIMERS = ('move', 'choose', 'learn', 'other')
+
+def get_player_counters(player):
+    """
+    Return the counters a player keeps about its search: nodes searched and
+    transposition table probes and hits, summed over the solver and its
+    fallback for a solver player, the moves a solver player left to its 
+    minimax fallback, Monte Carlo playouts and tree sizes, and the size of a
+    Q-table
+    """
+    counters = {}
+    searchers = [player]
+    if hasattr(player, 'solver'):
+        searchers = [player.solver, player.fallback]
+        counters['fallback_moves'] = player.fallback_moves
+    for searcher in searchers:
+        if hasattr(searcher, 'nodes'):
+            counters['nodes'] = counters.get('nodes', 0) + searcher.nodes
+        if hasattr(searcher, 'tt'):
+            counters['tt_probes'] = counters.get('tt_probes', 0) + searcher.tt.probes
+            counters['tt_hits'] = counters.get('tt_hits', 0) + searcher.tt.hits
+    if hasattr(player, 'playouts'):
+        counters['playouts'] = player.playouts
+        counters['tree_hits'] = player.reused_visits
+        counters['tree_nodes'] = player.tree.size if player.tree is not None else 0
+    if hasattr(player, 'q'):
+        counters['q_size'] = len(player.q)
+    return counters
+
+class Histogram():
+    """A class that counts values in fixed buckets, so that it takes the same
+    memory however many values it has seen"""
+
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        """
+        Initialize an empty histogram whose buckets end at bounds, plus one
+        bucket for the values above the last bound
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        """
+        Count a value in its bucket
+        """
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def get_percentile(self, percent):
+        """
+        Return the upper bound of the bucket that holds the given percentile,
+        the largest value seen for the last bucket
+        """
+        if self.count == 0:
+            return 0.0
+        rank = percent / 100.0 * self.count
+        seen = 0
+        for (i, count) in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count > 0:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        """
+        Return the buckets and statistics of the histogram
+        """
+        return {'bounds': list(self.bounds),
+                'counts': list(self.counts),
+                'count': self.count,
+                'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.get_percentile(50),
+                'p95': self.get_percentile(95),
+                'max': self.max}
+
+class MoveInstrumentation():
+    """A class that records what every move of the computer players attached
+    to it costs: the time spent choosing the action, learning from it and on
+    the rest of the move, and the search work and table lookups of the
+    player. Attaching a player wraps its methods, so players that are not
+    attached run exactly as before"""
+
+    def __init__(self, path=None, keep_records=True, bounds=LATENCY_BOUNDS):
+        """
+        Initialize an instrumentation with no players attached. With a path,
+        every move is also written there as a line of JSON as soon as it is
+        made. Without keep_records only the histograms and totals are kept
+        """
+        self.keep_records = keep_records
+        self.bounds = bounds
+        self.records = []
+        self.histograms = {}
+        self.totals = {}
+        self.players = {}
+        self.file = open(path, 'w') if path is not None else None
+
+    def attach(self, computer, name=None):
+        """
+        Start recording the moves of a ComputerPlayer under a name, by
+        default its coin type and player class
+        """
+        if name is None:
+            name = 'p%d-%s' % (computer.get_coin_type(), type(computer.player).__name__)
+        player = computer.player
+        # the counters of the move being made, filled in by the wrappers
+        move = {'choose': 0.0, 'learn': 0.0}
+        self.players[id(computer)] = (name, move)
+        complete_move = computer.complete_move
+        play_move = computer.play_move
+        choose_action = computer.choose_action
+        learn = player.learn
+
+        def timed_choose_action(*args, **kwargs):
+            before = get_player_counters(player)
+            start = time.perf_counter()
+            action = choose_action(*args, **kwargs)
+            move['choose'] += time.perf_counter() - start
+            after = get_player_counters(player)
+            for (key, value) in after.items():
+                # playouts and tree sizes are counted per move, the other
+                # counters since the player was created
+                if key in ('playouts', 'tree_hits', 'tree_nodes', 'q_size'):
+                    move[key] = value
+                else:
+                    move[key] = move.get(key, 0) + value - before.get(key, 0)
+            return action
+
+        def timed_learn(*args, **kwargs):
+            start = time.perf_counter()
+            learn(*args, **kwargs)
+            move['learn'] += time.perf_counter() - start
+
+        def timed_move(make_move):
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                game_over = make_move(*args, **kwargs)
+                self.record(name, time.perf_counter() - start, move)
+                return game_over
+            return wrapper
+
+        computer.choose_action = timed_choose_action
+        computer.complete_move = timed_move(complete_move)
+        computer.play_move = timed_move(play_move)
+        player.learn = timed_learn
+        if hasattr(player, 'getQ'):
+            getQ = player.getQ
+            move['q_lookups'] = 0
+            def counted_getQ(state, action):
+                move['q_lookups'] += 1
+                return getQ(state, action)
+            player.getQ = counted_getQ
+        if hasattr(player, 'get_q_values'):
+            get_q_values = player.get_q_values
+            move['q_lookups'] = 0
+            def counted_get_q_values(state, actions):
+                move['q_lookups'] += len(actions)
+                return get_q_values(state, actions)
+            player.get_q_values = counted_get_q_values
+
+    def detach(self, computer):
+        """
+        Stop recording the moves of a ComputerPlayer and remove the wrappers
+        """
+        if self.players.pop(id(computer), None) is None:
+            return
+        for attribute in ('choose_action', 'complete_move', 'play_move'):
+            del computer.__dict__[attribute]
+        for attribute in ('learn', 'getQ', 'get_q_values'):
+            computer.player.__dict__.pop(attribute, None)
+
+    def record(self, name, duration, move):
+        """
+        Add a move of the player name that took duration seconds and reset
+        the counters of the move
+        """
+        record = {'player': name, 'time': time.time(), 'move': duration,
+                  'choose': move['choose'], 'learn': move['learn'],
+                  'other': max(duration - move['choose'] - move['learn'], 0.0)}
+        for (key, value) in move.items():
+            if key not in record:
+                record[key] = value
+        for key in move:
+            move[key] = 0
+
+        if name not in self.histograms:
+            self.histograms[name] = {timer: Histogram(self.bounds) for timer in TIMERS}
+            self.totals[name] = {}
+        for timer in TIMERS:
+            self.histograms[name][timer].add(record[timer])
+        totals = self.totals[name]
+        totals['moves'] = totals.get('moves', 0) + 1
+        for (key, value) in record.items():
+            if key not in ('player', 'time', 'q_size', 'tree_nodes'):
+                totals[key] = totals.get(key, 0) + value
+        if 'q_size' in record:
+            totals['q_size'] = record['q_size']
+
+        if self.keep_records:
+            self.records.append(record)
+        if self.file is not None:
+            self.file.write(json.dumps(record) + '\n')
+
+    def get_players(self):
+        """
+        Return the names of the players that have made a move
+        """
+        return list(self.totals)
+
+    def get_records(self, player=None, min_time=None):
+        """
+        Return the recorded moves, only those of one player if a name is
+        given and only those slower than min_time seconds if it is given
+        """
+        return [r for r in self.records
+                if (player is None or r['player'] == player) and (min_time is None or r['move'] > min_time)]
+
+    def get_histogram(self, player, timer='move'):
+        """
+        Return the latency histogram of one of the TIMERS of a player
+        """
+        return self.histograms[player][timer].to_dict()
+
+    def get_summary(self, player=None):
+        """
+        Return the totals of every counter and the latency statistics of
+        every timer for one player, or a dict of them for all the players
+        """
+        if player is None:
+            return {name: self.get_summary(name) for name in self.totals}
+        summary = dict(self.totals[player])
+        summary['latency'] = {timer: self.get_histogram(player, timer) for timer in TIMERS}
+        # rates over the time spent choosing actions
+        if summary['choose'] > 0:
+            for key in ('nodes', 'playouts', 'q_lookups'):
+                if summary.get(key):
+                    summary[key + '_per_second'] = summary[key] / summary['choose']
+        if summary.get('tt_probes'):
+            summary['tt_hit_rate'] = summary['tt_hits'] / summary['tt_probes']
+        return summary
+
+    def export_jsonl(self, path):
+        """
+        Write every kept move as a line of JSON to path, followed by a
+        summary line per player
+        """
+        with open(path, 'w') as f:
+            for record in self.records:
+                f.write(json.dumps(record) + '\n')
+            for (name, summary) in self.get_summary().items():
+                f.write(json.dumps({'player': name, 'summary': summary}) + '\n')
+
+    def close(self):
+        """
+        Close the file the moves are written to
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
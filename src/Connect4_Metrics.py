@@ -0,0 +1,268 @@
+from Connect4_Globals import *
+import argparse
+import collections
+import csv
+import json
+import queue
+import threading
+
+# the columns of every row written to a metrics sink
+METRIC_COLUMNS = ('game', 'winner', 'p1_wins', 'p2_wins', 'draws',
+                  'rolling_p1', 'rolling_p2', 'rolling_draw',
+                  'ewma_p1', 'ewma_p2', 'ewma_draw',
+                  'game_time', 'mean_time')
+
+class ReservoirSample():
+    """A class that keeps a uniform random sample of a fixed size of all the
+    values it has seen, with Algorithm R"""
+
+    def __init__(self, size=1000, seed=None):
+        """
+        Initialize an empty sample of up to size values
+        """
+        self.size = size
+        self.values = []
+        self.count = 0
+        self.random = random.Random(seed)
+
+    def add(self, value):
+        """
+        Offer a value to the sample
+        """
+        self.count += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            i = self.random.randrange(self.count)
+            if i < self.size:
+                self.values[i] = value
+
+    def get_percentile(self, percent):
+        """
+        Return an estimate of a percentile of all the values seen
+        """
+        return float(np.percentile(self.values, percent)) if self.values else 0.0
+
+class MetricsSink():
+    """A class that writes rows of metrics to a CSV or JSON lines file from a
+    background thread, flushing the file every flush_interval seconds, so
+    that the game loop never waits on the disk. At most max_queue rows wait
+    for the thread: once the queue is full, put waits for room if block is
+    set and drops the row otherwise, counting it in dropped"""
+
+    def __init__(self, path, flush_interval=1.0, max_queue=10000, block=True):
+        """
+        Initialize a sink writing to path, as JSON lines if it ends in
+        .jsonl and as CSV otherwise
+        """
+        self.path = path
+        self.jsonl = path.endswith('.jsonl')
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.block = block
+        self.dropped = 0
+        self.file = open(path, 'w', newline='')
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.file, fieldnames=METRIC_COLUMNS)
+            self.writer.writeheader()
+        self.thread = threading.Thread(target=self.write_rows, daemon=True)
+        self.thread.start()
+
+    def put(self, row):
+        """
+        Queue a row to be written. When the queue is full, wait for room if
+        the sink blocks and drop the row otherwise
+        """
+        if self.block:
+            self.queue.put(row)
+            return
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_rows(self):
+        """
+        Write the queued rows until close puts None on the queue, flushing
+        the file whenever the queue has been idle for flush_interval seconds
+        or that long has passed since the last flush
+        """
+        last_flush = time.perf_counter()
+        while True:
+            try:
+                row = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                row = False
+            if row is None:
+                break
+            if row:
+                if self.jsonl:
+                    self.file.write(json.dumps(row) + '\n')
+                else:
+                    self.writer.writerow(row)
+            if time.perf_counter() - last_flush >= self.flush_interval:
+                self.file.flush()
+                last_flush = time.perf_counter()
+        self.file.flush()
+
+    def close(self):
+        """
+        Write the remaining rows, stop the thread and close the file
+        """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+            self.file.close()
+
+class GameMetrics():
+    """A class that tracks the outcomes and durations of a stream of games in
+    bounded memory: running totals, win rates over a rolling window of
+    games, exponentially decayed win rates and a reservoir sample of the
+    game times. Every log_every games a row of them goes to a sink"""
+
+    def __init__(self, path=None, window=100, decay=0.01, reservoir_size=1000, log_every=1, flush_interval=1.0,
+                 max_queue=10000, block=True):
+        """
+        Initialize the metrics of no games, written to a MetricsSink at path
+        if one is given, with a queue of max_queue rows that blocks or drops
+        rows when full. decay is the weight of the latest game in the
+        exponentially decayed rates
+        """
+        self.window = collections.deque(maxlen=window)
+        self.window_counts = [0, 0, 0]
+        self.decay = decay
+        self.log_every = log_every
+        self.counts = [0, 0, 0] # draws, player 1 wins and player 2 wins
+        self.ewma = [0.0, 0.0, 0.0]
+        self.count = 0
+        self.total_time = 0.0
+        self.times = ReservoirSample(reservoir_size)
+        self.sink = MetricsSink(path, flush_interval, max_queue, block) if path is not None else None
+
+    def record_game(self, winner, game_time):
+        """
+        Count a game won by player 1 or 2, or a draw when winner is 0, that
+        took game_time seconds
+        """
+        self.count += 1
+        self.counts[winner] += 1
+        if len(self.window) == self.window.maxlen:
+            self.window_counts[self.window[0]] -= 1
+        self.window.append(winner)
+        self.window_counts[winner] += 1
+        # the first games are weighted more so that the rates start from the
+        # outcomes instead of 0
+        decay = max(self.decay, 1.0 / self.count)
+        for outcome in range(3):
+            self.ewma[outcome] += decay * ((winner == outcome) - self.ewma[outcome])
+        self.total_time += game_time
+        self.times.add(game_time)
+        if self.sink is not None and self.count % self.log_every == 0:
+            row = self.get_snapshot()
+            row['winner'] = winner
+            row['game_time'] = game_time
+            self.sink.put(row)
+
+    def get_rolling_rates(self):
+        """
+        Return the rates of draws, player 1 wins and player 2 wins over the
+        games in the rolling window
+        """
+        if not self.window:
+            return [0.0, 0.0, 0.0]
+        return [count / len(self.window) for count in self.window_counts]
+
+    def get_snapshot(self):
+        """
+        Return the current totals and rates
+        """
+        rolling = self.get_rolling_rates()
+        return {'game': self.count,
+                'p1_wins': self.counts[1], 'p2_wins': self.counts[2], 'draws': self.counts[0],
+                'rolling_p1': rolling[1], 'rolling_p2': rolling[2], 'rolling_draw': rolling[0],
+                'ewma_p1': self.ewma[1], 'ewma_p2': self.ewma[2], 'ewma_draw': self.ewma[0],
+                'mean_time': self.total_time / self.count if self.count else 0.0}
+
+    def get_summary(self):
+        """
+        Return the final win rates, the average game time and estimates of
+        the median and 95th percentile game times
+        """
+        count = max(self.count, 1)
+        return {'games': self.count,
+                'p1_win_rate': self.counts[1] / count,
+                'p2_win_rate': self.counts[2] / count,
+                'draw_rate': self.counts[0] / count,
+                'avg_time': self.total_time / count,
+                'p50_time': self.times.get_percentile(50),
+                'p95_time': self.times.get_percentile(95)}
+
+    def close(self):
+        """
+        Write the remaining rows to the sink
+        """
+        if self.sink is not None:
+            self.sink.close()
+
+def read_metrics(path):
+    """
+    Return the rows of a metrics sink as a dict of NumPy arrays, one per
+    column
+    """
+    with open(path, newline='') as f:
+        if path.endswith('.jsonl'):
+            rows = [json.loads(line) for line in f]
+        else:
+            rows = list(csv.DictReader(f))
+    return {column: np.array([float(row[column]) for row in rows]) for column in METRIC_COLUMNS}
+
+def plot_metrics(path, axes=None):
+    """
+    Plot the game outcomes and the game times of a metrics sink: the running
+    win and draw percentages of all the games, the rolling and decayed
+    player 1 win rates, and the time of every logged game with the average
+    """
+    metrics = read_metrics(path)
+    games = metrics['game']
+    num_games = games[-1] if len(games) else 1
+    if axes is None:
+        (fig, axes) = plt.subplots(nrows=1, ncols=2, figsize=(10, 6))
+        fig.tight_layout(pad=5)
+
+    # Plot game outcome
+    axes[0].set(ylabel = 'Game outcomes in %')
+    axes[0].set(xlabel = 'Game number')
+    axes[0].plot(games, metrics['draws'] * 100.0 / num_games, 'r-', label='Draw')
+    axes[0].plot(games, metrics['p1_wins'] * 100.0 / num_games, 'g-', label='Player 1 wins')
+    axes[0].plot(games, metrics['p2_wins'] * 100.0 / num_games, 'b-', label='Player 2 wins')
+    axes[0].plot(games, metrics['rolling_p1'] * 100.0, 'g:', label='Player 1 rolling win rate')
+    axes[0].plot(games, metrics['ewma_p1'] * 100.0, 'g--', label='Player 1 decayed win rate')
+    axes[0].legend(loc="best", shadow=True, fancybox=True, framealpha =0.7)
+
+    # Plot game time
+    axes[1].set(ylabel = 'Game Playtime in seconds')
+    axes[1].set(xlabel = 'Game number')
+    axes[1].plot(games, metrics['game_time'], 'r-')
+    if len(games):
+        axes[1].axhline(y=metrics['mean_time'][-1], ls='--',color='black', label='average')
+    axes[1].legend()
+    return axes
+
+def main(argv=None):
+    """
+    Command line entry point that plots a metrics sink
+    """
+    parser = argparse.ArgumentParser(description='Plot the training metrics written by a Connect 4 run')
+    parser.add_argument('path', help='CSV or JSON lines metrics file')
+    parser.add_argument('--output', default=None, help='save the plot to this file instead of showing it')
+    args = parser.parse_args(argv)
+
+    plot_metrics(args.path)
+    if args.output is not None:
+        plt.savefig(args.output)
+    else:
+        plt.show()
+
+if __name__ == "__main__":
+    main()
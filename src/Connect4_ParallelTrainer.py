@@ -0,0 +1,179 @@
+from Connect4_Globals import *
+from Connect4_RLPlayers import ComputerPlayer
+from Connect4_Headless import HeadlessMatch
+from Connect4_GameLog import GameLogWriter, create_worker_log, merge_worker_log
+import argparse
+import multiprocessing
+
+MERGE_RULES = ('average', 'max', 'latest')
+
+def merge_q_tables(master_q, worker_tables, merge_rule='average'):
+    """
+    Merge the tables learnt by the workers into master_q in place. Every
+    element of worker_tables is a pair of the Q values a worker updated and
+    the number of updates it made to each of them, in the order the workers
+    finished. The merge rule is one of
+      average - the visit-weighted average of the worker values
+      max     - the largest worker value
+      latest  - the value of the worker that finished last
+    Return the total number of updates made to each merged entry
+    """
+    if merge_rule not in MERGE_RULES:
+        raise ValueError('Unknown merge rule %s, expected one of %s' % (merge_rule, ', '.join(MERGE_RULES)))
+
+    merged = {}
+    merged_visits = {}
+    for (q, visits) in worker_tables:
+        for (key, value) in q.items():
+            count = visits[key]
+            if key not in merged:
+                merged[key] = value if merge_rule != 'average' else value * count
+                merged_visits[key] = count
+                continue
+            if merge_rule == 'average':
+                merged[key] += value * count
+            elif merge_rule == 'max':
+                merged[key] = max(merged[key], value)
+            else:
+                merged[key] = value
+            merged_visits[key] += count
+
+    for (key, value) in merged.items():
+        if merge_rule == 'average':
+            value = value / merged_visits[key]
+        master_q[key] = value
+    return merged_visits
+
+def train_worker(args):
+    """
+    Play a number of training games in a worker process starting from a copy
+    of the master Q-table and return the entries the learner updated, the
+    number of updates to each of them and the number of games it won. The
+    games are logged to the game log at log_path if one is given
+    """
+    (player_type, opponent_type, master_q, episodes, seed, epsilon, alpha, gamma, exploration_coeff, log_path) = args
+    random.seed(seed)
+    np.random.seed(seed % (2**32))
+    learner = ComputerPlayer(1, player_type, epsilon, alpha, gamma, exploration_coeff=exploration_coeff)
+    opponent = ComputerPlayer(2, opponent_type, epsilon, alpha, gamma, exploration_coeff=exploration_coeff)
+    learner.player.q = master_q
+    learner.player.visits = {}
+
+    game_log = GameLogWriter(log_path) if log_path is not None else None
+    results = HeadlessMatch(learner, opponent, game_log).run(episodes, keep_curves=False)
+    if game_log is not None:
+        game_log.close()
+    visits = learner.player.visits
+    q = {key: learner.player.q[key] for key in visits}
+    return (q, visits, results['p1_win_rate'] * episodes)
+
+class ParallelTrainer():
+    """A class that trains a tabular learner with self-play episodes spread
+    over a pool of worker processes, merging their Q-tables periodically"""
+
+    def __init__(self, player_type="qlearner", opponent_type="random", num_workers=None, merge_rule='average',
+                 epsilon=0.2, alpha=0.3, gamma=0.9, exploration_coeff=1):
+        """
+        Initialize a trainer of a qlearner or sarsalearner against an opponent
+        of any computer player type on num_workers processes, one per core by
+        default
+        """
+        if merge_rule not in MERGE_RULES:
+            raise ValueError('Unknown merge rule %s, expected one of %s' % (merge_rule, ', '.join(MERGE_RULES)))
+        self.player_type = player_type
+        self.opponent_type = opponent_type
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.merge_rule = merge_rule
+        self.epsilon = epsilon
+        self.alpha = alpha
+        self.gamma = gamma
+        self.exploration_coeff = exploration_coeff
+        self.q = {}
+        self.visits = {}
+        self.win_rates = []
+
+    def train(self, episodes, sync_every=1000, seed=None, game_log=None):
+        """
+        Play episodes training games in total. Every worker plays sync_every
+        games from the current master table before the tables are merged and
+        sent back out. Every game is appended to the GameLogWriter game_log
+        if one is given, each worker logging to a file of its own that is
+        merged into it after every round. Return the win rate of the learner
+        in each round
+        """
+        if seed is None:
+            seed = random.randrange(2**32)
+        round_number = 0
+        with multiprocessing.Pool(self.num_workers) as pool:
+            while episodes > 0:
+                jobs = []
+                for i in range(self.num_workers):
+                    worker_episodes = min(sync_every, episodes)
+                    if worker_episodes == 0:
+                        break
+                    episodes -= worker_episodes
+                    jobs.append((self.player_type, self.opponent_type, self.q, worker_episodes,
+                                 seed + round_number * self.num_workers + i,
+                                 self.epsilon, self.alpha, self.gamma, self.exploration_coeff,
+                                 create_worker_log(game_log)))
+                round_number += 1
+
+                worker_tables = []
+                wins = 0
+                for (q, visits, worker_wins) in pool.imap_unordered(train_worker, jobs):
+                    worker_tables.append((q, visits))
+                    wins += worker_wins
+                for job in jobs:
+                    merge_worker_log(game_log, job[-1])
+                merged_visits = merge_q_tables(self.q, worker_tables, self.merge_rule)
+                for (key, count) in merged_visits.items():
+                    self.visits[key] = self.visits.get(key, 0) + count
+                self.win_rates.append(wins / sum(job[3] for job in jobs))
+
+        return self.win_rates
+
+    def get_player(self, coin_type=1):
+        """
+        Return a computer player of the trained type that plays with the
+        master Q-table
+        """
+        player = ComputerPlayer(coin_type, self.player_type, self.epsilon, self.alpha, self.gamma, exploration_coeff=self.exploration_coeff)
+        player.player.q = self.q
+        return player
+
+def main(argv=None):
+    """
+    Command line entry point that trains a tabular learner on all cores and
+    prints the win rate of every merge round
+    """
+    parser = argparse.ArgumentParser(description='Train a Connect 4 tabular learner on a pool of processes')
+    parser.add_argument('player_type', help='qlearner or sarsalearner')
+    parser.add_argument('opponent_type', help='qlearner, sarsalearner, montecarlo, minimax, solver or random')
+    parser.add_argument('-n', '--games', type=int, default=10000, help='number of training games in total')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes, one per core by default')
+    parser.add_argument('--sync-every', type=int, default=1000, help='games per worker between Q-table merges')
+    parser.add_argument('--merge', default='average', choices=MERGE_RULES, help='rule used to merge the worker tables')
+    parser.add_argument('--epsilon', type=float, default=0.2)
+    parser.add_argument('--alpha', type=float, default=0.3)
+    parser.add_argument('--gamma', type=float, default=0.9)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--save', default=None, help='save the merged Q-table to this file')
+    parser.add_argument('--game-log', default=None, help='append every game to this binary game log')
+    args = parser.parse_args(argv)
+
+    trainer = ParallelTrainer(args.player_type, args.opponent_type, args.workers, args.merge,
+                              args.epsilon, args.alpha, args.gamma)
+    start_time = time.perf_counter()
+    game_log = GameLogWriter(args.game_log) if args.game_log is not None else None
+    win_rates = trainer.train(args.games, args.sync_every, args.seed, game_log)
+    if game_log is not None:
+        game_log.close()
+    for (i, win_rate) in enumerate(win_rates):
+        print('Round %d win rate: %f' % (i + 1, win_rate))
+    print('Trained %d games in %f seconds, %d Q-table entries.' % (args.games, time.perf_counter() - start_time, len(trainer.q)))
+    if args.save is not None:
+        trainer.get_player().player.save(args.save)
+    return trainer
+
+if __name__ == "__main__":
+    main()
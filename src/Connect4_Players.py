@@ -15,6 +15,26 @@ class Player():
         """
         pass
     
+    def start_game(self, board):
+        """
+        A method called for both players before the first move of a game on
+        an empty board
+        """
+        pass
+    
+    def finish_game(self, board, game_logic):
+        """
+        A method called for both players once a game is over, whoever made
+        the last move
+        """
+        pass
+    
+    def close(self):
+        """
+        A method to release any worker processes or threads of the player
+        """
+        pass
+    
     def get_coin_type(self):
         """
         Return the coin type of the player
@@ -50,6 +70,13 @@ class RandomPlayer(Player):
         Choose a random action based on the available actions
         """
         return random.choice(actions)
+    
+    def choose_actions(self, boards, legal_moves, states=None):
+        """
+        Choose a random legal action for every game of a batch, where 
+        legal_moves is a boolean array with a row of playable columns per game
+        """
+        return np.argmax(np.random.random(legal_moves.shape) * legal_moves, axis=1)
                 
     def learn(self, board, actions, chosen_action, game_over, game_logic):
         """
@@ -0,0 +1,330 @@
+from Connect4_Globals import *
+import mmap
+import struct
+
+# File layout of a saved Q-table:
+#   header - QTABLE_HEADER, padded to QTABLE_HEADER_SIZE bytes
+#   keys   - num_states uint64 packed states, sorted ascending
+#   values - num_states rows of num_columns float32 Q values, one per action,
+#            NaN for the actions that have no entry
+QTABLE_MAGIC = b'C4QTABLE'
+QTABLE_VERSION = 1
+QTABLE_HEADER = struct.Struct('<8sHBBQddd16s')
+QTABLE_HEADER_SIZE = 64
+
+def pack_state(state):
+    """
+    Return the 64 bit key of a 2d board state. Every column takes num_rows + 1
+    bits counted from the bottom: a 1 for each coin of type 1, a 0 for each
+    coin of type 2 and a single 1 just above the top coin of the column
+    """
+    num_rows = len(state)
+    stride = num_rows + 1
+    key = 0
+    for j in range(len(state[0])):
+        height = 0
+        for i in range(num_rows - 1, -1, -1):
+            value = state[i][j]
+            if value == 0:
+                break
+            if value == 1:
+                key |= 1 << (j * stride + height)
+            height += 1
+        key |= 1 << (j * stride + height)
+    return key
+
+def unpack_state(key, num_rows=BOARD_SIZE[0], num_columns=BOARD_SIZE[1]):
+    """
+    Return the 2d board state of a key made by pack_state
+    """
+    stride = num_rows + 1
+    state = [[0 for j in range(num_columns)] for i in range(num_rows)]
+    for j in range(num_columns):
+        column = (key >> (j * stride)) & ((1 << stride) - 1)
+        height = column.bit_length() - 1
+        for h in range(height):
+            state[num_rows - 1 - h][j] = 1 if column & (1 << h) else 2
+    return tuple(tuple(x) for x in state)
+
+def save_q_table(q, path, player_type='', epsilon=0.0, alpha=0.0, gamma=0.0):
+    """
+    Save a Q-table mapping (state, action) pairs to values in the compact
+    binary format, with the learner type and parameters in the header
+    """
+    rows = {}
+    num_rows = num_columns = None
+    for ((state, action), value) in q.items():
+        if num_rows is None:
+            (num_rows, num_columns) = (len(state), len(state[0]))
+        key = pack_state(state)
+        if key not in rows:
+            rows[key] = [np.nan] * num_columns
+        rows[key][action] = value
+    if num_rows is None:
+        (num_rows, num_columns) = BOARD_SIZE
+
+    keys = np.array(sorted(rows), dtype=np.uint64)
+    values = np.array([rows[key] for key in keys.tolist()], dtype=np.float32).reshape(len(keys), num_columns)
+    header = QTABLE_HEADER.pack(QTABLE_MAGIC, QTABLE_VERSION, num_rows, num_columns, len(keys),
+                                epsilon, alpha, gamma, player_type.encode()[:16])
+    with open(path, 'wb') as f:
+        f.write(header.ljust(QTABLE_HEADER_SIZE, b'\0'))
+        f.write(keys.tobytes())
+        f.write(values.tobytes())
+
+def load_q_table(path):
+    """
+    Open a saved Q-table through mmap and return it as a MappedQTable
+    """
+    return MappedQTable(path)
+
+class MappedQTable():
+    """A class that serves a saved Q-table straight from a read-only memory
+    map. It is looked up like the dict Q-tables of the tabular learners,
+    keyed by (state, action) pairs, and keeps the values written to it in an
+    in-memory overlay so the file itself is never modified"""
+
+    def __init__(self, path):
+        """
+        Map the file at path and read its header. Pages of the file are only
+        read from disk when a lookup touches them and are shared with every
+        other process that maps the same file
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, num_rows, num_columns, num_states,
+         epsilon, alpha, gamma, player_type) = QTABLE_HEADER.unpack_from(self.mmap)
+        if magic != QTABLE_MAGIC or version != QTABLE_VERSION:
+            raise ValueError('%s is not a version %d Q-table file' % (path, QTABLE_VERSION))
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        self.num_states = num_states
+        self.metadata = {'player_type': player_type.rstrip(b'\0').decode(),
+                         'epsilon': epsilon, 'alpha': alpha, 'gamma': gamma}
+        self.keys = np.frombuffer(self.mmap, dtype=np.uint64, count=num_states, offset=QTABLE_HEADER_SIZE)
+        self.values = np.frombuffer(self.mmap, dtype=np.float32, count=num_states * num_columns,
+                                    offset=QTABLE_HEADER_SIZE + 8 * num_states).reshape(num_states, num_columns)
+        self.overlay = {}
+        # entries in the file, counted on the first call to len, and entries
+        # of the overlay that are not in the file
+        self.num_saved = None
+        self.num_added = 0
+        self.last_state = None
+        self.last_index = None
+
+    def find_state(self, state):
+        """
+        Return the row of a state in the file, None if it is not there. The
+        row of the last state looked up is remembered because a learner
+        looks up every action of the same state in a row
+        """
+        if state is self.last_state:
+            return self.last_index
+        key = np.uint64(pack_state(state))
+        index = int(np.searchsorted(self.keys, key))
+        if index == self.num_states or self.keys[index] != key:
+            index = None
+        self.last_state = state
+        self.last_index = index
+        return index
+
+    def get(self, key, default=None):
+        """
+        Return the value of a (state, action) pair or default if it has none
+        """
+        value = self.overlay.get(key)
+        if value is not None:
+            return value
+        index = self.find_state(key[0])
+        if index is None:
+            return default
+        value = float(self.values[index, key[1]])
+        return default if math.isnan(value) else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.overlay and self.get_saved(key) is None:
+            self.num_added += 1
+        self.overlay[key] = value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        if self.num_saved is None:
+            self.num_saved = int(np.count_nonzero(~np.isnan(self.values)))
+        return self.num_saved + self.num_added
+
+    def get_saved(self, key):
+        """
+        Return the value of a (state, action) pair stored in the file,
+        ignoring the overlay
+        """
+        index = self.find_state(key[0])
+        if index is None:
+            return None
+        value = float(self.values[index, key[1]])
+        return None if math.isnan(value) else value
+
+    def items(self):
+        """
+        Iterate over every (state, action) pair and its current value
+        """
+        for (index, key) in enumerate(self.keys.tolist()):
+            state = unpack_state(key, self.num_rows, self.num_columns)
+            for (action, value) in enumerate(self.values[index].tolist()):
+                if not math.isnan(value) and (state, action) not in self.overlay:
+                    yield ((state, action), value)
+        yield from self.overlay.items()
+
+    def close(self):
+        """
+        Release the memory map
+        """
+        self.keys = None
+        self.values = None
+        self.mmap.close()
+
+class CompactQTable():
+    """A class that stores a Q-table in NumPy arrays: an open addressing hash
+    table of 64 bit packed states, each with a row of per-column Q values. It
+    is looked up like the dict Q-tables of the tabular learners, keyed by
+    (state, action) pairs, but only keeps the entries that were written"""
+
+    # Fibonacci hashing multiplier, 2**64 divided by the golden ratio
+    HASH_MULTIPLIER = 11400714819323198485
+    MAX_LOAD = 0.7
+
+    def __init__(self, num_columns=BOARD_SIZE[1], capacity=1024, dtype=np.float32):
+        """
+        Initialize an empty table for boards with num_columns columns with
+        room for capacity states, rounded up to a power of two. The values
+        are stored as dtype, np.float16 halves the memory of each row
+        """
+        self.num_columns = num_columns
+        self.num_rows = None
+        self.dtype = dtype
+        self.num_states = 0
+        # (state, action) pairs with a value, kept up to date by setitem
+        self.num_entries = 0
+        self.allocate(1 << max(3, (capacity - 1).bit_length()))
+        self.last_state = None
+        self.last_index = None
+
+    def allocate(self, capacity):
+        """
+        Replace the arrays with empty ones of a given power of two capacity
+        """
+        self.capacity = capacity
+        self.shift = 64 - (capacity.bit_length() - 1)
+        # packed states are never 0, so 0 marks an empty slot
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.values = np.full((capacity, self.num_columns), np.nan, dtype=self.dtype)
+
+    def probe(self, key):
+        """
+        Return the slot of a packed state, or the empty slot where it would
+        be inserted
+        """
+        keys = self.keys
+        mask = self.capacity - 1
+        index = ((key * CompactQTable.HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> self.shift
+        while True:
+            slot_key = int(keys[index])
+            if slot_key == key or slot_key == 0:
+                return index
+            index = (index + 1) & mask
+
+    def find_state(self, state):
+        """
+        Return the slot of a state, None if it is not in the table. The slot
+        of the last state looked up is remembered because a learner looks up
+        every action of the same state in a row
+        """
+        if state is self.last_state:
+            return self.last_index
+        if self.num_rows is None:
+            self.num_rows = len(state)
+        key = pack_state(state)
+        index = self.probe(key)
+        if self.keys[index] == 0:
+            index = None
+        self.last_state = state
+        self.last_index = index
+        return index
+
+    def get(self, key, default=None):
+        """
+        Return the value of a (state, action) pair or default if it has none.
+        The default is never stored
+        """
+        index = self.find_state(key[0])
+        if index is None:
+            return default
+        value = float(self.values[index, key[1]])
+        return default if math.isnan(value) else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        (state, action) = key
+        index = self.find_state(state)
+        if index is None:
+            if (self.num_states + 1) > self.capacity * CompactQTable.MAX_LOAD:
+                self.grow()
+            packed = pack_state(state)
+            index = self.probe(packed)
+            self.keys[index] = packed
+            self.num_states += 1
+            self.last_state = state
+            self.last_index = index
+        if math.isnan(self.values[index, action]):
+            self.num_entries += 1
+        self.values[index, action] = value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return self.num_entries
+
+    def grow(self):
+        """
+        Double the capacity and insert every state again
+        """
+        used = np.flatnonzero(self.keys)
+        (keys, values) = (self.keys[used], self.values[used])
+        self.allocate(self.capacity * 2)
+        for (key, row) in zip(keys.tolist(), values):
+            index = self.probe(key)
+            self.keys[index] = key
+            self.values[index] = row
+        self.last_state = None
+        self.last_index = None
+
+    def items(self):
+        """
+        Iterate over every (state, action) pair and its value
+        """
+        num_rows = self.num_rows or BOARD_SIZE[0]
+        for index in np.flatnonzero(self.keys).tolist():
+            state = unpack_state(int(self.keys[index]), num_rows, self.num_columns)
+            for (action, value) in enumerate(self.values[index].tolist()):
+                if not math.isnan(value):
+                    yield ((state, action), value)
+
+    def nbytes(self):
+        """
+        Return the number of bytes used by the arrays of the table
+        """
+        return self.keys.nbytes + self.values.nbytes
@@ -1,30 +1,47 @@
 from Connect4_Globals import *
 from Connect4_Players import Player, RandomPlayer
+from Connect4_QTable import save_q_table, load_q_table
+from Connect4_Utilities import TranspositionTable, WindowEvaluator, SearchTimeout
+from Connect4_Solver import Solver, OpeningBook, DEFAULT_BOOK_PATH
+import os
+import multiprocessing
+import threading
 
 class ComputerPlayer(Player):
     """A class that represents an AI player in the game"""
     
-    def __init__(self, coin_type, player_type, epsilon=0.2, alpha=0.3, gamma=0.9, exploration_coeff=1):
+    def __init__(self, coin_type, player_type, epsilon=0.2, alpha=0.3, gamma=0.9, exploration_coeff=1, q_table=None, symmetric=False, time_budget=None, num_workers=None, ponder=False, instrumentation=None, trace_decay=None):
         """
         Initialize an AI with the proper type which are one of Random, 
-        Q learner and Sarsa learner
+        Q learner, Sarsa learner, Monte Carlo, Minimax and Solver. With ponder, the search players keep 
+        searching in the background while the opponent decides on its move.
+        With a MoveInstrumentation, the cost of every move is recorded. With
+        a trace_decay, the learners update once per game with eligibility
+        traces
         """
         if (player_type == "qlearner"):
-            self.player = QLearningPlayer(coin_type, epsilon, alpha, gamma)
+            self.player = QLearningPlayer(coin_type, epsilon, alpha, gamma, q_table, symmetric, trace_decay)
         elif (player_type == "sarsalearner"):
-            self.player = SarsaLearningPlayer(coin_type, epsilon, alpha, gamma)
+            self.player = SarsaLearningPlayer(coin_type, epsilon, alpha, gamma, q_table, symmetric, trace_decay)
         elif (player_type == "montecarlo"):
-            self.player = MonteCarloPlayer(coin_type, exploration_coeff)
+            self.player = MonteCarloPlayer(coin_type, exploration_coeff, num_workers)
         elif (player_type == "minimax"):
-            self.player = MiniMaxPlayer(coin_type)
+            self.player = MiniMaxPlayer(coin_type, time_budget=time_budget)
+        elif (player_type == "solver"):
+            self.player = SolverPlayer(coin_type, time_budget=time_budget)
         else:
             self.player = RandomPlayer(coin_type)
+        self.ponder = ponder and isinstance(self.player, PonderingPlayer)
+        if instrumentation is not None:
+            instrumentation.attach(self)
             
     def complete_move(self, coin, board, game_logic, background):
         """
         Move the coin and decide which slot to drop it in and learn from the
         chosen move
         """
+        if self.ponder:
+            self.player.stop_pondering()
         actions = board.get_available_actions()
         state = board.get_state()
         chosen_action = self.choose_action(state, actions, coin, board, game_logic, background)
@@ -32,9 +49,64 @@ class ComputerPlayer(Player):
         coin.set_column(chosen_action)
         game_over = board.insert_coin(coin, background, game_logic)
         self.player.learn(board, actions, chosen_action, game_over, game_logic)
+        if self.ponder and not game_over:
+            self.player.start_pondering(board)
         
         return game_over
     
+    def play_move(self, board, game_logic):
+        """
+        Decide which column to drop a piece in, insert it without drawing 
+        anything and learn from the chosen move
+        """
+        if self.ponder:
+            self.player.stop_pondering()
+        actions = board.get_available_actions()
+        state = board.get_state()
+        chosen_action = self.choose_action(state, actions, board=board, game_logic=game_logic)
+        game_over = board.insert_piece(chosen_action, self.get_coin_type(), game_logic)
+        self.player.learn(board, actions, chosen_action, game_over, game_logic)
+        if self.ponder and not game_over:
+            self.player.start_pondering(board)
+        
+        return game_over
+    
+    def start_game(self, board):
+        """
+        Let the player get ready for a new game on an empty board
+        """
+        if hasattr(self.player, 'start_game'):
+            self.player.start_game(board)
+    
+    def finish_game(self, board, game_logic):
+        """
+        Stop the search started after the player's last move and let the 
+        player learn from the end of a game, whoever made the last move
+        """
+        if self.ponder:
+            self.player.stop_pondering()
+        if hasattr(self.player, 'finish_game'):
+            self.player.finish_game(board, game_logic)
+    
+    def close(self):
+        """
+        Stop pondering and shut down the worker processes of the player, if
+        it has any
+        """
+        if self.ponder:
+            self.player.stop_pondering()
+        if hasattr(self.player, 'close'):
+            self.player.close()
+    
+    def set_ponder(self, ponder):
+        """
+        Turn pondering on or off, stopping a search running in the 
+        background. Only MonteCarlo and Minimax players can ponder
+        """
+        if self.ponder:
+            self.player.stop_pondering()
+        self.ponder = ponder and isinstance(self.player, PonderingPlayer)
+    
     def get_coin_type(self):
         """
         Return the coin type of the AI player
@@ -48,29 +120,72 @@ class ComputerPlayer(Player):
         """
         return self.player.choose_action(state, actions, coin, board, game_logic, background)
         
-class QLearningPlayer(Player):
-    """A class that represents an AI using Q-learning algorithm"""
+class TabularLearningPlayer(Player):
+    """A class that holds the Q-table and action selection shared by the
+    Q-learning and Sarsa-learning players"""
     
-    def __init__(self, coin_type, epsilon=0.2, alpha=0.3, gamma=0.9):
+    def __init__(self, coin_type, epsilon=0.2, alpha=0.3, gamma=0.9, q_table=None, symmetric=False, trace_decay=None):
         """
-        Initialize a Q-learner with parameters epsilon, alpha and gamma
-        and its coin type
+        Initialize a tabular learner with parameters epsilon, alpha and gamma
+        and its coin type. The Q-table is a dict unless another table such as
+        a CompactQTable is given. A symmetric learner stores a position and 
+        its left-to-right mirror image under the same entries. With a 
+        trace_decay lambda, the moves of a game are kept until it is over and
+        updated together towards their lambda-returns
         """
         Player.__init__(self, coin_type)
-        self.q = {}
+        self.q = {} if q_table is None else q_table
+        self.symmetric = symmetric
+        self.visits = None # number of updates per Q-table entry when counted
         self.epsilon = epsilon # e-greedy chance of random exploration
         self.alpha = alpha # learning rate
         self.gamma = gamma # discount factor for future rewards 
+        self.trace_decay = trace_decay # lambda of the eligibility traces
+        self.episode = [] # (state, action, reward, actions) of every move of the game
         
     def getQ(self, state, action):
         """
         Return a probability for a given state and action where the greater
         the probability the better the move
         """
-        # encourage exploration; "optimistic" 1.0 initial values
-        if self.q.get((state, action)) is None:
-            self.q[(state, action)] = 1.0
-        return self.q.get((state, action))    
+        # encourage exploration; "optimistic" 1.0 initial values, which are 
+        # only stored once the state and action get updated
+        return self.q.get(self.get_key(state, action), 1.0)
+    
+    def get_q_values(self, state, actions):
+        """
+        Return the Q values of a list of actions in a state, the same as 
+        getQ for each of them but with the key state found only once
+        """
+        if self.symmetric:
+            mirrored = tuple(row[::-1] for row in state)
+            if mirrored < state:
+                last = len(state[0]) - 1
+                return [self.q.get((mirrored, last - a), 1.0) for a in actions]
+        return [self.q.get((state, a), 1.0) for a in actions]
+    
+    def setQ(self, state, action, value):
+        """
+        Store the Q value of a given state and action and count the update 
+        if visits are being counted
+        """
+        key = self.get_key(state, action)
+        self.q[key] = value
+        if self.visits is not None:
+            self.visits[key] = self.visits.get(key, 0) + 1
+            
+    def get_key(self, state, action):
+        """
+        Return the Q-table key of a state and action. For a symmetric learner
+        the state is replaced by the smaller of itself and its mirror image,
+        and a mirrored state has its column action mirrored too
+        """
+        if not self.symmetric:
+            return (state, action)
+        mirrored = tuple(row[::-1] for row in state)
+        if mirrored < state:
+            return (mirrored, len(state[0]) - 1 - action)
+        return (state, action)
         
     def choose_action(self, state, actions, coin, board, game_logic, background):
         """
@@ -83,7 +198,7 @@ class QLearningPlayer(Player):
             chosen_action = random.choice(actions)
             return chosen_action
 
-        qs = [self.getQ(current_state, a) for a in actions]
+        qs = self.get_q_values(current_state, actions)
         maxQ = max(qs)
 
         if qs.count(maxQ) > 1:
@@ -95,98 +210,247 @@ class QLearningPlayer(Player):
 
         return actions[i]
     
-    def learn(self, board, actions, chosen_action, game_over, game_logic):
+    def choose_actions(self, boards, legal_moves, states=None):
         """
-        Determine the reward based on its current chosen action and update
-        the Q table using the reward recieved and the maximum future reward
-        based on the resulting state due to the chosen action
+        Return one action per game for a batch of games, where boards is an
+        array with the 2d board of every game and legal_moves a boolean array
+        with a row of playable columns for every game. The states of the 
+        boards can be passed in when the caller already has them. Exploration
+        is drawn for the whole batch at once, only the Q values of the greedy
+        games are looked up, one row per state, and ties between the best 
+        moves are broken randomly
+        """
+        num_games = len(boards)
+        explore = np.random.random(num_games) < self.epsilon
+        greedy = np.flatnonzero(~explore)
+        if states is None:
+            states = [tuple(map(tuple, board)) for board in boards[greedy].tolist()]
+        else:
+            states = [states[i] for i in greedy.tolist()]
+        num_columns = legal_moves.shape[1]
+        rows = []
+        for (state, legal_row) in zip(states, legal_moves[greedy].tolist()):
+            actions = [a for a in range(num_columns) if legal_row[a]]
+            row = [-np.inf] * num_columns
+            for (a, value) in zip(actions, self.get_q_values(state, actions)):
+                row[a] = value
+            rows.append(row)
+        qs = np.full(legal_moves.shape, -np.inf)
+        if rows:
+            qs[greedy] = rows
+        # random scores only among the legal moves when exploring and only
+        # among the best legal moves otherwise
+        best = (qs == qs.max(axis=1, keepdims=True)) & legal_moves
+        candidates = np.where(explore[:, None], legal_moves, best)
+        return np.argmax(np.random.random(legal_moves.shape) * candidates, axis=1)
+    
+    def save(self, path):
+        """
+        Save the Q-table to path in the compact binary format
+        """
+        save_q_table(self.q, path, type(self).__name__, self.epsilon, self.alpha, self.gamma)
+        
+    def load(self, path):
+        """
+        Replace the Q-table with the one saved at path. The file is memory 
+        mapped and read lazily, and new updates are kept in memory
+        """
+        self.q = load_q_table(path)
+        
+    def get_reward(self, game_over, win_value):
+        """
+        Return the reward for a move given whether the game is over and the 
+        coin type of the winner, 0 for a tie
         """
         reward = 0
         if (game_over):
-            win_value = game_logic.get_winner()
             if win_value == 0:
                 reward = 0.5
             elif win_value == self.coin_type:
                 reward = 1
             else:
                 reward = -2
-        prev_state = board.get_prev_state()
+        return reward
+    
+    def start_game(self, board):
+        """
+        Forget the moves of a game that was left before it was over
+        """
+        self.episode = []
+    
+    def learn(self, board, actions, chosen_action, game_over, game_logic):
+        """
+        Determine the reward based on its current chosen action and update
+        the Q table from the state before the move to the resulting state.
+        With eligibility traces the move is only kept until the game is over
+        """
+        reward = self.get_reward(game_over, game_logic.get_winner())
+        if self.trace_decay is not None:
+            self.episode.append((board.get_prev_state(), chosen_action, reward, actions))
+            if game_over:
+                self.finish_game(board, game_logic)
+            return
+        self.update(board.get_prev_state(), chosen_action, reward, board.get_state(), actions)
+    
+    def finish_game(self, board, game_logic):
+        """
+        Update the moves of a game that is over in one backward pass. The 
+        last move is rewarded with the outcome of the game, also when the 
+        opponent made the last move, and every earlier move is moved towards
+        its lambda-return, which mixes the value of the next state the 
+        player moves in with the return of the rest of the game
+        """
+        (episode, self.episode) = (self.episode, [])
+        if not episode:
+            return
+        (state, action, reward, actions) = episode[-1]
+        episode[-1] = (state, action, self.get_reward(True, game_logic.get_winner()), actions)
+        values = []
+        ret = 0.0
+        next_step = None
+        for (state, action, reward, actions) in reversed(episode):
+            if next_step is None:
+                ret = reward
+            else:
+                ret = reward + self.gamma * ((1 - self.trace_decay) * self.get_value(*next_step) + self.trace_decay * ret)
+            prev = self.getQ(state, action)
+            values.append((state, action, prev + self.alpha * (ret - prev)))
+            next_step = (state, action, actions)
+        # the values are computed from the table before the game, then 
+        # written together
+        for (state, action, value) in values:
+            self.setQ(state, action, value)
+    
+    def get_value(self, state, action, actions):
+        """
+        Return the value of a state the player moved in, given the action it
+        took and the actions it could take there
+        """
+        pass
+    
+    def update(self, prev_state, chosen_action, reward, result_state, actions):
+        """
+        Update the Q value of taking chosen_action in prev_state given the 
+        reward recieved and the resulting state
+        """
+        pass
+        
+class QLearningPlayer(TabularLearningPlayer):
+    """A class that represents an AI using Q-learning algorithm"""
+    
+    def __init__(self, coin_type, epsilon=0.2, alpha=0.3, gamma=0.9, q_table=None, symmetric=False, trace_decay=None):
+        """
+        Initialize a Q-learner with parameters epsilon, alpha and gamma
+        and its coin type
+        """
+        TabularLearningPlayer.__init__(self, coin_type, epsilon, alpha, gamma, q_table, symmetric, trace_decay)
+    
+    def update(self, prev_state, chosen_action, reward, result_state, actions):
+        """
+        Update the Q table using the reward recieved and the maximum future 
+        reward based on the resulting state due to the chosen action
+        """
         prev = self.getQ(prev_state, chosen_action)
-        result_state = board.get_state()
-        maxqnew = max([self.getQ(result_state, a) for a in actions])
-        self.q[(prev_state, chosen_action)] = prev + self.alpha * ((reward + self.gamma*maxqnew) - prev)
+        maxqnew = max(self.get_q_values(result_state, actions))
+        self.setQ(prev_state, chosen_action, prev + self.alpha * ((reward + self.gamma*maxqnew) - prev))
+    
+    def get_value(self, state, action, actions):
+        """
+        Return the value of the best action in a state, as in Peng's Q(lambda)
+        """
+        return max(self.get_q_values(state, actions))
 
-class SarsaLearningPlayer(Player):
+class SarsaLearningPlayer(TabularLearningPlayer):
     """A class that represents an AI using Sarsa-learning algorithm"""
     
-    def __init__(self, coin_type, epsilon=0.2, alpha=0.3, gamma=0.9):
+    def __init__(self, coin_type, epsilon=0.2, alpha=0.3, gamma=0.9, q_table=None, symmetric=False, trace_decay=None):
         """
         Initialize a sarsa-learner with parameters epsilon, alpha and gamma
         and its coin type
         """
+        TabularLearningPlayer.__init__(self, coin_type, epsilon, alpha, gamma, q_table, symmetric, trace_decay)
+    
+    def update(self, prev_state, chosen_action, reward, result_state, actions):
+        """
+        Update the Q table using the reward recieved and the exploring future 
+        reward based on the resulting state due to the chosen action
+        """
+        prev = self.getQ(prev_state, chosen_action)     
+        qnew = self.getQ(result_state, chosen_action)
+        self.setQ(prev_state, chosen_action, prev + self.alpha * ((reward + self.gamma*qnew) - prev))
+    
+    def get_value(self, state, action, actions):
+        """
+        Return the value of the action taken in a state, as in Sarsa(lambda)
+        """
+        return self.getQ(state, action)
+
+class PonderingPlayer(Player):
+    """A class that represents a search player that can keep searching in a
+    background thread while the opponent decides on its move, so that its
+    next search starts from the work already done"""
+    
+    def __init__(self, coin_type):
+        """
+        Initialize a player that is not pondering
+        """
         Player.__init__(self, coin_type)
-        self.q = {}
-        self.epsilon = epsilon # e-greedy chance of random exploration
-        self.alpha = alpha # learning rate
-        self.gamma = gamma # discount factor for future rewards 
+        self.ponder_thread = None
+        # set to ask the search running in the background to stop
+        self.stop_event = threading.Event()
         
-    def getQ(self, state, action):
+    def start_pondering(self, board):
         """
-        Return a probability for a given state and action where the greater
-        the probability the better the move
+        Start searching a copy of the board, with the opponent to move, in a
+        background thread. The search runs until stop_pondering is called or
+        it reaches the limits of a normal move
         """
-        # encourage exploration; "optimistic" 1.0 initial values
-        if self.q.get((state, action)) is None:
-            self.q[(state, action)] = 1.0
-        return self.q.get((state, action))    
+        self.stop_pondering()
+        self.ponder_thread = threading.Thread(target=self.ponder, args=(board.copy(),), daemon=True)
+        self.ponder_thread.start()
         
-    def choose_action(self, state, actions, coin, board, game_logic, background):
+    def stop_pondering(self):
         """
-        Return an action based on the best move recommendation by the current
-        Q-Table with a epsilon chance of trying out a new move
+        Stop the background search and wait for it to finish
         """
-        current_state = state
-
-        if random.random() < self.epsilon: # explore!
-            chosen_action = random.choice(actions)
-            return chosen_action
-
-        qs = [self.getQ(current_state, a) for a in actions]
-        maxQ = max(qs)
-
-        if qs.count(maxQ) > 1:
-            # more than 1 best option; choose among them randomly
-            best_options = [i for i in range(len(actions)) if qs[i] == maxQ]
-            i = random.choice(best_options)
-        else:
-            i = qs.index(maxQ)
-
-        return actions[i]
-    def learn(self, board, actions, chosen_action, game_over, game_logic):
+        if self.ponder_thread is not None:
+            self.stop_event.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+            self.stop_event.clear()
+            
+    def ponder(self, position):
         """
-        Determine the reward based on its current chosen action and update
-        the Q table using the reward recieved and the exploring future reward
-        based on the resulting state due to the chosen action
+        Search a position with the opponent to move until stop_event is set
         """
-        reward = 0
-        if (game_over):
-            win_value = game_logic.get_winner()
-            if win_value == 0:
-                reward = 0.5
-            elif win_value == self.coin_type:
-                reward = 1
-            else:
-                reward = -2
-        
-        prev_state = board.get_prev_state()
-        prev = self.getQ(prev_state, chosen_action)     
-        result_state = board.get_state()
-        qnew = self.getQ(result_state, chosen_action)
-        self.q[(prev_state, chosen_action)] = prev + self.alpha * ((reward + self.gamma*qnew) - prev)
+        pass
 
-class MiniMaxPlayer(Player):
-    def __init__(self, coin_type):
-        Player.__init__(self, coin_type) # coin type is 1 or 2
+class MiniMaxPlayer(PonderingPlayer):
+    # scores at or beyond this value mean a player has four in a row
+    WIN_SCORE = 10000000000000
+    # half width of the window around the previous iteration's value
+    ASPIRATION_WINDOW = 20
+    
+    def __init__(self, coin_type, depth=5, tt_size=1 << 18, time_budget=None):
+        """
+        Initialize a minimax player searching depth moves ahead. With a time
+        budget in seconds it keeps deepening past depth until the budget of 
+        a move is spent
+        """
+        PonderingPlayer.__init__(self, coin_type) # coin type is 1 or 2
+        self.depth = depth
+        self.time_budget = time_budget
+        self.deadline = None
+        self.can_abort = False
+        self.pondering = False
+        self.root_depth = depth
+        # positions already searched, kept between moves
+        self.tt = TranspositionTable(tt_size)
+        self.nodes = 0
+        self.completed_depth = 0
+        # moves that caused a cutoff, per ply, and per coin type and column
+        self.killers = []
+        self.history = [None, None, None]
         self.EMPTY = 0
         self.AI_PIECE = self.coin_type
         if self.AI_PIECE == 1:
@@ -209,7 +473,22 @@ class MiniMaxPlayer(Player):
             score -= 4
         return score  
 
+    def get_evaluator(self, board):
+        """
+        Return a WindowEvaluator for the board that scores every line of four
+        slots with evaluate_window and the center column like score_position
+        """
+        n_in_a_row = board.get_n_in_a_row()
+        window_scores = [[0] * (n_in_a_row + 1) for i in range(n_in_a_row + 1)]
+        for own in range(n_in_a_row + 1):
+            for other in range(n_in_a_row + 1 - own):
+                window = [self.AI_PIECE] * own + [self.PLAYER_PIECE] * other + [self.EMPTY] * (n_in_a_row - own - other)
+                window_scores[own][other] = self.evaluate_window(window, self.AI_PIECE)
+        return WindowEvaluator(board, window_scores, 3)
+
     def score_position(self, board, piece):
+        if board.evaluator is not None:
+            return board.evaluator.get_score(piece)
         (board_n_rows, board_n_cols) = board.get_dimensions()
         board_state = np.asarray(board.get_state()) # convert tuple into numpy array
         n_in_a_row = board.get_n_in_a_row()
@@ -246,61 +525,216 @@ class MiniMaxPlayer(Player):
         return score  
 
     def choose_action(self, state, actions, coin, board, game_logic, background):
-        minmax_algo = self.minmax(actions, coin, board, 5, -math.inf, math.inf, True, game_logic, background)
-        next_action = minmax_algo[0]
+        """
+        Search one ply deeper at a time and return the best move of the 
+        deepest search that completed. The search makes and takes back its
+        moves in place on a single copy of the board that keeps its heuristic
+        score up to date with every move. A search that runs out of time 
+        leaves moves on that copy, so it is never reused
+        """
+        search_board = board.copy()
+        search_board.evaluator = self.get_evaluator(search_board)
+        (next_action, value) = self.iterative_deepening(actions, coin, search_board, True, game_logic, background)
         if next_action == None:
             return random.choice(actions)
         return next_action
+    
+    def ponder(self, position):
+        """
+        Search the position the opponent has to move in, filling the 
+        transposition table with the positions of every reply. Without a
+        time budget the search goes one ply deeper than depth, which covers
+        the whole search of the next move
+        """
+        position.evaluator = self.get_evaluator(position)
+        self.pondering = True
+        try:
+            self.iterative_deepening(position.get_available_actions(), None, position, False, None, None)
+        finally:
+            self.pondering = False
+    
+    def iterative_deepening(self, actions, coin, board, maximizingPlayer, game_logic, background):
+        """
+        Search the board to depth 1, 2, ... up to self.depth, or as deep as
+        the time budget allows when there is one, each time starting with a
+        window around the value of the previous depth. Return the best move
+        and value of the deepest search that completed
+        """
+        self.tt.new_search()
+        self.killers = []
+        for piece in (1, 2):
+            self.history[piece] = [count // 2 for count in self.history[piece]] if self.history[piece] else [0] * board.num_columns
+        max_depth = self.depth
+        self.deadline = None
+        if self.time_budget is not None:
+            max_depth = board.total_slots - board.num_moves
+            self.deadline = time.perf_counter() + self.time_budget
+        if self.pondering:
+            max_depth = min(max_depth + 1, board.total_slots - board.num_moves)
+            if self.deadline is None:
+                self.deadline = math.inf
+        
+        (best_action, best_value) = (None, None)
+        self.completed_depth = 0
+        # the first iteration always completes so that there is a move,
+        # unless nobody needs the move yet
+        self.can_abort = self.pondering
+        for depth in range(1, max_depth + 1):
+            self.root_depth = depth
+            try:
+                if best_value is None or abs(best_value) >= MiniMaxPlayer.WIN_SCORE:
+                    (alpha, beta) = (-math.inf, math.inf)
+                else:
+                    (alpha, beta) = (best_value - MiniMaxPlayer.ASPIRATION_WINDOW, best_value + MiniMaxPlayer.ASPIRATION_WINDOW)
+                (column, value) = self.minmax(actions, coin, board, depth, alpha, beta, maximizingPlayer, game_logic, background)
+                if value <= alpha or value >= beta:
+                    (column, value) = self.minmax(actions, coin, board, depth, -math.inf, math.inf, maximizingPlayer, game_logic, background)
+            except SearchTimeout:
+                break
+            (best_action, best_value) = (column, value)
+            self.completed_depth = depth
+            self.can_abort = self.deadline is not None or self.pondering
+            if abs(value) >= MiniMaxPlayer.WIN_SCORE:
+                # a forced win or loss was found, deeper searches agree
+                break
+        return (best_action, best_value)
+    
+    def order_moves(self, valid_locations, tt_move, depth, piece, center):
+        """
+        Return the moves in the order to search them: the transposition table
+        move, then the killer moves of this ply, then the rest by their 
+        history score with the center columns first
+        """
+        ply = self.root_depth - depth
+        killers = self.killers[ply] if ply < len(self.killers) else []
+        history = self.history[piece]
+        def priority(col):
+            if col == tt_move:
+                return (0, 0, 0)
+            if col in killers:
+                return (1, killers.index(col), 0)
+            return (2, -history[col], abs(col - center))
+        return sorted(valid_locations, key=priority)
+    
+    def record_cutoff(self, col, depth, piece):
+        """
+        Remember a move that caused a beta cutoff as a killer of its ply and
+        in the history table of its coin type
+        """
+        ply = self.root_depth - depth
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if col not in killers:
+            killers.insert(0, col)
+            del killers[2:]
+        self.history[piece][col] += depth * depth
+    
+    def get_search_statistics(self):
+        """
+        Return the number of nodes searched and the transposition table 
+        lookups, hits and hit rate since the player was created, and the 
+        depth of the last completed search
+        """
+        return {'nodes': self.nodes,
+                'tt_probes': self.tt.probes,
+                'tt_hits': self.tt.hits,
+                'tt_hit_rate': self.tt.get_hit_rate(),
+                'completed_depth': self.completed_depth}
         
     def minmax(self, actions, coin, board, depth, alpha, beta, maximizingPlayer, game_logic, background):
         AI_PIECE = self.AI_PIECE
         PLAYER_PIECE = self.PLAYER_PIECE            
-        valid_locations = actions
+        self.nodes += 1
+        if self.can_abort and (self.nodes & 63) == 0 and (time.perf_counter() > self.deadline or self.stop_event.is_set()):
+            raise SearchTimeout()
         
-        is_terminal = board.is_terminal_node(PLAYER_PIECE, AI_PIECE)
+        # a position searched at least as deep before either settles the 
+        # search or narrows its window, and its best move is tried first
+        alpha_orig = alpha
+        beta_orig = beta
+        tt_move = None
+        entry = self.tt.lookup(board.zobrist_hash)
+        if entry is not None:
+            (_, tt_depth, bound, tt_value, tt_move, _) = entry
+            if tt_depth >= depth:
+                if bound == TranspositionTable.EXACT:
+                    return (tt_move, tt_value)
+                elif bound == TranspositionTable.LOWER:
+                    alpha = max(alpha, tt_value)
+                else:
+                    beta = min(beta, tt_value)
+                if alpha >= beta:
+                    return (tt_move, tt_value)
+        
+        valid_locations = board.get_available_actions()
+        
+        # only the player who moved last can have just won
+        won = board.is_last_move_win()
+        is_terminal = won or board.num_moves == board.total_slots
         if depth == 0 or is_terminal:
             if is_terminal:
-                if board.is_winning_move(AI_PIECE):
-                    return (None, 100000000000000)
-                elif board.is_winning_move(PLAYER_PIECE):
-                    return (None, -10000000000000)
+                if won and board.prev_player == AI_PIECE:
+                    value = 100000000000000
+                elif won:
+                    value = -10000000000000
                 else: # Game is over, no more valid moves
-                    return (None, 0)
+                    value = 0
             else: # Depth is zero
                 value = self.score_position(board, AI_PIECE)
-                return (None, value)
+            self.tt.store(board.zobrist_hash, depth, TranspositionTable.EXACT, value, None)
+            return (None, value)
                 
+        center = board.num_columns // 2
         if maximizingPlayer:
+            valid_locations = self.order_moves(valid_locations, tt_move, depth, AI_PIECE, center)
             value = -math.inf
             column = random.choice(valid_locations)
             for col in valid_locations:
-                row = board.determine_row_to_insert(col)
-                b_copy = board.copy()
-                b_copy.drop_piece(row, col, AI_PIECE)
-                new_score = self.minmax(actions, coin, b_copy, depth-1, alpha, beta, False, game_logic, background)[1]
+                board.make_move(col, AI_PIECE)
+                new_score = self.minmax(actions, coin, board, depth-1, alpha, beta, False, game_logic, background)[1]
+                board.undo_move()
                 if new_score > value:
                     value = new_score
                     column = col
                 alpha = max(alpha, value)
                 if alpha >= beta:
+                    self.record_cutoff(col, depth, AI_PIECE)
                     break
+            self.store_result(board, depth, alpha_orig, beta_orig, value, column)
             return (column, value)
 
         else: # Minimizing player
+            valid_locations = self.order_moves(valid_locations, tt_move, depth, PLAYER_PIECE, center)
             value = math.inf
             column = random.choice(valid_locations)
             for col in valid_locations:
-                row = board.determine_row_to_insert(col)
-                b_copy = board.copy()
-                b_copy.drop_piece(row, col, PLAYER_PIECE)
-                new_score = self.minmax(actions, coin, b_copy, depth-1, alpha, beta, True, game_logic, background)[1]
+                board.make_move(col, PLAYER_PIECE)
+                new_score = self.minmax(actions, coin, board, depth-1, alpha, beta, True, game_logic, background)[1]
+                board.undo_move()
                 if new_score < value:
                     value = new_score
                     column = col
                 beta = min(beta, value)
                 if alpha >= beta:
+                    self.record_cutoff(col, depth, PLAYER_PIECE)
                     break
+            self.store_result(board, depth, alpha_orig, beta_orig, value, column)
             return (column, value)
+    
+    def store_result(self, board, depth, alpha, beta, value, column):
+        """
+        Store the value and best move of a searched position, as an upper 
+        bound if it failed low, a lower bound if it failed high, exact 
+        otherwise
+        """
+        if value <= alpha:
+            bound = TranspositionTable.UPPER
+        elif value >= beta:
+            bound = TranspositionTable.LOWER
+        else:
+            bound = TranspositionTable.EXACT
+        self.tt.store(board.zobrist_hash, depth, bound, value, column)
         
     def learn(self, board, actions, chosen_action, game_over, game_logic):
         """
@@ -312,20 +746,97 @@ class MiniMaxPlayer(Player):
 # https://replit.com/talk/challenge/Connect-4-AI-using-Monte-Carlo-Tree-Search/10640
 # https://jyopari.github.io/MCTS
 
-class Node:
-    def __init__(self, piece, board, parent=None, move=None, exploration_coeff=1):
-        self.board = board.copy()
-        self.parent = parent
-        self.move = move
-        self.untriedMoves = board.get_available_actions()
-        self.childNodes = []
-        self.wins = 0
-        self.visits = 0
-        self.player = piece 
-        self.exploration_coeff = exploration_coeff
+class SearchTree():
+    """A class that stores a Monte Carlo search tree in preallocated NumPy 
+    arrays with one entry per node instead of one object per node. The 
+    children of a node are allocated next to each other when the node is
+    first expanded, and a child that has never been visited is an untried
+    move"""
+    
+    def __init__(self, piece, capacity=4096):
+        """
+        Initialize a tree with a root node reached by a move of the coin type
+        piece and room for capacity nodes
+        """
+        self.size = 0
+        self.allocate(capacity)
+        self.add_nodes(1, -1, -1, piece)
+        
+    def allocate(self, capacity):
+        """
+        Resize the arrays to hold capacity nodes, keeping the nodes so far
+        """
+        def resize(array, dtype, fill):
+            new_array = np.full(capacity, fill, dtype=dtype)
+            if array is not None:
+                new_array[:self.size] = array[:self.size]
+            return new_array
+        old = self.__dict__
+        self.visits = resize(old.get('visits'), np.int32, 0)
+        self.wins = resize(old.get('wins'), np.float64, 0)
+        self.parent = resize(old.get('parent'), np.int32, -1)
+        # -1 until the node is expanded
+        self.first_child = resize(old.get('first_child'), np.int32, -1)
+        self.num_children = resize(old.get('num_children'), np.int8, 0)
+        self.move = resize(old.get('move'), np.int8, -1)
+        # coin type of the move that leads to the node
+        self.player = resize(old.get('player'), np.int8, 0)
+        self.capacity = capacity
+        
+    def add_nodes(self, count, parent, moves, piece):
+        """
+        Append count nodes, children of parent reached by moves of the coin 
+        type piece, and return the index of the first one
+        """
+        while self.size + count > self.capacity:
+            self.allocate(self.capacity * 2)
+        first = self.size
+        self.size += count
+        self.parent[first:self.size] = parent
+        self.move[first:self.size] = moves
+        self.player[first:self.size] = piece
+        return first
+        
+    def expand(self, node, moves, piece):
+        """
+        Allocate a child of node for each of the available moves, all of 
+        them played by piece
+        """
+        self.first_child[node] = self.add_nodes(len(moves), node, moves, piece)
+        self.num_children[node] = len(moves)
         
-    # return child with largest UCT value
-    def selection(self):
+    def is_expanded(self, node):
+        return self.first_child[node] >= 0
+    
+    def get_children(self, node):
+        """
+        Return the indices of the children of node
+        """
+        first = int(self.first_child[node])
+        return np.arange(first, first + int(self.num_children[node]))
+    
+    def find_child(self, node, move):
+        """
+        Return the child of node reached by a move if it has been visited, 
+        None otherwise
+        """
+        for child in self.get_children(node).tolist():
+            if self.move[child] == move:
+                return child if self.visits[child] > 0 else None
+        return None
+    
+    def get_untried(self, node):
+        """
+        Return the indices of the children of node that have not been visited
+        """
+        first = int(self.first_child[node])
+        return np.flatnonzero(self.visits[first:first + int(self.num_children[node])] == 0) + first
+        
+    def selection(self, node, exploration_coeff):
+        """
+        Return the child of a fully expanded node with the largest UCT value,
+        computed for every child at once
+        """
         # Upper Confidence bounds applied to Trees
         # uct = Xj + sqrt(In(N)/Nj)
         # Xj is the win ratio for a child node
@@ -333,100 +844,371 @@ class Node:
         # Nj is the number of times the child node has been visited.
         # Xj represents exploitation, as it is a large value when the win rate is high
         # Second term represents exploration, as it is large when the number of visits for that node have been low.
-        uct = lambda x: x.wins / x.visits + self.exploration_coeff * np.sqrt(2 * np.log(self.visits) / x.visits)
-        return sorted(self.childNodes, key=uct)[-1]
-
-    # return child when move is taken
-    # remove move from current node
-    def expand(self, move, board, exploration_coeff=1):
-        child = Node(piece=board.prev_player, 
-                     board=board,
-                     parent=self,
-                     move=move,
-                     exploration_coeff=exploration_coeff)
-        self.untriedMoves.remove(move)
-        self.childNodes.append(child)
-        return child
+        first = int(self.first_child[node])
+        last = first + int(self.num_children[node])
+        visits = self.visits[first:last]
+        uct = self.wins[first:last] / visits + exploration_coeff * np.sqrt(2 * np.log(self.visits[node]) / visits)
+        return first + int(np.argmax(uct))
+    
+    def backpropagate(self, path, results):
+        """
+        Add a visit to every node on the path and the result of the playout
+        for the coin type of the move leading to each node, where results is
+        indexed by coin type
+        """
+        path = np.array(path)
+        self.visits[path] += 1
+        self.wins[path] += np.take(results, self.player[path])
+        
+    def get_subtree_size(self, node):
+        """
+        Return the number of nodes in the subtree of node, counted one level
+        at a time
+        """
+        size = 1
+        level = np.array([node])
+        while len(level):
+            level = level[self.first_child[level] >= 0]
+            counts = self.num_children[level].astype(np.int64)
+            size += int(counts.sum())
+            offsets = np.cumsum(counts) - counts
+            level = np.repeat(self.first_child[level], counts) + np.arange(int(counts.sum())) - np.repeat(offsets, counts)
+        return size
+        
+    def extract(self, node):
+        """
+        Return a new tree holding only the subtree of node, copied one level
+        at a time, so that the rest of this tree can be freed. The new arrays
+        are sized to the subtree with as much room again for the next search
+        """
+        tree = SearchTree(self.player[node], capacity=2 * self.get_subtree_size(node))
+        tree.visits[0] = self.visits[node]
+        tree.wins[0] = self.wins[node]
+        (old_level, new_level) = (np.array([node]), np.array([0]))
+        while len(old_level):
+            expanded = self.first_child[old_level] >= 0
+            tree.first_child[new_level[~expanded]] = -1
+            (old_level, new_level) = (old_level[expanded], new_level[expanded])
+            counts = self.num_children[old_level].astype(np.int64)
+            total = int(counts.sum())
+            offsets = np.cumsum(counts) - counts
+            # index of every child within its own family
+            ranks = np.arange(total) - np.repeat(offsets, counts)
+            old_children = np.repeat(self.first_child[old_level], counts) + ranks
+            first = tree.size
+            tree.size += total
+            new_children = np.arange(first, tree.size)
+            tree.first_child[new_level] = first + offsets
+            tree.num_children[new_level] = counts
+            tree.parent[new_children] = np.repeat(new_level, counts)
+            for name in ('visits', 'wins', 'move', 'player'):
+                getattr(tree, name)[new_children] = getattr(self, name)[old_children]
+            (old_level, new_level) = (old_children, new_children)
+        return tree
+    
+    def nbytes(self):
+        """
+        Return the number of bytes used by the arrays of the tree
+        """
+        return sum(getattr(self, name).nbytes for name in ('visits', 'wins', 'parent', 'first_child', 'num_children', 'move', 'player'))
 
-    def update(self, result):
-        self.wins += result
-        self.visits += 1
+def mcts_worker(args):
+    """
+    Run one independent search from a position in a worker process and 
+    return the number of playouts and the (wins, visits) of every move at 
+    the root
+    """
+    (position, coin_type, exploration_coeff, itermax, timeout, seed) = args
+    random.seed(seed)
+    player = MonteCarloPlayer(coin_type, exploration_coeff)
+    tree = SearchTree(position.prev_player)
+    player.mcts(None, position, itermax, tree, None, None, None, timeout)
+    children = tree.get_children(0)
+    return (player.playouts, {move: (wins, visits) for (move, wins, visits)
+                              in zip(tree.move[children].tolist(), tree.wins[children].tolist(), tree.visits[children].tolist()) if visits > 0})
 
-class MonteCarloPlayer(Player):
+class MonteCarloPlayer(PonderingPlayer):
     """A class that represents an AI using montecarlo algorithm"""
     
-    def __init__(self, coin_type, exploration_coeff):
+    def __init__(self, coin_type, exploration_coeff, num_workers=None, itermax=20000, timeout=5):
         """
-        Initialize a montecarlo player with coin type
+        Initialize a montecarlo player with coin type that runs up to itermax
+        playouts and timeout seconds per move. With num_workers, every move 
+        is searched root-parallel on a pool of that many processes
         """
-        self.currentNode = None
-        Player.__init__(self, coin_type)
+        self.num_workers = num_workers
+        self.itermax = itermax
+        self.timeout = timeout
+        self.pool = None
+        self.playouts = 0
+        self.tree = None
+        PonderingPlayer.__init__(self, coin_type)
         self.cur_player = self.coin_type
         self.prev_player = 2 if self.cur_player == 1 else 1 
         self.exploration_coeff=exploration_coeff 
+        # the position reached by the move chosen last turn and the moves 
+        # that lead to it from the root of the tree, used to find the part of
+        # the tree that is still relevant on the next turn
+        self.tree_path = []
+        self.last_position = None
+        self.reused_visits = 0
     
     def choose_action(self, state, actions, coin, board, game_logic, background):
         board.prev_player = self.prev_player
         board.current_player = self.cur_player
+        if self.num_workers is not None:
+            return self.parallel_mcts(board, self.itermax, self.timeout)
 
-        self.currentNode = Node(piece=board.prev_player,board=board, exploration_coeff=self.exploration_coeff)
-        return self.mcts(actions, board, 20000, self.currentNode, coin, game_logic, background, 5)
+        self.tree = self.reuse_tree(board)
+        if self.tree is None:
+            self.tree = SearchTree(board.prev_player)
+        self.reused_visits = int(self.tree.visits[0])
+        move = self.mcts(actions, board, self.itermax, self.tree, coin, game_logic, background, self.timeout)
+        
+        self.tree_path = [move]
+        self.last_position = board.copy()
+        self.last_position.make_move(move, self.cur_player)
+        return move
+    
+    def ponder(self, position):
+        """
+        Keep growing the tree from the position reached by the move chosen 
+        last turn, up to the playouts and time of a normal move. The tree is
+        first re-rooted at that position
+        """
+        if self.num_workers is not None or self.last_position is None or position.masks != self.last_position.masks:
+            return
+        node = 0 if self.tree is not None else None
+        for move in self.tree_path:
+            if node is not None:
+                node = self.tree.find_child(node, move)
+        self.tree = self.tree.extract(node) if node is not None else SearchTree(self.cur_player)
+        self.tree_path = []
+        position.prev_player = self.cur_player
+        position.current_player = self.prev_player
+        self.mcts(None, position, self.itermax, self.tree, None, None, None, self.timeout)
+    
+    def reuse_tree(self, board):
+        """
+        Return the subtree of the previous search for the position on the
+        board if it is the one reached by the move chosen last turn and a 
+        single reply of the opponent, copied out of the old tree so that the
+        old tree can be freed. Return None if there is no such subtree
+        """
+        if self.tree is None or self.last_position is None:
+            return None
+        position = self.last_position
+        self.last_position = None
+        reply = board.prev_move_col
+        if board.num_moves != position.num_moves + 1 or reply is None or position.check_column_fill(reply):
+            return None
+        position.make_move(reply, self.prev_player)
+        if position.masks != board.masks:
+            return None
+        
+        node = 0
+        for move in self.tree_path + [reply]:
+            node = self.tree.find_child(node, move)
+            if node is None:
+                return None
+        return self.tree.extract(node)
 
-    def mcts(self, actions, board, itermax, currentNode, coin, game_logic, background, timeout=5):
-        rootnode = Node(piece=board.prev_player,board=board, exploration_coeff=self.exploration_coeff)
-        if currentNode is not None: rootnode = currentNode
+    def parallel_mcts(self, board, itermax, timeout=5):
+        """
+        Run an independent search with its own random seed from the position
+        on the board in every worker process, each with up to itermax 
+        playouts and timeout seconds, and pick the move with the best win 
+        ratio over the visits and wins of all the searches summed together
+        """
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.num_workers)
+        position = board.copy()
+        seed = random.randrange(2**32)
+        jobs = [(position, self.coin_type, self.exploration_coeff, itermax, timeout, seed + i) for i in range(self.num_workers)]
+        
+        wins = {}
+        visits = {}
+        self.playouts = 0
+        for (playouts, children) in self.pool.imap_unordered(mcts_worker, jobs):
+            self.playouts += playouts
+            for (move, (child_wins, child_visits)) in children.items():
+                wins[move] = wins.get(move, 0) + child_wins
+                visits[move] = visits.get(move, 0) + child_visits
+        if not visits:
+            return random.choice(board.get_available_actions())
+        return max(visits, key=lambda move: wins[move] / visits[move])
+    
+    def close(self):
+        """
+        Shut down the worker processes of the root-parallel search
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        
+    def mcts(self, actions, board, itermax, tree, coin, game_logic, background, timeout=5):
+        if tree is None: tree = SearchTree(board.prev_player)
 
         start = time.perf_counter()
-        for i in range(itermax):
-            node = rootnode
-            state = board.copy()
+        # every playout makes its moves in place on one copy of the board and
+        # takes them all back once its result is known
+        state = board.copy()
+        self.playouts = 0
+        while self.playouts < itermax:
+            node = 0
+            path = [0]
+            # whether the last move of the playout won the game, checked once
+            # per move and only on the lines through the piece dropped
+            won = False
             
-            # selection
-            while node.untriedMoves == [] and node.childNodes != []:
+            while True:
+                if not tree.is_expanded(node):
+                    moves = state.get_available_actions()
+                    if not moves:
+                        break
+                    tree.expand(node, moves, state.current_player)
+                untried = tree.get_untried(node)
+                # expand
+                if len(untried):
+                    node = int(random.choice(untried))
+                    state.make_move(int(tree.move[node]), state.current_player)
+                    path.append(node)
+                    won = state.is_last_move_win()
+                    break
+                # selection
                 # keep going down the tree based on best UCT values until terminal or unexpanded node
-                
-                node = node.selection()
-                row = state.determine_row_to_insert(node.move)
-                state.drop_piece(row, node.move, state.current_player)
-
-            # expand
-            if node.untriedMoves != []:
-                col = random.choice(node.untriedMoves)
-                row = state.determine_row_to_insert(col)
-                state.drop_piece(row, col, state.current_player)
-                node = node.expand(col, state, self.exploration_coeff)
+                node = tree.selection(node, self.exploration_coeff)
+                state.make_move(int(tree.move[node]), state.current_player)
+                path.append(node)
+                if state.is_last_move_win():
+                    won = True
+                    break
 
             # rollout
-            while state.get_available_actions():
-                col = random.choice(state.get_available_actions())
-                row = state.determine_row_to_insert(col)
-                state.drop_piece(row, col, state.current_player)
-                if state.is_winning_move(state.prev_player):
-                    break    
+            while not won and state.available_actions:
+                col = random.choice(state.available_actions)
+                state.make_move(col, state.current_player)
+                won = state.is_last_move_win()
 
             # backpropagate
-            while node is not None:
-                node.update(self.result(actions, state, node.player))
-                node = node.parent
+            tree.backpropagate(path, self.result(state, won))
+                
+            while state.move_history:
+                state.undo_move()
+            self.playouts += 1
 
             duration = time.perf_counter() - start
-            if duration > timeout: break
+            if duration > timeout or self.stop_event.is_set(): break
 
-        win_ratio = lambda x: x.wins / x.visits
-        sortedChildNodes = sorted(rootnode.childNodes, key=win_ratio)[::-1]
-        return sortedChildNodes[0].move
+        children = tree.get_children(0)
+        children = children[tree.visits[children] > 0]
+        if len(children) == 0:
+            # no playout was run
+            return random.choice(board.get_available_actions())
+        win_ratio = tree.wins[children] / tree.visits[children]
+        return int(tree.move[children[np.argmax(win_ratio)]])
 
-    def result(self, actions, board, piece):
-        opp_player = 2 if piece == 1 else 1  
-        if board.is_winning_move(piece):  # player wins
-            return 1
-        elif board.is_winning_move(opp_player):  # opponent wins
-            return 0
-        elif len(board.get_available_actions()) == 0:  # draw
-            return 0.5
+    def result(self, board, won):
+        """
+        Return the result of a finished playout for each coin type, given 
+        whether the last move on the board won the game
+        """
+        results = [0, 0.5, 0.5]  # draw
+        if won:
+            results[board.prev_player] = 1  # player wins
+            results[3 - board.prev_player] = 0  # opponent wins
+        return results
     
     def learn(self, board, actions, chosen_action, game_over, game_logic):
         """
         A method to make a move and update any learning parameters if any
         """
-        pass
\ No newline at end of file
+        pass
+
+class SolverPlayer(Player):
+    """A class that represents an AI that plays perfectly by solving the
+    positions it has to move in exactly"""
+    
+    # seconds per move when no time budget is given
+    DEFAULT_TIME_BUDGET = 5
+    # share of the time budget given to the exact search, the rest is left
+    # for a heuristic search if the position cannot be solved in time
+    SOLVE_SHARE = 0.75
+    
+    def __init__(self, coin_type, time_budget=None, book_path=DEFAULT_BOOK_PATH):
+        """
+        Initialize a solver player with coin type. The opening book at 
+        book_path is used for the first moves when the file exists
+        """
+        Player.__init__(self, coin_type)
+        self.time_budget = time_budget if time_budget is not None else SolverPlayer.DEFAULT_TIME_BUDGET
+        self.solver = Solver(BOARD_SIZE[0], BOARD_SIZE[1])
+        self.book = OpeningBook(book_path) if book_path is not None and os.path.exists(book_path) else None
+        if self.book is not None and (self.book.num_rows, self.book.num_columns) != BOARD_SIZE:
+            # a book built for another board size has no positions of this one
+            self.book.close()
+            self.book = None
+        self.fallback = MiniMaxPlayer(coin_type)
+        # exact score of the last position solved, None if it was not solved
+        self.last_score = None
+        # where the last move came from: 'book', 'solver' or 'minimax'
+        self.last_source = None
+        # number of moves played by the minimax fallback, which are not
+        # perfect
+        self.fallback_moves = 0
+        
+    def choose_action(self, state, actions, coin, board, game_logic, background):
+        """
+        Play the best move of the opening book, or solve the position within
+        the time budget. A position that cannot be solved in time is searched
+        by a minimax player for the rest of the budget, which is counted in
+        fallback_moves and shown by last_source
+        """
+        start = time.perf_counter()
+        current = board.masks[self.coin_type]
+        mask = board.masks[1] | board.masks[2]
+        move = self.book_move(current, mask, board.num_moves, actions)
+        if move is not None:
+            self.last_source = 'book'
+            return move
+        try:
+            (move, self.last_score) = self.solver.best_move(current, mask, board.num_moves, 
+                                                            start + SolverPlayer.SOLVE_SHARE * self.time_budget)
+            self.last_source = 'solver'
+            return move
+        except SearchTimeout:
+            self.last_score = None
+            self.last_source = 'minimax'
+            self.fallback_moves += 1
+            self.fallback.time_budget = max(start + self.time_budget - time.perf_counter(), 0)
+            return self.fallback.choose_action(state, actions, coin, board, game_logic, background)
+        
+    def book_move(self, current, mask, num_moves, actions):
+        """
+        Return the move with the best score in the opening book, None if the
+        book does not hold every position the moves lead to
+        """
+        if self.book is None or num_moves >= self.book.depth:
+            return None
+        solver = self.solver
+        possible = solver.possible_moves(mask)
+        winning = solver.winning_slots(current, mask) & possible
+        (best_move, best_score) = (None, None)
+        for col in actions:
+            move = possible & solver.column_masks[col]
+            if move & winning:
+                return col
+            child = (current ^ mask, mask | move)
+            score = self.book.get(min(solver.get_key(*child), solver.get_mirrored_key(*child)))
+            if score is None:
+                return None
+            if best_score is None or -score > best_score:
+                (best_move, best_score) = (col, -score)
+        self.last_score = best_score
+        return best_move
+    
+    def learn(self, board, actions, chosen_action, game_over, game_logic):
+        """
+        The solver player does not learn from its actions
+        """
+        pass
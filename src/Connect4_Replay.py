@@ -0,0 +1,301 @@
+from Connect4_Globals import *
+from Connect4_RLPlayers import ComputerPlayer, SarsaLearningPlayer
+from Connect4_Headless import HeadlessMatch
+from Connect4_GameLog import GameLog
+import argparse
+
+class ReplayBuffer():
+    """A class that stores the moves of one coin type as transitions of a
+    tabular learner, from game logs or from arrays of boards. Every distinct
+    position is stored once under the key the learner would give it, so the
+    transitions themselves are small arrays of indices that a whole batch of
+    backups can be computed from at once"""
+
+    def __init__(self, player, coin_type=None, num_rows=BOARD_SIZE[0], num_columns=BOARD_SIZE[1]):
+        """
+        Initialize an empty buffer of the moves of coin_type, by default the
+        coin type of player, keyed and rewarded the way the tabular learner
+        player keys and rewards its own moves
+        """
+        self.player = player
+        self.coin_type = coin_type if coin_type is not None else player.get_coin_type()
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        # the states under the learner's keys, and the index of every one
+        self.states = []
+        self.state_index = {}
+        # the bytes of every board seen, mapped to the index of its key state
+        # and whether the key state is its mirror image
+        self.board_index = {}
+        # the reward of a move that did not end the game and of one that did,
+        # indexed by the coin type of the winner
+        self.step_reward = player.get_reward(False, 0)
+        self.final_rewards = np.array([player.get_reward(True, winner) for winner in range(3)])
+        self.chunks = []
+        self.arrays = None
+
+    def __len__(self):
+        return sum(len(chunk[0]) for chunk in self.chunks)
+
+    def index_boards(self, boards):
+        """
+        Return the key state index of every board of an array of 2d boards
+        and whether the key state is its mirror image
+        """
+        flat = np.ascontiguousarray(boards.reshape(len(boards), -1), dtype=np.int8)
+        (unique, inverse) = np.unique(flat.view(np.dtype((np.void, flat.shape[1]))).ravel(), return_inverse=True)
+        indices = np.zeros(len(unique), dtype=np.int32)
+        mirrored = np.zeros(len(unique), dtype=bool)
+        for (i, board) in enumerate(unique.tolist()):
+            if board not in self.board_index:
+                rows = np.frombuffer(board, dtype=np.int8).reshape(self.num_rows, self.num_columns).tolist()
+                # the learner keys a mirrored state with mirrored actions, so
+                # column 0 comes back as the last column
+                (state, action) = self.player.get_key(tuple(map(tuple, rows)), 0)
+                if state not in self.state_index:
+                    self.state_index[state] = len(self.states)
+                    self.states.append(state)
+                self.board_index[board] = (self.state_index[state], action != 0)
+            (indices[i], mirrored[i]) = self.board_index[board]
+        inverse = inverse.ravel()
+        return (indices[inverse], mirrored[inverse])
+
+    def add_transitions(self, prev_boards, chosen_actions, rewards, result_boards, legal_moves):
+        """
+        Add a batch of moves, given as arrays of the 2d boards before and
+        after every move, the column played, the reward and a boolean row of
+        the columns that could be played, the same arguments the learners'
+        update takes for a single move
+        """
+        num_moves = len(prev_boards)
+        (index, mirrored) = self.index_boards(np.concatenate([prev_boards, result_boards]))
+        (states, next_states) = (index[:num_moves], index[num_moves:])
+        (mirrored, next_mirrored) = (mirrored[:num_moves], mirrored[num_moves:])
+        chosen_actions = np.asarray(chosen_actions)
+        last = self.num_columns - 1
+        self.chunks.append((states,
+                            np.where(mirrored, last - chosen_actions, chosen_actions).astype(np.int8),
+                            np.asarray(rewards, dtype=np.float64),
+                            next_states,
+                            np.where(next_mirrored, last - chosen_actions, chosen_actions).astype(np.int8),
+                            np.where(next_mirrored[:, None], legal_moves[:, ::-1], legal_moves)))
+        self.arrays = None
+
+    def add_games(self, moves, num_moves, winners, first_types):
+        """
+        Add the moves of coin_type in a batch of games given as arrays, the
+        way GameLog.decode returns them. The boards before and after every
+        move are rebuilt for the whole batch at once
+        """
+        (num_games, max_plies) = moves.shape
+        plies = np.arange(max_plies)
+        played = plies < num_moves[:, None]
+        # the coin type that plays every ply and the number of earlier moves
+        # in the column of every move, which gives the row it lands in
+        pieces = np.where(plies % 2 == 0, first_types[:, None], 3 - first_types[:, None]).astype(np.int8)
+        columns = moves == np.arange(self.num_columns)[:, None, None]
+        heights = ((np.cumsum(columns, axis=2) - columns) * columns).sum(axis=0)
+        (games, move_plies) = np.nonzero(played)
+        rows = self.num_rows - 1 - heights[games, move_plies]
+        cols = moves[games, move_plies]
+        # the ply every slot was filled at, max_plies for the empty ones, so
+        # that the board before ply p holds the slots filled before p
+        filled = np.full((num_games, self.num_rows, self.num_columns), max_plies, dtype=np.int8)
+        filled[games, rows, cols] = move_plies
+        board_pieces = np.zeros((num_games, self.num_rows, self.num_columns), dtype=np.int8)
+        board_pieces[games, rows, cols] = pieces[games, move_plies]
+
+        (games, move_plies) = np.nonzero(played & (pieces == self.coin_type))
+        game_filled = filled[games]
+        game_pieces = board_pieces[games]
+        ply = move_plies[:, None, None]
+        prev_boards = np.where(game_filled < ply, game_pieces, 0)
+        result_boards = np.where(game_filled <= ply, game_pieces, 0)
+        game_over = move_plies == num_moves[games] - 1
+        rewards = np.where(game_over, self.final_rewards[winners[games]], self.step_reward)
+        self.add_transitions(prev_boards, moves[games, move_plies], rewards, result_boards, prev_boards[:, 0, :] == 0)
+
+    def add_game_log(self, log, batch_size=16384):
+        """
+        Add the moves of coin_type in every game of a GameLog
+        """
+        if (log.num_rows, log.num_columns) != (self.num_rows, self.num_columns):
+            raise ValueError('%s holds %dx%d games, expected %dx%d' % (log.path, log.num_rows, log.num_columns,
+                                                                        self.num_rows, self.num_columns))
+        for batch in log.iter_batches(batch_size):
+            self.add_games(*batch)
+
+    def get_arrays(self):
+        """
+        Return the transitions as arrays of the key state index and action of
+        every move, its reward, the key state index of the resulting state
+        with the action and the playable columns as the learner looks them
+        up in that state
+        """
+        if not self.chunks:
+            raise ValueError('The replay buffer holds no transitions')
+        if self.arrays is None:
+            self.arrays = tuple(np.concatenate(column) for column in zip(*self.chunks))
+            self.chunks = [self.arrays]
+        return self.arrays
+
+class OfflineTrainer():
+    """A class that trains a Q-learning or Sarsa-learning player from a
+    ReplayBuffer with batches of backups computed in NumPy. The Q values of
+    the states in the buffer are copied into an array, sampled uniformly or
+    by the size of their last error, and written back into the player's
+    Q-table with commit"""
+
+    def __init__(self, player, buffer, batch_size=1024, prioritized=False, priority_exponent=0.6,
+                 importance_exponent=0.4, seed=None):
+        """
+        Initialize a trainer of a tabular learner from the transitions of a
+        buffer, batch_size at a time. With prioritized, transitions are drawn
+        in proportion to their last error raised to priority_exponent and
+        their updates are scaled by importance sampling weights with
+        importance_exponent, otherwise they are drawn uniformly
+        """
+        self.player = player
+        self.buffer = buffer
+        self.batch_size = batch_size
+        self.prioritized = prioritized
+        self.priority_exponent = priority_exponent
+        self.importance_exponent = importance_exponent
+        self.random = np.random.default_rng(seed)
+        self.sarsa = isinstance(player, SarsaLearningPlayer)
+        (self.states, self.actions, self.rewards, self.next_states, self.next_actions, self.legal_moves) = buffer.get_arrays()
+        # the Q value the player holds for every action of every state, the
+        # optimistic default for the entries it has not stored yet
+        self.q = np.array([[player.getQ(state, a) for a in range(buffer.num_columns)] for state in buffer.states])
+        self.updated = np.zeros(self.q.shape, dtype=bool)
+        # the priorities raised to priority_exponent, where new transitions
+        # start with the largest priority so that every one is likely to be
+        # drawn at least once
+        self.priorities = np.ones(len(self.states))
+        self.num_updates = 0
+
+    def get_errors(self, batch):
+        """
+        Return the error of the Q value of every transition of a batch, the
+        same backup the player makes in update for a single move
+        """
+        if self.sarsa:
+            future = self.q[self.next_states[batch], self.next_actions[batch]]
+        else:
+            future = np.where(self.legal_moves[batch], self.q[self.next_states[batch]], -np.inf).max(axis=1)
+        targets = self.rewards[batch] + self.player.gamma * future
+        return targets - self.q[self.states[batch], self.actions[batch]]
+
+    def sample(self):
+        """
+        Return the indices of a batch of transitions and the weight of the
+        update of each
+        """
+        if not self.prioritized:
+            return (self.random.integers(len(self.states), size=self.batch_size), 1.0)
+        cumulative = np.cumsum(self.priorities)
+        batch = np.searchsorted(cumulative, self.random.random(self.batch_size) * cumulative[-1], side='right')
+        batch = np.minimum(batch, len(self.states) - 1)
+        weights = (len(self.states) * self.priorities[batch] / cumulative[-1]) ** -self.importance_exponent
+        return (batch, weights / weights.max())
+
+    def train_batch(self):
+        """
+        Draw a batch of transitions and apply their updates together,
+        averaging the updates of the same entry so that an entry drawn many
+        times moves no further than a single update would. Return the mean
+        absolute error of the batch
+        """
+        (batch, weights) = self.sample()
+        errors = self.get_errors(batch)
+        num_columns = self.q.shape[1]
+        (entries, inverse, counts) = np.unique(self.states[batch] * num_columns + self.actions[batch],
+                                               return_inverse=True, return_counts=True)
+        updates = np.bincount(inverse, self.player.alpha * weights * errors) / counts
+        (states, actions) = np.divmod(entries, num_columns)
+        self.q[states, actions] += updates
+        self.updated[states, actions] = True
+        if self.prioritized:
+            self.priorities[batch] = (np.abs(errors) + 1e-6) ** self.priority_exponent
+        self.num_updates += len(batch)
+        return float(np.abs(errors).mean())
+
+    def train(self, num_batches, callback=None):
+        """
+        Train on num_batches batches, calling callback with the number of the
+        batch and its mean absolute error after each, and return the errors
+        """
+        errors = []
+        for i in range(num_batches):
+            errors.append(self.train_batch())
+            if callback is not None:
+                callback(i, errors[-1])
+        return errors
+
+    def commit(self):
+        """
+        Write the Q value of every entry updated so far into the player's
+        Q-table and return the number of entries written
+        """
+        (states, actions) = np.nonzero(self.updated)
+        values = self.q[states, actions].tolist()
+        for (s, a, value) in zip(states.tolist(), actions.tolist(), values):
+            self.player.setQ(self.buffer.states[s], a, value)
+        self.updated[:] = False
+        return len(values)
+
+def main(argv=None):
+    """
+    Command line entry point that trains a tabular learner from a game log,
+    prints the error as it trains and the win rate of the result against a
+    random player, and saves the Q-table
+    """
+    parser = argparse.ArgumentParser(description='Train a Connect 4 tabular learner offline from a game log')
+    parser.add_argument('game_log', help='game log written with --game-log')
+    parser.add_argument('player_type', help='qlearner or sarsalearner')
+    parser.add_argument('--coin-type', type=int, default=1, choices=(1, 2), help='learn from the moves of this coin type')
+    parser.add_argument('--batches', type=int, default=10000, help='number of batches of backups')
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--prioritized', action='store_true', help='draw transitions by the size of their last error')
+    parser.add_argument('--alpha', type=float, default=0.3)
+    parser.add_argument('--gamma', type=float, default=0.9)
+    parser.add_argument('--symmetric', action='store_true', help='share entries between mirrored positions')
+    parser.add_argument('--q-table', default=None, help='start from the Q-table saved in this file')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--evaluate', type=int, default=0, help='games to play greedily against a random player after training')
+    parser.add_argument('--save', default=None, help='save the Q-table to this file')
+    args = parser.parse_args(argv)
+
+    if args.player_type not in ('qlearner', 'sarsalearner'):
+        parser.error('only qlearner and sarsalearner can be trained offline')
+    computer = ComputerPlayer(args.coin_type, args.player_type, 0.0, args.alpha, args.gamma, symmetric=args.symmetric)
+    if args.q_table is not None:
+        computer.player.load(args.q_table)
+    log = GameLog(args.game_log)
+    start_time = time.perf_counter()
+    buffer = ReplayBuffer(computer.player, num_rows=log.num_rows, num_columns=log.num_columns)
+    buffer.add_game_log(log)
+    print('Loaded %d moves of %d games, %d states in %f seconds.' % (len(buffer), len(log), len(buffer.states),
+                                                                    time.perf_counter() - start_time))
+
+    start_time = time.perf_counter()
+    trainer = OfflineTrainer(computer.player, buffer, args.batch_size, args.prioritized, seed=args.seed)
+    report_every = max(args.batches // 10, 1)
+    def report(i, error):
+        if (i + 1) % report_every == 0:
+            print('Batch %d mean error: %f' % (i + 1, error))
+    trainer.train(args.batches, report)
+    written = trainer.commit()
+    print('Trained %d backups in %f seconds, %d Q-table entries written.' % (trainer.num_updates, time.perf_counter() - start_time, written))
+
+    if args.evaluate > 0:
+        opponent = ComputerPlayer(3 - args.coin_type, 'random')
+        results = HeadlessMatch(computer, opponent).run(args.evaluate, keep_curves=False)
+        print('Win rate against a random player: ', results['p1_win_rate'])
+    if args.save is not None:
+        computer.player.save(args.save)
+    log.close()
+    return trainer
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+from Connect4_Globals import *
+from Connect4_Utilities import TranspositionTable, SearchTimeout
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+
+# File layout of an opening book:
+#   header - BOOK_HEADER, padded to BOOK_HEADER_SIZE bytes
+#   keys   - num_positions uint64 position keys, sorted ascending
+#   scores - num_positions int8 exact scores, one per key
+BOOK_MAGIC = b'C4BOOK\0\0'
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct('<8sHBBBQ')
+BOOK_HEADER_SIZE = 32
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Connect4_OpeningBook.bin')
+
+class Solver():
+    """A class that solves connect 4 positions exactly with a negamax search
+    on bitboards. A position is given by the bitboard of the player to move,
+    the bitboard of all the pieces and the number of moves played, with the
+    same bit layout as Position. The score of a position is positive if the
+    player to move wins, negative if they lose and 0 for a draw, and the
+    earlier the win the larger the score: a win with the last piece of the
+    player scores 1"""
+
+    # Fibonacci hashing multiplier spreading position keys over the
+    # transposition table
+    HASH_MULTIPLIER = 11400714819323198485
+
+    def __init__(self, num_rows=BOARD_SIZE[0], num_columns=BOARD_SIZE[1], tt_size=1 << 20):
+        """
+        Initialize a solver for boards with num_rows rows and num_columns
+        columns with a transposition table of tt_size entries
+        """
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        self.total_slots = num_rows * num_columns
+        self.stride = num_rows + 1
+        self.bottom_mask = sum(1 << (col * self.stride) for col in range(num_columns))
+        self.board_mask = self.bottom_mask * ((1 << num_rows) - 1)
+        self.column_masks = [((1 << num_rows) - 1) << (col * self.stride) for col in range(num_columns)]
+        # center columns first, as they are part of the most lines
+        center = num_columns // 2
+        self.column_order = [center + (1 - 2 * (i % 2)) * (i + 1) // 2 for i in range(num_columns)]
+        # upper bounds on the scores of the positions searched
+        self.tt = TranspositionTable(tt_size)
+        self.nodes = 0
+        self.deadline = None
+
+    def get_key(self, current, mask):
+        """
+        Return a key that is unique to a position
+        """
+        return current + mask
+
+    def get_hash(self, key):
+        """
+        Return a hash of a position key for the transposition table. The key
+        is multiplied by an odd number and its halves swapped, so the hash is
+        as unique as the key and its low bits depend on the whole key
+        """
+        product = (key * Solver.HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF
+        return (product >> 32) | ((product & 0xFFFFFFFF) << 32)
+
+    def get_mirrored_key(self, current, mask):
+        """
+        Return the key of the position mirrored left to right
+        """
+        return self.get_key(self.mirror(current), self.mirror(mask))
+
+    def mirror(self, bitboard):
+        """
+        Return a bitboard with its columns in reverse order
+        """
+        stride = self.stride
+        column_bits = (1 << stride) - 1
+        result = 0
+        for col in range(self.num_columns):
+            result |= ((bitboard >> (col * stride)) & column_bits) << ((self.num_columns - 1 - col) * stride)
+        return result
+
+    def winning_slots(self, current, mask):
+        """
+        Return a bitboard of the empty slots that would complete four in a
+        row for the pieces in current
+        """
+        h = self.num_rows
+        # vertical
+        r = (current << 1) & (current << 2) & (current << 3)
+        # horizontal and both diagonals
+        for shift in (h + 1, h, h + 2):
+            p = (current << shift) & (current << (2 * shift))
+            r |= p & (current << (3 * shift))
+            r |= p & (current >> shift)
+            p = (current >> shift) & (current >> (2 * shift))
+            r |= p & (current << shift)
+            r |= p & (current >> (3 * shift))
+        return r & (self.board_mask ^ mask)
+
+    def possible_moves(self, mask):
+        """
+        Return a bitboard of the lowest empty slot of every column that is
+        not full
+        """
+        return (mask + self.bottom_mask) & self.board_mask
+
+    def can_win_next(self, current, mask):
+        """
+        Return True iff the player to move can win with their next piece
+        """
+        return bool(self.winning_slots(current, mask) & self.possible_moves(mask))
+
+    def non_losing_moves(self, current, mask):
+        """
+        Return a bitboard of the moves that do not let the opponent win with
+        their next piece, 0 if every move loses. Must not be called when the
+        player to move can win with their next piece
+        """
+        possible = self.possible_moves(mask)
+        opponent_win = self.winning_slots(current ^ mask, mask)
+        forced = possible & opponent_win
+        if forced:
+            if forced & (forced - 1):
+                # the opponent has two winning moves, only one can be blocked
+                return 0
+            possible = forced
+        # never play right under a slot where the opponent would win
+        return possible & ~(opponent_win >> 1)
+
+    def ordered_moves(self, current, mask, moves):
+        """
+        Return the single bit moves of a bitboard of moves, the ones that
+        create the most winning slots first and otherwise the center first
+        """
+        scored = []
+        for (i, col) in enumerate(self.column_order):
+            move = moves & self.column_masks[col]
+            if move:
+                scored.append((-bin(self.winning_slots(current | move, mask)).count('1'), i, move))
+        scored.sort()
+        return [move for (score, i, move) in scored]
+
+    def negamax(self, current, mask, num_moves, alpha, beta):
+        """
+        Return the exact score of a position if it is within (alpha, beta),
+        an upper bound of it if it is at most alpha and a lower bound if it
+        is at least beta. The player to move must not be able to win with
+        their next piece
+        """
+        self.nodes += 1
+        if self.deadline is not None and (self.nodes & 1023) == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        moves = self.non_losing_moves(current, mask)
+        if moves == 0:
+            return -((self.total_slots - num_moves) // 2)
+        if num_moves >= self.total_slots - 2:
+            return 0
+
+        # the opponent cannot win with their next piece
+        lower = -((self.total_slots - 2 - num_moves) // 2)
+        if alpha < lower:
+            alpha = lower
+            if alpha >= beta:
+                return alpha
+        # the player to move cannot win with their next piece
+        upper = (self.total_slots - 1 - num_moves) // 2
+        position_hash = self.get_hash(self.get_key(current, mask))
+        entry = self.tt.lookup(position_hash)
+        if entry is not None:
+            upper = entry[3]
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+
+        for move in self.ordered_moves(current, mask, moves):
+            # the pieces of the opponent become the pieces to move
+            score = -self.negamax(current ^ mask, mask | move, num_moves + 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        self.tt.store(position_hash, 0, TranspositionTable.UPPER, alpha, None)
+        return alpha
+
+    def solve(self, current, mask, num_moves, deadline=None):
+        """
+        Return the exact score of a position, narrowing the range of possible
+        scores with null window searches. With a deadline from
+        time.perf_counter, raise SearchTimeout once it is passed
+        """
+        self.deadline = deadline
+        if self.can_win_next(current, mask):
+            return (self.total_slots + 1 - num_moves) // 2
+        low = -((self.total_slots - num_moves) // 2)
+        high = (self.total_slots + 1 - num_moves) // 2
+        while low < high:
+            middle = low + (high - low) // 2
+            # test the scores closest to 0 first, they are the most likely
+            if middle <= 0 and int(low / 2) < middle:
+                middle = int(low / 2)
+            elif middle >= 0 and int(high / 2) > middle:
+                middle = int(high / 2)
+            score = self.negamax(current, mask, num_moves, middle, middle + 1)
+            if score <= middle:
+                high = score
+            else:
+                low = score
+        return low
+
+    def best_move(self, current, mask, num_moves, deadline=None):
+        """
+        Return a column that keeps the exact score of a position and that
+        score
+        """
+        score = self.solve(current, mask, num_moves, deadline)
+        possible = self.possible_moves(mask)
+        moves = self.winning_slots(current, mask) & possible
+        if not moves:
+            moves = self.non_losing_moves(current, mask)
+            if not moves:
+                # every move loses, as early as the opponent can manage
+                moves = possible
+        ordered = self.ordered_moves(current, mask, moves)
+        if score <= -((self.total_slots - num_moves) // 2) or self.winning_slots(current, mask) & possible:
+            return (self.get_column(ordered[0]), score)
+        for move in ordered:
+            # a null window test tells whether the move keeps the score
+            if -self.negamax(current ^ mask, mask | move, num_moves + 1, -score, -score + 1) >= score:
+                return (self.get_column(move), score)
+        return (self.get_column(ordered[0]), score)
+
+    def get_column(self, move):
+        """
+        Return the column of a single bit move
+        """
+        return (move.bit_length() - 1) // self.stride
+
+class OpeningBook():
+    """A class that serves the exact scores of the positions of the first
+    plies of the game from a book file built offline. The file is read
+    through a read-only memory map"""
+
+    def __init__(self, path):
+        """
+        Map the book at path and read its header
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, num_rows, num_columns, depth, num_positions) = BOOK_HEADER.unpack_from(self.mmap)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            raise ValueError('%s is not a version %d opening book' % (path, BOOK_VERSION))
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        self.depth = depth
+        self.num_positions = num_positions
+        self.keys = np.frombuffer(self.mmap, dtype=np.uint64, count=num_positions, offset=BOOK_HEADER_SIZE)
+        self.scores = np.frombuffer(self.mmap, dtype=np.int8, count=num_positions,
+                                    offset=BOOK_HEADER_SIZE + 8 * num_positions)
+
+    def get(self, key):
+        """
+        Return the score of the position with a key, None if it is not in
+        the book
+        """
+        key = np.uint64(key)
+        index = int(np.searchsorted(self.keys, key))
+        if index == self.num_positions or self.keys[index] != key:
+            return None
+        return int(self.scores[index])
+
+    def close(self):
+        """
+        Release the memory map
+        """
+        self.keys = None
+        self.scores = None
+        self.mmap.close()
+
+def save_opening_book(book, path, depth, num_rows=BOARD_SIZE[0], num_columns=BOARD_SIZE[1]):
+    """
+    Save a dict from position keys to exact scores as an opening book file
+    """
+    keys = np.array(sorted(book), dtype=np.uint64)
+    scores = np.array([book[key] for key in keys.tolist()], dtype=np.int8)
+    header = BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, num_rows, num_columns, depth, len(keys))
+    with open(path, 'wb') as f:
+        f.write(header.ljust(BOOK_HEADER_SIZE, b'\0'))
+        f.write(keys.tobytes())
+        f.write(scores.tobytes())
+
+def solve_worker(args):
+    """
+    Solve one position in a worker process and return its key and score,
+    None as the score if it is not solved within the time limit
+    """
+    (key, current, mask, num_moves, num_rows, num_columns, time_limit) = args
+    solver = Solver(num_rows, num_columns)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    try:
+        return (key, solver.solve(current, mask, num_moves, deadline))
+    except SearchTimeout:
+        return (key, None)
+
+def build_opening_book(path, depth, num_rows=BOARD_SIZE[0], num_columns=BOARD_SIZE[1], num_workers=None, time_limit=None):
+    """
+    Build the opening book of every position reached after at most depth
+    moves that is not already decided, and save it to path. Only one of each
+    pair of mirrored positions is kept. The positions after exactly depth
+    moves are solved on a pool of worker processes and the scores of the
+    earlier positions follow from them. With a time limit in seconds per
+    position, the positions that are not solved in time are left out of the
+    book, and so are the earlier positions that lead to them. Return the
+    number of positions
+    """
+    solver = Solver(num_rows, num_columns)
+    # the positions of every ply, keyed by their canonical key
+    plies = [{solver.get_key(0, 0): (0, 0)}]
+    for ply in range(depth):
+        positions = {}
+        for (current, mask) in plies[-1].values():
+            if solver.can_win_next(current, mask):
+                continue
+            possible = solver.possible_moves(mask)
+            for col in range(num_columns):
+                move = possible & solver.column_masks[col]
+                if move:
+                    child = (current ^ mask, mask | move)
+                    key = min(solver.get_key(*child), solver.get_mirrored_key(*child))
+                    positions[key] = child
+        plies.append(positions)
+
+    book = {}
+    jobs = [(key, current, mask, depth, num_rows, num_columns, time_limit) for (key, (current, mask)) in plies[depth].items()]
+    with multiprocessing.Pool(num_workers) as pool:
+        for (key, score) in pool.imap_unordered(solve_worker, jobs, chunksize=16):
+            if score is not None:
+                book[key] = score
+
+    for ply in range(depth - 1, -1, -1):
+        for (key, (current, mask)) in plies[ply].items():
+            if solver.can_win_next(current, mask):
+                book[key] = (solver.total_slots + 1 - ply) // 2
+                continue
+            possible = solver.possible_moves(mask)
+            best = -solver.total_slots
+            for col in range(num_columns):
+                move = possible & solver.column_masks[col]
+                if move:
+                    child = (current ^ mask, mask | move)
+                    child_key = min(solver.get_key(*child), solver.get_mirrored_key(*child))
+                    if child_key not in book:
+                        # a child was not solved in time, so the score is unknown
+                        best = None
+                        break
+                    best = max(best, -book[child_key])
+            if best is not None:
+                book[key] = best
+
+    save_opening_book(book, path, depth, num_rows, num_columns)
+    return len(book)
+
+def main(argv=None):
+    """
+    Command line entry point that builds an opening book or prints the score
+    of a position given as a sequence of columns, counted from 1
+    """
+    parser = argparse.ArgumentParser(description='Solve Connect 4 positions and build the opening book of the solver player')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='build an opening book')
+    build_parser.add_argument('--depth', type=int, default=4, help='number of plies covered by the book. The positions after this many moves '
+                              'are all solved: on the 6x7 board pure Python solves a position in seconds only from about 12 moves in, '
+                              'so a full 6x7 book is out of reach and the time limit keeps the build bounded')
+    build_parser.add_argument('--time-limit', type=float, default=1.0, help='seconds per position, the positions not solved in time '
+                              'are left out of the book, 0 for no limit')
+    build_parser.add_argument('--rows', type=int, default=BOARD_SIZE[0], help='number of rows of the board')
+    build_parser.add_argument('--columns', type=int, default=BOARD_SIZE[1], help='number of columns of the board')
+    build_parser.add_argument('--output', default=DEFAULT_BOOK_PATH)
+    build_parser.add_argument('--workers', type=int, default=None, help='number of worker processes, one per core by default')
+    solve_parser = subparsers.add_parser('solve', help='print the score and best move of a position')
+    solve_parser.add_argument('moves', nargs='?', default='', help='columns played so far, counted from 1')
+    args = parser.parse_args(argv)
+
+    start_time = time.perf_counter()
+    if args.command == 'build':
+        count = build_opening_book(args.output, args.depth, args.rows, args.columns, args.workers, args.time_limit or None)
+        print('Built a book of %d positions in %f seconds.' % (count, time.perf_counter() - start_time))
+        return count
+
+    solver = Solver()
+    (current, mask) = (0, 0)
+    for (num_moves, char) in enumerate(args.moves):
+        move = solver.possible_moves(mask) & solver.column_masks[int(char) - 1]
+        (current, mask) = (current ^ mask, mask | move)
+    (col, score) = solver.best_move(current, mask, len(args.moves))
+    print('Score %d, best column %d, %d nodes in %f seconds.' % (score, col + 1, solver.nodes, time.perf_counter() - start_time))
+    return score
+
+if __name__ == "__main__":
+    main()
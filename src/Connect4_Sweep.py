@@ -0,0 +1,263 @@
+from Connect4_Globals import *
+from Connect4_Headless import HeadlessMatch
+from Connect4_Tournament import make_player, parse_player
+from Connect4_GameLog import GameLogWriter, create_worker_log, merge_worker_log
+import argparse
+import itertools
+import json
+import multiprocessing
+
+# the hyperparameters a sweep can vary
+SWEEP_PARAMETERS = ('epsilon', 'alpha', 'gamma', 'exploration_coeff', 'trace_decay')
+# the learning curves kept for every run, one value per game
+CURVES = ('p1_wins', 'p2_wins', 'draws', 'game_time')
+
+def grid_search_space(space):
+    """
+    Return every combination of the values of a grid, a dict mapping each
+    hyperparameter to a list of values
+    """
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+def random_search_space(space, num_samples, seed=None):
+    """
+    Return num_samples random settings of a search space, a dict mapping
+    each hyperparameter to a list of values to pick from or to a (low, high)
+    tuple to draw uniformly from
+    """
+    generator = random.Random(seed)
+    settings = []
+    for i in range(num_samples):
+        params = {}
+        for (name, values) in sorted(space.items()):
+            if isinstance(values, tuple):
+                params[name] = generator.uniform(*values)
+            else:
+                params[name] = generator.choice(values)
+        settings.append(params)
+    return settings
+
+def sweep_worker(args):
+    """
+    Play num_games games in a worker process between a player configured
+    with a setting of the hyperparameters and an opponent, and return the
+    learning curves of the run. The games are logged to the game log at
+    log_path if one is given
+    """
+    (player, opponent, params, num_games, seed, log_path) = args
+    random.seed(seed)
+    np.random.seed(seed % (2**32))
+    p1 = make_player(dict(player, **params), 1)
+    p2 = make_player(opponent, 2)
+    game_log = GameLogWriter(log_path) if log_path is not None else None
+    match = HeadlessMatch(p1, p2, game_log)
+    results = match.run(num_games)
+    match.close()
+    if game_log is not None:
+        game_log.close()
+    run = {'params': params, 'seed': seed}
+    for key in CURVES + ('p1_win_rate', 'p2_win_rate', 'draw_rate'):
+        run[key] = results[key]
+    return run
+
+class SweepResults():
+    """A class that stores the learning curves of the runs of a sweep, with
+    the setting of the hyperparameters and the seed of every run, and
+    aggregates them over the seeds"""
+
+    def __init__(self, runs=None):
+        """
+        Initialize a store with a list of runs
+        """
+        self.runs = runs if runs is not None else []
+
+    def add(self, run):
+        """
+        Store a run returned by sweep_worker
+        """
+        self.runs.append(run)
+
+    def select(self, **params):
+        """
+        Return the runs whose hyperparameters have the given values
+        """
+        return [run for run in self.runs if all(run['params'].get(k) == v for (k, v) in params.items())]
+
+    def get_values(self, param):
+        """
+        Return the values a hyperparameter took in the runs, sorted
+        """
+        return sorted(set(run['params'][param] for run in self.runs if param in run['params']))
+
+    def get_curve(self, runs, curve='p1_wins'):
+        """
+        Return the game numbers and the mean and standard deviation over a
+        list of runs of one of the CURVES
+        """
+        values = np.array([run[curve] for run in runs])
+        return (np.arange(1, values.shape[1] + 1), values.mean(axis=0), values.std(axis=0))
+
+    def group_by(self, param, curve='p1_wins', **fixed):
+        """
+        Return a dict mapping every value of a hyperparameter to the
+        game numbers, the mean and standard deviation of a curve and the
+        number of runs with that value, among the runs with the fixed values
+        of the other hyperparameters
+        """
+        groups = {}
+        for value in self.get_values(param):
+            runs = self.select(**dict(fixed, **{param: value}))
+            if runs:
+                groups[value] = self.get_curve(runs, curve) + (len(runs),)
+        return groups
+
+    def get_summary(self, rate='p1_win_rate'):
+        """
+        Return the mean and standard deviation over the seeds of a final
+        rate for every setting of the hyperparameters, best first
+        """
+        settings = {}
+        for run in self.runs:
+            key = tuple(sorted(run['params'].items()))
+            settings.setdefault(key, []).append(run[rate])
+        summary = [{'params': dict(key), 'mean': float(np.mean(rates)), 'std': float(np.std(rates)), 'runs': len(rates)}
+                   for (key, rates) in settings.items()]
+        summary.sort(key=lambda row: -row['mean'])
+        return summary
+
+    def save(self, path):
+        """
+        Save the runs to path as JSON
+        """
+        with open(path, 'w') as f:
+            json.dump({'runs': self.runs}, f)
+
+def load_sweep_results(path):
+    """
+    Load the runs saved by SweepResults.save
+    """
+    with open(path) as f:
+        return SweepResults(json.load(f)['runs'])
+
+def plot_sensitivity(results, param, curve='p1_wins', title=None, ax=None, **fixed):
+    """
+    Plot the mean learning curve of every value of a hyperparameter with a
+    band of one standard deviation over the seeds, among the runs with the
+    fixed values of the other hyperparameters
+    """
+    if ax is None:
+        (fig, ax) = plt.subplots()
+    for (value, (games, mean, std, num_runs)) in results.group_by(param, curve, **fixed).items():
+        line = ax.plot(games, mean, label='%g' % value)[0]
+        if num_runs > 1:
+            ax.fill_between(games, mean - std, mean + std, color=line.get_color(), alpha=0.2)
+    ax.legend(loc=4) #bottom right
+    ax.set_title(title if title is not None else 'Connect Four %s sensitivity' % param)
+    ax.set_ylabel('Game outcomes in %' if curve != 'game_time' else 'Game Playtime in seconds')
+    ax.set_xlabel('Game number')
+    return ax
+
+class Sweep():
+    """A class that runs a player with every setting of a search space of
+    hyperparameters against an opponent, over several seeds, on a pool of
+    worker processes"""
+
+    def __init__(self, player, opponent='random', num_workers=None):
+        """
+        Initialize a sweep of a player against an opponent, each a player
+        type or a configuration like the ones of a Tournament, on
+        num_workers processes, one per core by default
+        """
+        self.player = parse_player(player) if isinstance(player, str) else player
+        self.opponent = parse_player(opponent) if isinstance(opponent, str) else opponent
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+
+    def run(self, settings, num_games=100, num_seeds=5, seed=None, results=None, callback=None, game_log=None):
+        """
+        Play num_games games for every setting and seed and return the runs
+        in a SweepResults, calling callback with every run as it finishes.
+        Every game is appended to the GameLogWriter game_log if one is
+        given, the games of each run together as the run finishes
+        """
+        for (name, _) in itertools.chain.from_iterable(params.items() for params in settings):
+            if name not in SWEEP_PARAMETERS:
+                raise ValueError('Unknown hyperparameter %s, expected one of %s' % (name, ', '.join(SWEEP_PARAMETERS)))
+        if seed is None:
+            seed = random.randrange(2**32)
+        if results is None:
+            results = SweepResults()
+        jobs = [(self.player, self.opponent, params, num_games, seed + i * num_seeds + k, create_worker_log(game_log))
+                for (i, params) in enumerate(settings) for k in range(num_seeds)]
+        log_paths = {job[4]: job[5] for job in jobs}
+        with multiprocessing.Pool(self.num_workers) as pool:
+            for run in pool.imap_unordered(sweep_worker, jobs):
+                merge_worker_log(game_log, log_paths[run['seed']])
+                results.add(run)
+                if callback is not None:
+                    callback(run)
+        return results
+
+def parse_values(spec):
+    """
+    Return the name and values of a command line spec name=v1,v2,... or the
+    name and range of name=low:high
+    """
+    (name, _, values) = spec.partition('=')
+    if ':' in values:
+        (low, high) = values.split(':')
+        return (name, (float(low), float(high)))
+    return (name, [float(value) for value in values.split(',')])
+
+def main(argv=None):
+    """
+    Command line entry point that runs a sweep, prints the final win rate
+    of every setting and saves and plots the learning curves
+    """
+    parser = argparse.ArgumentParser(description='Sweep the hyperparameters of a Connect 4 computer player on a pool of processes')
+    parser.add_argument('player', help='player to tune as [name=]type[:key=value,...], for example qlearner')
+    parser.add_argument('opponent', nargs='?', default='random', help='opponent as [name=]type[:key=value,...]')
+    parser.add_argument('--grid', action='append', default=[], help='name=v1,v2,... values of a hyperparameter to try them all')
+    parser.add_argument('--random', action='append', default=[], help='name=v1,v2,... or name=low:high to sample from')
+    parser.add_argument('--samples', type=int, default=10, help='number of random settings')
+    parser.add_argument('-n', '--games', type=int, default=100, help='games per run')
+    parser.add_argument('--seeds', type=int, default=5, help='runs per setting')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes, one per core by default')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help='save the runs as JSON to this file')
+    parser.add_argument('--plot', default=None, help='hyperparameter to plot the learning curves of')
+    parser.add_argument('--plot-file', default=None, help='save the plot to this file instead of showing it')
+    parser.add_argument('--game-log', default=None, help='append every game to this binary game log')
+    args = parser.parse_args(argv)
+
+    if args.grid and args.random:
+        parser.error('use either --grid or --random')
+    if args.random:
+        settings = random_search_space(dict(parse_values(spec) for spec in args.random), args.samples, args.seed)
+    else:
+        space = dict(parse_values(spec) for spec in args.grid)
+        if any(isinstance(values, tuple) for values in space.values()):
+            parser.error('a grid takes lists of values, ranges are only for --random')
+        settings = grid_search_space(space)
+
+    start_time = time.perf_counter()
+    game_log = GameLogWriter(args.game_log) if args.game_log is not None else None
+    results = Sweep(args.player, args.opponent, args.workers).run(settings, args.games, args.seeds, args.seed, game_log=game_log)
+    if game_log is not None:
+        game_log.close()
+    print('Played %d runs in %f seconds.' % (len(results.runs), time.perf_counter() - start_time))
+    for row in results.get_summary():
+        print('%s: win rate %.3f +- %.3f over %d runs' % (', '.join('%s=%g' % item for item in sorted(row['params'].items())),
+                                                          row['mean'], row['std'], row['runs']))
+    if args.output is not None:
+        results.save(args.output)
+    if args.plot is not None:
+        plot_sensitivity(results, args.plot)
+        if args.plot_file is not None:
+            plt.savefig(args.plot_file)
+        else:
+            plt.show()
+    return results
+
+if __name__ == "__main__":
+    main()
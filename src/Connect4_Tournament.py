@@ -0,0 +1,337 @@
+from Connect4_Globals import *
+from Connect4_RLPlayers import ComputerPlayer
+from Connect4_Headless import HeadlessMatch
+from Connect4_QTable import load_q_table
+from Connect4_GameLog import GameLogWriter
+import argparse
+import json
+import multiprocessing
+
+# the ComputerPlayer arguments a player configuration can set, every other
+# key except name and type is set as an attribute of the player, such as
+# depth for minimax or itermax and timeout for montecarlo
+PLAYER_ARGUMENTS = ('epsilon', 'alpha', 'gamma', 'exploration_coeff', 'symmetric', 'time_budget', 'trace_decay')
+# Elo points per factor of 10 in the odds of winning
+ELO_SCALE = 400
+# the advantage of moving first and the draw width BayesElo starts from, and
+# the standard deviation of the normal prior that keeps their estimates
+# close to these when the games say little about them
+BAYESELO_ADVANTAGE = 32.8
+BAYESELO_DRAW_ELO = 97.3
+BAYESELO_PRIOR_DEVIATION = 100
+
+def parse_player(spec):
+    """
+    Return the player configuration of a command line spec of the form
+    [name=]type[:key=value,key=value...], for example
+    fast-mcts=montecarlo:itermax=2000,timeout=0.5
+    """
+    (head, _, options) = spec.partition(':')
+    (name, _, player_type) = head.rpartition('=')
+    config = {'name': name or spec, 'type': player_type}
+    for option in filter(None, options.split(',')):
+        (key, value) = option.split('=')
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+        config[key] = value
+    return config
+
+def make_player(config, coin_type):
+    """
+    Return a ComputerPlayer with a coin type built from a player
+    configuration. A q_table entry is the path of a saved Q-table
+    """
+    kwargs = {key: config[key] for key in PLAYER_ARGUMENTS if key in config}
+    if 'q_table' in config:
+        kwargs['q_table'] = load_q_table(config['q_table'])
+    computer = ComputerPlayer(coin_type, config['type'], **kwargs)
+    for (key, value) in config.items():
+        if key not in PLAYER_ARGUMENTS and key not in ('name', 'type', 'q_table'):
+            setattr(computer.player, key, value)
+    return computer
+
+def play_worker(args):
+    """
+    Play num_games games in a worker process where the first player always
+    moves first, and return the name of the players and the score of the
+    first player, the columns played and the duration of every game
+    """
+    (first, second, num_games, seed) = args
+    random.seed(seed)
+    np.random.seed(seed % (2**32))
+    p1 = make_player(first, 1)
+    p2 = make_player(second, 2)
+    match = HeadlessMatch(p1, p2)
+    games = []
+    for i in range(num_games):
+        start_time = time.perf_counter()
+        winner = match.play_game(first_type=1)
+        games.append({'first': first['name'], 'second': second['name'],
+                      'score': 1.0 if winner == 1 else 0.0 if winner == 2 else 0.5,
+                      'moves': match.last_moves,
+                      'duration': time.perf_counter() - start_time})
+    match.close()
+    return games
+
+def count_results(games, names):
+    """
+    Return the wins, draws and losses of the first player of every game as
+    matrices indexed by the first and the second player
+    """
+    index = {name: i for (i, name) in enumerate(names)}
+    counts = np.zeros((3, len(names), len(names)))
+    for game in games:
+        outcome = 0 if game['score'] == 1 else 1 if game['score'] == 0.5 else 2
+        counts[outcome, index[game['first']], index[game['second']]] += 1
+    return counts
+
+def logistic(elo_difference):
+    """
+    Return the expected score of a player with an Elo advantage
+    """
+    return 1 / (1 + np.power(10.0, -elo_difference / ELO_SCALE))
+
+def elo_gradient(params, counts, prior):
+    """
+    Return the gradient of the log likelihood of the games under the Elo
+    model, where a draw counts as half a win, with params the ratings.
+    Every player also has prior draws against a player rated 0
+    """
+    x = np.log(10) / ELO_SCALE
+    (wins, draws, losses) = counts
+    expected = logistic(params[:, None] - params[None, :])
+    g = x * (wins + draws / 2 - (wins + draws + losses) * expected)
+    return g.sum(axis=1) - g.sum(axis=0) + x * (prior / 2 - prior * logistic(params))
+
+def bayes_elo_gradient(params, counts, prior):
+    """
+    Return the gradient of the log likelihood of the games under the
+    BayesElo model, with params the ratings followed by the Elo advantage of
+    moving first and the Elo width of a draw. Every player also has prior
+    draws against a player rated 0, half of them moving first, and the
+    advantage and draw width have normal priors
+    """
+    x = np.log(10) / ELO_SCALE
+    (ratings, advantage, draw_elo) = (params[:-2], params[-2], params[-1])
+    (wins, draws, losses) = counts
+    difference = ratings[:, None] - ratings[None, :]
+    p_win = logistic(difference + advantage - draw_elo)
+    p_loss = logistic(-difference - advantage - draw_elo)
+    p_draw = 1 - p_win - p_loss
+    g_win = x * (wins * (1 - p_win) - draws * p_win * (1 - p_win) / p_draw)
+    g_loss = x * (losses * (1 - p_loss) - draws * p_loss * (1 - p_loss) / p_draw)
+    g = g_win - g_loss
+    gradient = np.zeros(len(params))
+    gradient[:-2] = g.sum(axis=1) - g.sum(axis=0)
+    gradient[-2] = g.sum()
+    gradient[-1] = -(g_win + g_loss).sum()
+    # the prior draws against a player rated 0, moving first and second,
+    # seen from the side of the player that moves first
+    for sign in (1, -1):
+        difference = sign * ratings + advantage
+        p_win = logistic(difference - draw_elo)
+        p_loss = logistic(-difference - draw_elo)
+        p_draw = 1 - p_win - p_loss
+        g_win = -x * prior / 2 * p_win * (1 - p_win) / p_draw
+        g_loss = -x * prior / 2 * p_loss * (1 - p_loss) / p_draw
+        gradient[:-2] += sign * (g_win - g_loss)
+        gradient[-2] += (g_win - g_loss).sum()
+        gradient[-1] -= (g_win + g_loss).sum()
+    gradient[-2] -= (advantage - BAYESELO_ADVANTAGE) / BAYESELO_PRIOR_DEVIATION**2
+    gradient[-1] -= (draw_elo - BAYESELO_DRAW_ELO) / BAYESELO_PRIOR_DEVIATION**2
+    return gradient
+
+def fit_ratings(gradient, params, counts, prior, iterations=100, tolerance=1e-6, positive=()):
+    """
+    Return the maximum likelihood params of a rating model by Newton's
+    method, and their covariance from the inverse of the observed Fisher
+    information. The Hessian is the finite difference of the gradient. The
+    params at the indices in positive are kept above 0
+    """
+    def hessian(params):
+        h = np.zeros((len(params), len(params)))
+        for k in range(len(params)):
+            step = np.zeros(len(params))
+            step[k] = 1e-3
+            h[:, k] = (gradient(params + step, counts, prior) - gradient(params - step, counts, prior)) / 2e-3
+        return (h + h.T) / 2
+
+    for i in range(iterations):
+        update = np.linalg.solve(hessian(params), gradient(params, counts, prior))
+        # keep the steps small while far from the maximum
+        scale = max(1, np.abs(update).max() / 200)
+        # go at most halfway to 0 for the params that must stay positive
+        for k in positive:
+            scale = max(scale, 2 * update[k] / params[k])
+        params = params - update / scale
+        if np.abs(update).max() < tolerance:
+            break
+    return (params, np.linalg.inv(-hessian(params)))
+
+def compute_ratings(games, names, model='bayeselo', prior=2, confidence=0.95):
+    """
+    Return the rating of every player with a confidence interval from the
+    games played, under the Elo model with draws counted as half a win or
+    the BayesElo model that also fits the advantage of moving first and the
+    likelihood of draws. Ratings are shifted to average 0. The second value
+    returned holds the fitted advantage and draw width for BayesElo
+    """
+    counts = count_results(games, names)
+    n = len(names)
+    if model == 'elo':
+        (params, covariance) = fit_ratings(elo_gradient, np.zeros(n), counts, prior)
+        extra = {}
+    else:
+        # the draw width must stay positive for draws to have a probability
+        (params, covariance) = fit_ratings(bayes_elo_gradient, np.append(np.zeros(n), [BAYESELO_ADVANTAGE, BAYESELO_DRAW_ELO]), counts, prior,
+                                           positive=(n + 1,))
+        extra = {'advantage': float(params[-2]), 'draw_elo': float(params[-1])}
+    ratings = params[:n] - params[:n].mean()
+    # the covariance of the ratings once shifted to average 0
+    center = np.eye(n) - 1.0 / n
+    covariance = center @ covariance[:n, :n] @ center
+    # the z value of a two sided normal confidence interval
+    z = {0.9: 1.645, 0.95: 1.96, 0.99: 2.576}.get(confidence, 1.96)
+    errors = z * np.sqrt(np.maximum(np.diag(covariance), 0))
+    table = []
+    for (i, name) in enumerate(names):
+        played = counts[:, i, :].sum() + counts[:, :, i].sum()
+        score = counts[0, i, :].sum() + counts[2, :, i].sum() + (counts[1, i, :].sum() + counts[1, :, i].sum()) / 2
+        table.append({'name': name, 'rating': float(ratings[i]),
+                      'lower': float(ratings[i] - errors[i]), 'upper': float(ratings[i] + errors[i]),
+                      'games': int(played), 'score': float(score / played) if played else 0.0})
+    table.sort(key=lambda row: -row['rating'])
+    return (table, extra)
+
+class Tournament():
+    """A class that plays a round-robin tournament between computer player
+    configurations on a pool of worker processes, every pairing with both
+    players moving first in turn, and rates the players"""
+
+    def __init__(self, players, num_workers=None, games_per_job=1, seed=None):
+        """
+        Initialize a tournament between player configurations, dicts with a
+        unique name, a player type and any other settings of the player, on
+        num_workers processes, one per core by default
+        """
+        names = [config['name'] for config in players]
+        if len(set(names)) != len(names):
+            raise ValueError('Player names must be unique, got %s' % ', '.join(names))
+        self.players = players
+        self.names = names
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.games_per_job = games_per_job
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.games = []
+
+    def get_jobs(self, games_per_pairing):
+        """
+        Return the jobs of the worker processes: for every pairing half of
+        the games with each player moving first, in chunks of games_per_job
+        """
+        jobs = []
+        for i in range(len(self.players)):
+            for j in range(i + 1, len(self.players)):
+                for (first, second, num_games) in ((i, j, (games_per_pairing + 1) // 2), (j, i, games_per_pairing // 2)):
+                    while num_games > 0:
+                        chunk = min(self.games_per_job, num_games)
+                        num_games -= chunk
+                        jobs.append((self.players[first], self.players[second], chunk, self.seed + len(jobs)))
+        return jobs
+
+    def play(self, games_per_pairing):
+        """
+        Play games_per_pairing games for every pairing and yield the result
+        of every game as soon as it finishes. A result holds the name of the
+        player that moved first and of the second one, the score of the first
+        player, the columns played and the duration of the game
+        """
+        jobs = self.get_jobs(games_per_pairing)
+        with multiprocessing.Pool(self.num_workers) as pool:
+            for games in pool.imap_unordered(play_worker, jobs):
+                for game in games:
+                    self.games.append(game)
+                    yield game
+
+    def run(self, games_per_pairing, callback=None):
+        """
+        Play the whole tournament, calling callback with the result of every
+        game as it finishes, and return the ratings of the players
+        """
+        for game in self.play(games_per_pairing):
+            if callback is not None:
+                callback(game)
+        return self.get_ratings()
+
+    def get_ratings(self, model='bayeselo', prior=2, confidence=0.95):
+        """
+        Return the ratings of the players from the games played so far, see
+        compute_ratings
+        """
+        return compute_ratings(self.games, self.names, model, prior, confidence)
+
+def print_ratings(table, extra):
+    """
+    Print a table of ratings with their confidence intervals
+    """
+    print('%-4s %-24s %8s %16s %6s %7s' % ('Rank', 'Name', 'Elo', 'Interval', 'Games', 'Score'))
+    for (rank, row) in enumerate(table):
+        print('%-4d %-24s %8.1f %7.1f..%-7.1f %6d %6.1f%%' % (rank + 1, row['name'], row['rating'], row['lower'],
+                                                             row['upper'], row['games'], row['score'] * 100))
+    if extra:
+        print('First move advantage %.1f Elo, draw width %.1f Elo' % (extra['advantage'], extra['draw_elo']))
+
+def main(argv=None):
+    """
+    Command line entry point that plays a round-robin tournament, streams
+    every game result and prints the ratings of the players
+    """
+    parser = argparse.ArgumentParser(description='Play a Connect 4 round-robin tournament on a pool of processes')
+    parser.add_argument('players', nargs='*', help='players as [name=]type[:key=value,...], for example minimax:depth=3')
+    parser.add_argument('--config', default=None, help='JSON file with a list of player configurations')
+    parser.add_argument('-n', '--games', type=int, default=20, help='games per pairing, half with each player moving first')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes, one per core by default')
+    parser.add_argument('--games-per-job', type=int, default=1, help='games a worker plays with the same two players')
+    parser.add_argument('--model', default='bayeselo', choices=('elo', 'bayeselo'), help='rating model')
+    parser.add_argument('--prior', type=float, default=2, help='virtual draws of every player against a player rated 0')
+    parser.add_argument('--confidence', type=float, default=0.95, choices=(0.9, 0.95, 0.99))
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help='stream every game result as JSON lines to this file')
+    parser.add_argument('--game-log', default=None, help='append every game to this binary game log')
+    parser.add_argument('--quiet', action='store_true', help='do not print every game result')
+    args = parser.parse_args(argv)
+
+    players = [parse_player(spec) for spec in args.players]
+    if args.config is not None:
+        with open(args.config) as f:
+            players += json.load(f)
+    if len(players) < 2:
+        parser.error('a tournament needs at least two players')
+
+    tournament = Tournament(players, args.workers, args.games_per_job, args.seed)
+    output = open(args.output, 'w') if args.output is not None else None
+    game_log = GameLogWriter(args.game_log) if args.game_log is not None else None
+    start_time = time.perf_counter()
+    for game in tournament.play(args.games):
+        if output is not None:
+            output.write(json.dumps(game) + '\n')
+            output.flush()
+        if game_log is not None:
+            # the first player of every game has coin type 1
+            game_log.append(game['moves'], {1.0: 1, 0.5: 0, 0.0: 2}[game['score']], 1)
+        if not args.quiet:
+            print('%s vs %s: %s in %.2f seconds' % (game['first'], game['second'],
+                                                    {1.0: '1-0', 0.5: '1/2-1/2', 0.0: '0-1'}[game['score']], game['duration']))
+    if output is not None:
+        output.close()
+    if game_log is not None:
+        game_log.close()
+    print('Played %d games in %f seconds.' % (len(tournament.games), time.perf_counter() - start_time))
+    (table, extra) = tournament.get_ratings(args.model, args.prior, args.confidence)
+    print_ratings(table, extra)
+    return (table, extra)
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,10 @@ class ColumnFullException(Exception):
         
     def __str__(self):
         return repr(self.value)   
+
+class SearchTimeout(Exception):
+    """An exception that will be thrown when a search runs out of time"""
+    pass
     
 class Slot():
     """A class that represents a single slot on the board"""
@@ -64,131 +68,155 @@ class Slot():
         self.surface = self.surface.convert()
         background.blit(self.surface, (self.x_pos, self.y_pos))
 
-class Board():
-    """A class to represent the connect 4 board"""
-    
-    MARGIN_X = 300
-    MARGIN_Y = 150
+# Zobrist keys of every (coin type, bitboard bit) pair, per board size
+ZOBRIST_KEYS = {}
+
+def get_zobrist_keys(num_rows, num_columns):
+    """
+    Return the Zobrist keys for a board size: a list per coin type with a
+    random 64 bit number for every bit of the bitboard. The keys are drawn 
+    from a fixed seed so that hashes are the same in every process
+    """
+    if (num_rows, num_columns) not in ZOBRIST_KEYS:
+        generator = random.Random(num_rows * 100 + num_columns)
+        num_bits = (num_rows + 1) * num_columns
+        ZOBRIST_KEYS[(num_rows, num_columns)] = [[generator.getrandbits(64) for i in range(num_bits)] for piece in range(3)]
+    return ZOBRIST_KEYS[(num_rows, num_columns)]
+
+# lines of n in a row slots of every board size
+LINES = {}
+
+def get_lines(num_rows, num_columns, n_in_a_row=4):
+    """
+    Return the horizontal, vertical and diagonal lines of n_in_a_row slots 
+    of a board size as lists of bitboard bit indices, and for every bit of
+    the bitboard the indices of the lines through it and the bit masks of
+    those lines
+    """
+    if (num_rows, num_columns, n_in_a_row) not in LINES:
+        stride = num_rows + 1
+        lines = []
+        for (dr, dc) in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+            for r in range(num_rows):
+                for c in range(num_columns):
+                    cells = [(r + k*dr, c + k*dc) for k in range(n_in_a_row)]
+                    if all(0 <= i < num_rows and 0 <= j < num_columns for (i, j) in cells):
+                        lines.append([j * stride + num_rows - 1 - i for (i, j) in cells])
+        cell_lines = [[] for index in range(stride * num_columns)]
+        for (l, line) in enumerate(lines):
+            for index in line:
+                cell_lines[index].append(l)
+        line_masks = [sum(1 << index for index in line) for line in lines]
+        cell_masks = [[line_masks[l] for l in cell_lines[index]] for index in range(stride * num_columns)]
+        LINES[(num_rows, num_columns, n_in_a_row)] = (lines, cell_lines, cell_masks)
+    return LINES[(num_rows, num_columns, n_in_a_row)]
+
+class Position():
+    """A class that represents a connect 4 position as a pair of bitboards"""
     
     def __init__(self, num_rows, num_columns):
         """
-        Initialize a board with num_rows rows and num_columns columns
+        Initialize an empty position with num_rows rows and num_columns columns.
+        Every column takes num_rows + 1 bits of an integer mask, counted from
+        the bottom slot up, and the extra bit on top of each column is always
+        empty so that a shifted line can never wrap into the next column
         """
-        self.container = [[Slot(i, j, Slot.SIZE, Slot.SIZE, 
-                                j*Slot.SIZE + Board.MARGIN_X, 
-                                i*Slot.SIZE + Board.MARGIN_Y) for j in range(num_columns)] for i in range(num_rows)]
         self.num_rows = num_rows
         self.num_columns = num_columns
         self.n_in_a_row = 4
         self.total_slots = num_rows * num_columns
-        self.num_slots_filled = 0
-        self.last_visited_nodes = []
-        self.last_value = 0
-        
-        self.state = [[0 for j in range(num_columns)] for i in range(num_rows)]
-        self.prev_state = None
-        self.prev_move = (None, None, None)
-
+        self.stride = num_rows + 1
+        # shifts that move a bit one step vertically, along both diagonals
+        # and horizontally on the bitboard
+        self.directions = (1, self.stride - 1, self.stride + 1, self.stride)
+        # one bitboard per coin type, indexed by the coin type itself
+        self.masks = [0, 0, 0]
+        self.heights = [0 for j in range(num_columns)]
+        # columns that are not full, replaced rather than changed in place
+        # whenever a column fills up or empties again
+        self.available_actions = list(range(num_columns))
+        # bit masks of the lines through every bit of the bitboard
+        self.cell_masks = get_lines(num_rows, num_columns, self.n_in_a_row)[2]
+        self.num_moves = 0
         self.prev_move_col = None
         self.prev_player = None
         self.current_player = None
-        # initialize the internal graph representation of the board
-        # where every node is connected to all the other nodes in the 8 
-        # directions surrounding it to which it already contains pointers
-        self.representation = [[SlotTrackerNode() for j in range(num_columns)] for i in range(num_rows)]
-        for i in range(num_rows):
-            prev_row_index = i - 1
-            next_row_index = i + 1
-            for j in range(num_columns):
-                prev_col_index = j - 1
-                next_col_index = j + 1
-                current_node = self.representation[i][j]
-                if prev_row_index >= 0 and prev_col_index >=0:
-                    current_node.top_left = self.representation[prev_row_index][prev_col_index]
-                if prev_row_index >=0:
-                    current_node.top = self.representation[prev_row_index][j]
-                if prev_row_index >=0 and next_col_index < num_columns:
-                    current_node.top_right = self.representation[prev_row_index][next_col_index]
-                if prev_col_index >= 0:
-                    current_node.left = self.representation[i][prev_col_index]
-                    
-                if next_col_index < num_columns:
-                    current_node.right = self.representation[i][next_col_index]
-                if next_row_index < num_rows and prev_col_index >= 0:
-                    current_node.bottom_left = self.representation[next_row_index][prev_col_index]
-                    
-                if next_row_index < num_rows:
-                    current_node.bottom = self.representation[next_row_index][j]
-                if next_row_index < num_rows and next_col_index < num_columns:
-                    current_node.bottom_right = self.representation[next_row_index][next_col_index]    
-    
-    def draw(self, background):
+        self.cached_state = None
+        # Zobrist hash of the position, updated with every piece dropped
+        self.zobrist_keys = get_zobrist_keys(num_rows, num_columns)
+        self.zobrist_hash = 0
+        # optional WindowEvaluator kept up to date with every piece dropped
+        self.evaluator = None
+        # (column, previous column, previous player, player to move) of every
+        # move made with make_move that has not been undone yet
+        self.move_history = []
+        
+    def get_bit(self, row, col):
         """
-        Method to draw the entire board on the screen
+        Return the bitboard bit of the slot in a given row and column, where
+        row 0 is the top row of the board
         """
-        for i in range(self.num_rows):
-            for j in range(self.num_columns):
-                self.container[i][j].draw(background)
-                
-    def get_slot(self, row_index, col_index):
+        return 1 << (col * self.stride + self.num_rows - 1 - row)
+    
+    def drop_piece(self, row, col, piece):
         """
-        Return a slot on the board given its row and column indices
+        Place a piece of the given coin type in the slot at row, col which 
+        must be the lowest empty slot of the column
+        """
+        index = col * self.stride + self.num_rows - 1 - row
+        self.masks[piece] |= 1 << index
+        self.zobrist_hash ^= self.zobrist_keys[piece][index]
+        if self.evaluator is not None:
+            self.evaluator.add(index, piece)
+        self.heights[col] = self.num_rows - row
+        if row == 0:
+            self.available_actions = [c for c in self.available_actions if c != col]
+        self.num_moves += 1
+        self.cached_state = None
+        self.prev_move_col = col
+        self.prev_player = piece
+        self.current_player = 2 if piece == 1 else 1 
+        
+    def make_move(self, col, piece):
         """
-        return self.container[row_index][col_index]
+        Drop a piece of the given coin type in a column in place, remembering
+        what undo_move needs to take it back
+        """
+        self.move_history.append((col, self.prev_move_col, self.prev_player, self.current_player))
+        self.drop_piece(self.num_rows - 1 - self.heights[col], col, piece)
+        
+    def undo_move(self):
+        """
+        Take back the last move made with make_move
+        """
+        (col, prev_move_col, prev_player, current_player) = self.move_history.pop()
+        piece = self.prev_player
+        height = self.heights[col] - 1
+        index = col * self.stride + height
+        self.masks[piece] ^= 1 << index
+        self.zobrist_hash ^= self.zobrist_keys[piece][index]
+        if self.evaluator is not None:
+            self.evaluator.remove(index, piece)
+        if height == self.num_rows - 1:
+            self.available_actions = sorted(self.available_actions + [col])
+        self.heights[col] = height
+        self.num_moves -= 1
+        self.cached_state = None
+        self.prev_move_col = prev_move_col
+        self.prev_player = prev_player
+        self.current_player = current_player
     
     def check_column_fill(self, col_num):
         """
         Return True iff the column col_num on the board is filled up
         """
-        for i in range(len(self.container)):
-            # if a slot isn't filled then the column is not filled
-            if not self.container[i][col_num].check_slot_fill():
-                return False
-        return True
-    
-    def insert_coin(self, coin, background, game_logic):
-        """
-        Insert the coin in the board and update board state and
-        internal representation
-        """
-        col_num = coin.get_column()
-        if not self.check_column_fill(col_num):
-            row_index = self.determine_row_to_insert(col_num)
-            self.container[row_index][col_num].set_coin(coin)
-            if (self.prev_move[0] == None):
-                self.prev_state = [[0 for j in range(self.num_columns)] for i in range(self.num_rows)]
-            else:
-                (prev_row, prev_col, value) = self.prev_move
-                self.prev_state[prev_row][prev_col] = value
-            self.prev_move = (row_index, col_num, coin.get_coin_type())    
-            self.state[row_index][col_num] = coin.get_coin_type()
-            self.update_slot_tracker(row_index, col_num, coin.get_coin_type())
-            self.num_slots_filled += 1
-            self.last_value = coin.get_coin_type()
-            coin.drop(background, row_index)
-            
-        else:
-            raise ColumnFullException('Column is already filled!')
-        
-        result = game_logic.check_game_over()
-        
-        return result
-        
-    def drop_piece(self, row, col, piece):
-        self.state[row][col] = piece
-        self.prev_move = col
-        self.prev_player = piece
-        self.current_player = 2 if piece == 1 else 1 
+        return self.heights[col_num] == self.num_rows
         
     def determine_row_to_insert(self, col_num):
         """
         Determine the row in which the coin can be dropped into
         """
-        for i in range(len(self.container)):
-            if self.container[i][col_num].check_slot_fill():
-                return (i - 1)
-        
-        return self.num_rows - 1
+        return self.num_rows - 1 - self.heights[col_num]
                 
     def get_dimensions(self):
         """
@@ -203,162 +231,339 @@ class Board():
         """
         Return true iff the board is completely filled
         """
-        return (self.total_slots == self.num_slots_filled)
-            
-    def get_representation(self):
-        """
-        Return the internal graph representation of the board
-        """
-        return self.representation
+        return (self.total_slots == self.num_moves)
     
     def get_available_actions(self):
         """
-        Return the available moves
+        Return the available moves. The list is kept up to date as pieces are
+        dropped and is shared, so it must not be changed
         """
-        actions = []
-        for i in range(self.num_columns):
-            if (not self.check_column_fill(i)):
-                actions.append(i)
-        return actions
+        return self.available_actions
     
     def copy(self):
-        BoardCopy = type('Board', Board.__bases__, dict(Board.__dict__))
-        b = BoardCopy(self.num_rows, self.num_columns)
-        b.state = copy.deepcopy(self.state)
-        b.prev_move_col = self.prev_move_col
-        b.prev_player = self.prev_player
-        b.current_player = self.current_player
-        return b
+        """
+        Return a copy of the position that can be played on without changing 
+        this one. Only the bitboards are copied, never any of the slots drawn 
+        on the screen, so the copy of a Board is a plain Position without its
+        slots, played columns or previous state
+        """
+        position = Position.__new__(Position)
+        position.num_rows = self.num_rows
+        position.num_columns = self.num_columns
+        position.n_in_a_row = self.n_in_a_row
+        position.total_slots = self.total_slots
+        position.stride = self.stride
+        position.directions = self.directions
+        position.masks = self.masks[:]
+        position.heights = self.heights[:]
+        position.available_actions = self.available_actions
+        position.cell_masks = self.cell_masks
+        position.num_moves = self.num_moves
+        position.prev_move_col = self.prev_move_col
+        position.prev_player = self.prev_player
+        position.current_player = self.current_player
+        position.cached_state = self.cached_state
+        position.zobrist_keys = self.zobrist_keys
+        position.zobrist_hash = self.zobrist_hash
+        position.evaluator = None if self.evaluator is None else self.evaluator.copy()
+        position.move_history = self.move_history[:]
+        return position
     
     def is_winning_move(self, piece):
-        # Check horizontal locations for win
-        for c in range(self.num_columns-3):
-            for r in range(self.num_rows):
-                if self.state[r][c] == piece and self.state[r][c+1] == piece and self.state[r][c+2] == piece and self.state[r][c+3] == piece:
-                    return True
-
-        # Check vertical locations for win
-        for c in range(self.num_columns):
-            for r in range(self.num_rows-3):
-                if self.state[r][c] == piece and self.state[r+1][c] == piece and self.state[r+2][c] == piece and self.state[r+3][c] == piece:
-                    return True
-
-        # Check positively sloped diaganols
-        for c in range(self.num_columns-3):
-            for r in range(self.num_rows-3):
-                if self.state[r][c] == piece and self.state[r+1][c+1] == piece and self.state[r+2][c+2] == piece and self.state[r+3][c+3] == piece:
-                    return True
-
-        # Check negatively sloped diaganols
-        for c in range(self.num_columns-3):
-            for r in range(3, self.num_rows):
-                if self.state[r][c] == piece and self.state[r-1][c+1] == piece and self.state[r-2][c+2] == piece and self.state[r-3][c+3] == piece:
-                    return True
+        """
+        Return True iff the coins of the given type contain four in a row. 
+        Each shift and AND halves the length of the runs left in the mask, 
+        so two of them per direction find every four in a row at once
+        """
+        bitboard = self.masks[piece]
+        for shift in self.directions:
+            pairs = bitboard & (bitboard >> shift)
+            if pairs & (pairs >> (2 * shift)):
+                return True
+        return False
+    
+    def is_last_move_win(self):
+        """
+        Return True iff the last piece dropped completed four in a row. Only
+        the lines through that piece are checked
+        """
+        col = self.prev_move_col
+        if col is None:
+            return False
+        bitboard = self.masks[self.prev_player]
+        for line in self.cell_masks[col * self.stride + self.heights[col] - 1]:
+            if bitboard & line == line:
+                return True
+        return False
     
     def is_terminal_node(self, PLAYER1_PIECE, PLAYER2_PIECE):
-        return self.is_winning_move(PLAYER1_PIECE) or self.is_winning_move(PLAYER2_PIECE) or len(self.get_available_actions()) == 0
+        return self.is_winning_move(PLAYER1_PIECE) or self.is_winning_move(PLAYER2_PIECE) or self.num_moves == self.total_slots
     
     def get_state(self):
         """
         Return the 2d list numerical representation of the board
         """
-        result = tuple(tuple(x) for x in self.state)
+        if self.cached_state is None:
+            self.cached_state = self.state_from_masks(self.masks)
+        return self.cached_state
+    
+    def state_from_masks(self, masks):
+        """
+        Return the 2d tuple representation of the board described by the 
+        bitboards in masks, with row 0 being the top row
+        """
+        (first, second) = (masks[1], masks[2])
+        stride = self.stride
+        result = []
+        for i in range(self.num_rows - 1, -1, -1):
+            row = []
+            for j in range(self.num_columns):
+                bit = 1 << (j * stride + i)
+                row.append(1 if first & bit else (2 if second & bit else 0))
+            result.append(tuple(row))
+        return tuple(result)
+
+class WindowEvaluator():
+    """A class that keeps the number of coins of each type in every line of
+    four slots on the board, so that a heuristic score summed over all the
+    lines can be updated in constant time whenever a piece is dropped or 
+    removed"""
+    
+    def __init__(self, position, window_scores, center_score):
+        """
+        Initialize the line counts and scores of a position. window_scores[a][b]
+        is the score of a line holding a coins of one type and b of the other
+        for the first type, and every coin in the center column is worth 
+        center_score to its owner
+        """
+        (self.windows, self.cell_windows) = WindowEvaluator.get_windows(position)
+        self.window_scores = window_scores
+        self.center_score = center_score
+        self.center_column = position.num_columns // 2
+        self.stride = position.stride
+        self.counts = [None, [0] * len(self.windows), [0] * len(self.windows)]
+        # total score from the point of view of each coin type
+        self.scores = (0, window_scores[0][0] * len(self.windows), window_scores[0][0] * len(self.windows))
+        # the scores from before every piece added, restored by remove
+        self.score_history = []
+        for piece in (1, 2):
+            for index in range(position.stride * position.num_columns):
+                if position.masks[piece] & (1 << index):
+                    self.add(index, piece)
+                    
+    @staticmethod
+    def get_windows(position):
+        """
+        Return the horizontal, vertical and diagonal lines of four slots of a 
+        board size as lists of bitboard bit indices, and the lines through
+        each bit
+        """
+        (num_rows, num_columns) = position.get_dimensions()
+        (windows, cell_windows, cell_masks) = get_lines(num_rows, num_columns, position.get_n_in_a_row())
+        return (windows, cell_windows)
+    
+    def add(self, index, piece):
+        """
+        Update the counts and scores for a piece dropped on a bitboard bit
+        """
+        scores = self.window_scores
+        own = self.counts[piece]
+        other = self.counts[3 - piece]
+        delta_own = 0
+        delta_other = 0
+        for w in self.cell_windows[index]:
+            (a, b) = (own[w], other[w])
+            own[w] = a + 1
+            delta_own += scores[a + 1][b] - scores[a][b]
+            delta_other += scores[b][a + 1] - scores[b][a]
+        if index // self.stride == self.center_column:
+            delta_own += self.center_score
+        self.score_history.append(self.scores)
+        if piece == 1:
+            self.scores = (self.scores[0], self.scores[1] + delta_own, self.scores[2] + delta_other)
+        else:
+            self.scores = (self.scores[0], self.scores[1] + delta_other, self.scores[2] + delta_own)
         
-        return result
+    def remove(self, index, piece):
+        """
+        Update the counts and scores for a piece removed from a bitboard bit.
+        Pieces must be removed in the reverse order they were added, which 
+        lets the scores from before the piece was added be restored as they
+        were instead of being computed again
+        """
+        own = self.counts[piece]
+        for w in self.cell_windows[index]:
+            own[w] -= 1
+        self.scores = self.score_history.pop()
+        
+    def get_score(self, piece):
+        """
+        Return the heuristic score of the position for a coin type
+        """
+        return self.scores[piece]
     
-    def get_prev_state(self):
+    def copy(self):
         """
-        Return the previous state of the board
+        Return a copy of the evaluator that can be updated without changing
+        this one
+        """
+        evaluator = WindowEvaluator.__new__(WindowEvaluator)
+        evaluator.windows = self.windows
+        evaluator.cell_windows = self.cell_windows
+        evaluator.window_scores = self.window_scores
+        evaluator.center_score = self.center_score
+        evaluator.center_column = self.center_column
+        evaluator.stride = self.stride
+        evaluator.counts = [None, self.counts[1][:], self.counts[2][:]]
+        evaluator.scores = self.scores
+        evaluator.score_history = self.score_history[:]
+        return evaluator
+
+class TranspositionTable():
+    """A class that remembers searched positions in a fixed number of slots
+    indexed by their Zobrist hash"""
+    
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+    
+    def __init__(self, size=1 << 18):
+        """
+        Initialize an empty table with size slots
         """
-        result = tuple(tuple(x) for x in self.prev_state)
+        self.size = size
+        self.table = [None] * size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
         
-        return result
+    def new_search(self):
+        """
+        Mark the entries stored so far as belonging to an older search so 
+        that they are the first to be replaced
+        """
+        self.generation += 1
+        
+    def lookup(self, zobrist_hash):
+        """
+        Return the entry (hash, depth, bound type, value, best move, 
+        generation) stored for a position, None if there is none
+        """
+        self.probes += 1
+        entry = self.table[zobrist_hash % self.size]
+        if entry is not None and entry[0] == zobrist_hash:
+            self.hits += 1
+            return entry
+        return None
     
-    def get_last_filled_information(self):
+    def store(self, zobrist_hash, depth, bound, value, move):
         """
-        Return the last visited nodes during the update step of the scores
-        within the internal graph representation and also return the last 
-        coin type inserted into the board
+        Store the result of searching a position to a given depth. A slot 
+        holding another position is only replaced by a search at least as 
+        deep, unless its entry comes from an older search
         """
-        return (self.last_visited_nodes, self.last_value)
+        index = zobrist_hash % self.size
+        entry = self.table[index]
+        if (entry is None or entry[0] == zobrist_hash or entry[5] != self.generation 
+                or depth >= entry[1]):
+            self.table[index] = (zobrist_hash, depth, bound, value, move, self.generation)
     
-    def update_slot_tracker(self, i, j, coin_type):
+    def get_hit_rate(self):
         """
-        Update the internal graph representation based on the latest insertion
-        into the board
+        Return the fraction of lookups that found their position
         """
-        self.last_visited_nodes = []
-        start_node = self.representation[i][j]
-        start_node.value = coin_type
-        self.traverse(start_node, coin_type, i, j, self.last_visited_nodes)
-        # reset all the nodes as if it hadn't been visited
-        for indices in self.last_visited_nodes:
-            self.representation[indices[0]][indices[1]].visited = False
+        return self.hits / self.probes if self.probes else 0.0
+    
+    def clear(self):
+        """
+        Remove every entry and reset the lookup counts
+        """
+        self.table = [None] * self.size
+        self.probes = 0
+        self.hits = 0
+
+class Board(Position):
+    """A class to represent the connect 4 board"""
+    
+    MARGIN_X = 300
+    MARGIN_Y = 150
+    
+    def __init__(self, num_rows, num_columns, headless=False):
+        """
+        Initialize a board with num_rows rows and num_columns columns. A 
+        headless board has no slots to draw and can only be played through
+        insert_piece
+        """
+        Position.__init__(self, num_rows, num_columns)
+        self.container = None
+        if not headless:
+            self.container = [[Slot(i, j, Slot.SIZE, Slot.SIZE, 
+                                    j*Slot.SIZE + Board.MARGIN_X, 
+                                    i*Slot.SIZE + Board.MARGIN_Y) for j in range(num_columns)] for i in range(num_rows)]
+        # the column of every piece inserted so far, in order, for the game log
+        self.played_columns = []
+        
+        self.prev_masks = None
+        self.prev_move = (None, None, None)
+    
+    def draw(self, background):
+        """
+        Method to draw the entire board on the screen
+        """
+        for i in range(self.num_rows):
+            for j in range(self.num_columns):
+                self.container[i][j].draw(background)
+                
+    def get_slot(self, row_index, col_index):
+        """
+        Return a slot on the board given its row and column indices
+        """
+        return self.container[row_index][col_index]
+    
+    def insert_coin(self, coin, background, game_logic):
+        """
+        Insert the coin in the board and update board state and
+        internal representation
+        """
+        col_num = coin.get_column()
+        row_index = self.determine_row_to_insert(col_num)
+        result = self.insert_piece(col_num, coin.get_coin_type(), game_logic)
+        self.container[row_index][col_num].set_coin(coin)
+        coin.drop(background, row_index)
+        
+        return result
+    
+    def insert_piece(self, col_num, coin_type, game_logic):
+        """
+        Insert a piece of the given coin type in the column col_num, update 
+        board state and internal representation without drawing anything 
+        and return whether the game is over
+        """
+        if self.check_column_fill(col_num):
+            raise ColumnFullException('Column is already filled!')
             
+        row_index = self.determine_row_to_insert(col_num)
+        self.prev_masks = self.masks[:]
+        self.prev_move = (row_index, col_num, coin_type)    
+        self.drop_piece(row_index, col_num, coin_type)
+        self.played_columns.append(col_num)
         
-    def traverse(self, current_node, desired_value, i, j, visited_nodes):
-        """
-        Recursively update the scores of the relevant nodes based on its
-        adjacent nodes (slots). If a coin type 1 is inserted into the board in 
-        some position i, j, then update all adjacent slots that contain 1 with
-        an updated score reflecting how many slots have 1 in a row in the top
-        left, top right, etc directions
-        """
-        current_node.visited = True
-        visited_nodes.append((i,j))
-        if current_node.top_left:
-            top_left_node = current_node.top_left
-            if top_left_node.value == desired_value:
-                current_node.top_left_score = top_left_node.top_left_score + 1
-                if not top_left_node.visited:
-                    self.traverse(top_left_node, desired_value, i - 1, j - 1, visited_nodes)
-        if current_node.top:
-            top_node = current_node.top
-            if top_node.value == desired_value:
-                current_node.top_score = top_node.top_score + 1
-                if not top_node.visited:
-                    self.traverse(top_node, desired_value, i - 1, j, visited_nodes)  
-        if current_node.top_right:
-            top_right_node = current_node.top_right
-            if top_right_node.value == desired_value:
-                current_node.top_right_score = top_right_node.top_right_score + 1
-                if not top_right_node.visited:
-                    self.traverse(top_right_node, desired_value, i - 1, j + 1, visited_nodes)          
-
-        if current_node.left:
-            left_node = current_node.left
-            if left_node.value == desired_value:
-                current_node.left_score = left_node.left_score + 1
-                if not left_node.visited:
-                    self.traverse(left_node, desired_value, i, j - 1, visited_nodes)    
-                    
-        if current_node.right:
-            right_node = current_node.right
-            if right_node.value == desired_value:
-                current_node.right_score = right_node.right_score + 1
-                if not right_node.visited:
-                    self.traverse(right_node, desired_value, i, j + 1, visited_nodes)
-                    
-        if current_node.bottom_left:
-            bottom_left_node = current_node.bottom_left
-            if bottom_left_node.value == desired_value:
-                current_node.bottom_left_score = bottom_left_node.bottom_left_score + 1
-                if not bottom_left_node.visited:
-                    self.traverse(bottom_left_node, desired_value, i + 1, j - 1, visited_nodes)
+        result = game_logic.check_game_over()
         
-        if current_node.bottom:
-            bottom_node = current_node.bottom
-            if bottom_node.value == desired_value:
-                current_node.bottom_score = bottom_node.bottom_score + 1
-                if not bottom_node.visited:
-                    self.traverse(bottom_node, desired_value, i + 1, j, visited_nodes)
-                    
-        if current_node.bottom_right:
-            bottom_right_node = current_node.bottom_right
-            if bottom_right_node.value == desired_value:
-                current_node.bottom_right_score = bottom_right_node.bottom_right_score + 1
-                if not bottom_right_node.visited:
-                    self.traverse(bottom_right_node, desired_value, i + 1, j + 1, visited_nodes)
+        return result
+            
+    def get_representation(self):
+        """
+        Return the grid of the board with row 0 being the top row, built from
+        the bitboards
+        """
+        return self.get_state()
+    
+    def get_prev_state(self):
+        """
+        Return the previous state of the board
+        """
+        return self.state_from_masks(self.prev_masks)
 
 class Coin():
     """A class that represents the coin pieces used in connect 4"""
@@ -452,32 +657,4 @@ class Coin():
         """
         pygame.draw.circle(self.surface, self.color, (Slot.SIZE // 2, Slot.SIZE // 2), Coin.RADIUS)
         self.surface = self.surface.convert()
-        background.blit(self.surface, (self.x_pos, self.y_pos))    
-
-class SlotTrackerNode():
-    """A class that that represents the node in the internal graph 
-    representation of the game board"""
-    
-    def __init__(self):
-        """
-        Initialize the SlotTrackerNode with pointers to Nodes in all 
-        8 directions surrounding along with a score count in each direction
-        """
-        self.top_left = None
-        self.top_right = None
-        self.top = None
-        self.left = None
-        self.right = None
-        self.bottom_left = None
-        self.bottom = None
-        self.bottom_right = None       
-        self.top_left_score = 1
-        self.top_right_score = 1
-        self.top_score = 1
-        self.left_score = 1
-        self.right_score = 1
-        self.bottom_left_score = 1
-        self.bottom_score = 1
-        self.bottom_right_score = 1
-        self.value = 0
-        self.visited = False
\ No newline at end of file
+        background.blit(self.surface, (self.x_pos, self.y_pos))
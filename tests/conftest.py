@@ -0,0 +1,8 @@
+import os
+import sys
+
+# the modules in src import each other by their file names and pygame opens
+# no window during the tests
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('MPLBACKEND', 'Agg')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,103 @@
+import random
+
+import numpy as np
+import pytest
+
+from Connect4_Utilities import Board, Position, ColumnFullException
+from Connect4_GameLogic import GameLogic
+from Connect4_BatchEnv import BatchEnvironment
+from Connect4_RLPlayers import ComputerPlayer
+
+
+def replay(moves, first_type):
+    board = Board(6, 7, headless=True)
+    game_logic = GameLogic(board)
+    piece = first_type
+    game_over = False
+    for col in moves:
+        assert not game_over
+        game_over = board.insert_piece(col, piece, game_logic)
+        piece = 3 - piece
+    return (board, game_logic, game_over)
+
+
+def find_draw(seed=0):
+    # a random game that fills the board without four in a row
+    generator = random.Random(seed)
+    while True:
+        position = Position(6, 7)
+        piece = 1
+        moves = []
+        while position.get_available_actions():
+            col = generator.choice(position.get_available_actions())
+            position.make_move(col, piece)
+            moves.append(col)
+            if position.is_last_move_win():
+                break
+            piece = 3 - piece
+        else:
+            return moves
+
+
+def test_batch_games_agree_with_board():
+    np.random.seed(0)
+    env = BatchEnvironment(300)
+    while not env.done.all():
+        legal_moves = env.get_legal_moves()
+        actions = np.argmax(np.random.random(legal_moves.shape) * legal_moves, axis=1)
+        (rewards, done) = env.step(actions)
+        for game in np.flatnonzero(legal_moves.any(axis=1)).tolist():
+            (board, game_logic, game_over) = replay(env.get_moves(game), int(env.first_player[game]))
+            assert np.array_equal(env.boards[game], np.array(board.get_state()))
+            assert done[game] == game_over
+            if game_over:
+                assert env.winner[game] == game_logic.get_winner()
+                assert rewards[game] == (0.5 if game_logic.get_winner() == 0 else 1)
+            assert legal_moves[game].tolist() == [col in replay(env.get_moves(game)[:-1], int(env.first_player[game]))[0].get_available_actions()
+                                                  for col in range(7)]
+
+
+def test_draw_and_full_column():
+    moves = find_draw()
+    env = BatchEnvironment(1)
+    env.current_player[:] = 1
+    for col in moves:
+        (rewards, done) = env.step([col])
+    (board, game_logic, game_over) = replay(moves, 1)
+    assert game_over and game_logic.get_winner() == 0 and board.check_board_filled()
+    assert done[0] and env.winner[0] == 0 and rewards[0] == 0.5
+    assert not env.get_legal_moves().any()
+
+    env = BatchEnvironment(2)
+    board = Board(6, 7, headless=True)
+    game_logic = GameLogic(board)
+    for i in range(6):
+        env.step([0, 1 + i % 2])
+        board.insert_piece(0, 1 + i % 2, game_logic)
+    assert env.get_legal_moves()[0].tolist() == [False] + [True] * 6
+    with pytest.raises(ColumnFullException):
+        env.step([0, 0])
+    with pytest.raises(ColumnFullException):
+        board.insert_piece(0, 1, game_logic)
+
+
+@pytest.mark.parametrize('symmetric', [False, True])
+def test_batch_choice_is_greedy(symmetric):
+    np.random.seed(1)
+    player = ComputerPlayer(1, 'qlearner', 0.0, symmetric=symmetric).player
+    env = BatchEnvironment(200)
+    for _ in range(6):
+        legal_moves = env.get_legal_moves()
+        env.step(np.argmax(np.random.random(legal_moves.shape) * legal_moves, axis=1))
+    states = env.get_states(np.arange(200))
+    generator = random.Random(2)
+    for state in states:
+        for col in range(7):
+            if generator.random() < 0.5:
+                player.setQ(state, col, generator.choice([0.0, 0.5, 2.0]))
+    legal_moves = env.get_legal_moves()
+    for passed in (None, states):
+        chosen = player.choose_actions(env.boards, legal_moves, passed)
+        for (state, legal, col) in zip(states, legal_moves.tolist(), chosen.tolist()):
+            values = [player.getQ(state, a) for a in range(7) if legal[a]]
+            assert legal[col] and player.getQ(state, col) == max(values)
@@ -0,0 +1,43 @@
+import json
+
+from Connect4_Benchmark import make_result, compare_results, main
+
+
+RESULT_KEYS = {'group', 'name', 'metric', 'value', 'unit', 'better'}
+METADATA_KEYS = {'timestamp', 'python', 'platform', 'processor', 'cpu_count', 'commit'}
+
+
+def test_results_file_schema(tmp_path):
+    path = str(tmp_path / 'results.json')
+    results = main(['--output', path, '--types', 'random', 'qlearner', '--games', '2', '--batch-games', '8',
+                    '--positions', '2', '--number', '10'])
+    with open(path) as f:
+        data = json.load(f)
+    assert set(data) == {'metadata', 'results'}
+    assert set(data['metadata']) == METADATA_KEYS
+    assert data['results'] == results
+    assert {result['group'] for result in results} == {'micro', 'player', 'game', 'batch'}
+    for result in results:
+        assert set(result) == RESULT_KEYS
+        assert isinstance(result['value'], (int, float))
+        assert result['better'] in ('lower', 'higher', None)
+    names = {(result['group'], result['name']) for result in results}
+    assert ('player', 'ComputerPlayer(qlearner)') in names
+    assert ('game', 'random vs qlearner') in names
+    assert ('batch', 'qlearner vs random') in names
+
+
+def test_compare_results_reports_only_regressions():
+    baseline = [make_result('micro', 'a', 'time_per_call', 10.0, 'us', 'lower'),
+                make_result('game', 'b', 'games_per_second', 100.0, 'games/s', 'higher'),
+                make_result('game', 'b', 'p1_win_rate', 0.5, 'fraction', None),
+                make_result('micro', 'c', 'time_per_call', 0.0, 'us', 'lower')]
+    results = [make_result('micro', 'a', 'time_per_call', 12.0, 'us', 'lower'),
+               make_result('game', 'b', 'games_per_second', 95.0, 'games/s', 'higher'),
+               make_result('game', 'b', 'p1_win_rate', 0.1, 'fraction', None),
+               make_result('micro', 'c', 'time_per_call', 5.0, 'us', 'lower'),
+               make_result('micro', 'd', 'time_per_call', 5.0, 'us', 'lower')]
+    regressions = compare_results(results, baseline)
+    assert [(result['name'], old) for (result, old, change) in regressions] == [('a', 10.0)]
+    assert abs(regressions[0][2] - 0.2) < 1e-9
+    assert [result['name'] for (result, old, change) in compare_results(results, baseline, threshold=0.01)] == ['a', 'b']
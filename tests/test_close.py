@@ -0,0 +1,20 @@
+from Connect4_RLPlayers import ComputerPlayer
+from Connect4_Headless import HeadlessMatch
+
+
+def test_closing_a_match_shuts_down_the_mcts_pool():
+    p1 = ComputerPlayer(1, 'montecarlo', num_workers=2)
+    p1.player.itermax = 50
+    p2 = ComputerPlayer(2, 'random')
+    match = HeadlessMatch(p1, p2)
+    match.play_game()
+    pool = p1.player.pool
+    assert pool is not None
+    processes = list(pool._pool)
+    match.close()
+    assert p1.player.pool is None
+    for process in processes:
+        process.join(timeout=5)
+        assert not process.is_alive()
+    # closing twice and closing players without workers is harmless
+    match.close()
@@ -0,0 +1,32 @@
+import random
+
+import numpy as np
+
+from Connect4_QTable import CompactQTable
+from test_qtable import random_states
+
+
+def test_compact_table_matches_dict():
+    generator = random.Random(3)
+    states = random_states(2000, seed=3)
+    table = CompactQTable(capacity=8)
+    q = {}
+    for _ in range(5000):
+        key = (generator.choice(states), generator.randrange(7))
+        if generator.random() < 0.5:
+            value = generator.uniform(-2, 1)
+            table[key] = value
+            q[key] = value
+        else:
+            assert table.get(key, 1.0) == (np.float32(q[key]) if key in q else 1.0)
+    assert len(table) == len(q)
+    assert table.capacity * CompactQTable.MAX_LOAD >= table.num_states
+    assert {key: np.float32(value) for (key, value) in q.items()} == dict(table.items())
+
+
+def test_compact_table_never_stores_defaults():
+    table = CompactQTable()
+    state = random_states(1, seed=5)[0]
+    assert table.get((state, 3), 1.0) == 1.0
+    assert (state, 3) not in table
+    assert len(table) == 0 and table.num_states == 0
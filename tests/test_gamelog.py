@@ -0,0 +1,100 @@
+import random
+
+from Connect4_Utilities import Position
+from Connect4_GameLogic import GameLogic
+from Connect4_GameLog import GameLogWriter, GameLog
+from Connect4_BatchEnv import play_batch_games
+from Connect4_RLPlayers import ComputerPlayer
+from Connect4_ParallelTrainer import ParallelTrainer
+from Connect4_Sweep import Sweep
+
+
+def random_game(generator):
+    position = Position(6, 7)
+    first_type = generator.randint(1, 2)
+    piece = first_type
+    moves = []
+    winner = 0
+    while position.get_available_actions():
+        col = generator.choice(position.get_available_actions())
+        position.make_move(col, piece)
+        moves.append(col)
+        if position.is_last_move_win():
+            winner = piece
+            break
+        piece = 3 - piece
+    return (moves, winner, first_type, position.get_state())
+
+
+def check_log(path, num_games):
+    log = GameLog(path)
+    assert len(log) == num_games
+    for index in range(len(log)):
+        (moves, winner, first_type) = log.get_game(index)
+        board = log.get_board(index)
+        assert board.played_columns == moves
+        assert GameLogic(board).check_game_over() or len(moves) == 42
+        assert winner in (0, board.prev_player)
+    log.close()
+
+
+def test_game_log_round_trip(tmp_path):
+    generator = random.Random(0)
+    games = [random_game(generator) for _ in range(300)]
+    path = str(tmp_path / 'games.c4log')
+    writer = GameLogWriter(path)
+    for (moves, winner, first_type, state) in games[:200]:
+        writer.append(moves, winner, first_type)
+    writer.close()
+    # a reopened log is appended to
+    writer = GameLogWriter(path)
+    for (moves, winner, first_type, state) in games[200:]:
+        writer.append(moves, winner, first_type)
+    writer.close()
+
+    log = GameLog(path)
+    assert list(log) == [(moves, winner, first_type) for (moves, winner, first_type, state) in games]
+    for index in range(0, 300, 17):
+        assert log.get_board(index).get_state() == games[index][3]
+    log.close()
+
+
+def test_append_log_copies_every_game(tmp_path):
+    generator = random.Random(1)
+    games = [random_game(generator)[:3] for _ in range(50)]
+    (first_path, second_path) = (str(tmp_path / 'first.c4log'), str(tmp_path / 'second.c4log'))
+    writer = GameLogWriter(second_path)
+    for game in games[10:]:
+        writer.append(*game)
+    writer.close()
+    writer = GameLogWriter(first_path)
+    for game in games[:10]:
+        writer.append(*game)
+    assert writer.append_log(second_path) == 40
+    writer.close()
+    log = GameLog(first_path)
+    assert list(log) == games
+    log.close()
+
+
+def test_batch_games_are_logged(tmp_path):
+    path = str(tmp_path / 'batch.c4log')
+    writer = GameLogWriter(path)
+    p1 = ComputerPlayer(1, 'random').player
+    p2 = ComputerPlayer(2, 'random').player
+    winners = play_batch_games(p1, p2, 100, batch_size=32, game_log=writer)
+    writer.close()
+    check_log(path, 100)
+    log = GameLog(path)
+    assert [winner for (moves, winner, first_type) in log] == winners
+    log.close()
+
+
+def test_worker_games_are_logged(tmp_path):
+    path = str(tmp_path / 'workers.c4log')
+    writer = GameLogWriter(path)
+    ParallelTrainer('qlearner', 'random', num_workers=2).train(30, sync_every=10, seed=0, game_log=writer)
+    Sweep('qlearner', 'random', num_workers=2).run([{'alpha': 0.1}, {'alpha': 0.5}], 5, 2, seed=0, game_log=writer)
+    writer.close()
+    check_log(path, 30 + 20)
+    assert not [name for name in tmp_path.iterdir() if name.name != 'workers.c4log']
@@ -0,0 +1,63 @@
+import json
+
+from Connect4_RLPlayers import ComputerPlayer
+from Connect4_Headless import HeadlessMatch
+from Connect4_Instrumentation import MoveInstrumentation, Histogram, get_player_counters, TIMERS
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram(bounds=(1, 2, 4))
+    for value in (0.5, 1, 1.5, 3, 3, 10):
+        histogram.add(value)
+    summary = histogram.to_dict()
+    assert summary['counts'] == [2, 1, 2, 1]
+    assert summary['count'] == 6 and summary['max'] == 10
+    assert abs(summary['mean'] - 19 / 6) < 1e-9
+    assert summary['p50'] == 2 and summary['p95'] == 10
+    assert Histogram().to_dict()['p50'] == 0.0
+
+
+def test_every_move_is_timed_and_counted(tmp_path):
+    path = str(tmp_path / 'moves.jsonl')
+    instrumentation = MoveInstrumentation(path)
+    p1 = ComputerPlayer(1, 'qlearner', instrumentation=instrumentation)
+    p2 = ComputerPlayer(2, 'minimax', instrumentation=instrumentation)
+    p2.player.depth = 2
+    match = HeadlessMatch(p1, p2)
+    for _ in range(3):
+        match.play_game()
+    instrumentation.close()
+    names = ['p1-QLearningPlayer', 'p2-MiniMaxPlayer']
+    assert sorted(instrumentation.get_players()) == names
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == instrumentation.records
+    for name in names:
+        records = instrumentation.get_records(name)
+        summary = instrumentation.get_summary(name)
+        assert summary['moves'] == len(records) > 0
+        for timer in TIMERS:
+            assert summary['latency'][timer]['count'] == len(records)
+        for record in records:
+            assert record['choose'] >= 0 and record['learn'] >= 0
+            assert abs(record['other'] - max(record['move'] - record['choose'] - record['learn'], 0)) < 1e-9
+    learner = instrumentation.get_summary(names[0])
+    assert learner['q_lookups'] > 0
+    # the size is taken when the move is chosen, before learning from it
+    assert 0 < learner['q_size'] <= len(p1.player.q)
+    searcher = instrumentation.get_summary(names[1])
+    assert searcher['nodes'] == p2.player.nodes == get_player_counters(p2.player)['nodes']
+    assert searcher['tt_probes'] == p2.player.tt.probes
+
+
+def test_detached_players_are_not_recorded():
+    instrumentation = MoveInstrumentation(keep_records=False)
+    p1 = ComputerPlayer(1, 'sarsalearner', instrumentation=instrumentation)
+    p2 = ComputerPlayer(2, 'random')
+    match = HeadlessMatch(p1, p2)
+    match.play_game()
+    moves = instrumentation.get_summary('p1-SarsaLearningPlayer')['moves']
+    assert instrumentation.records == [] and moves > 0
+    instrumentation.detach(p1)
+    assert 'getQ' not in vars(p1.player) and 'get_q_values' not in vars(p1.player)
+    match.play_game()
+    assert instrumentation.get_summary('p1-SarsaLearningPlayer')['moves'] == moves
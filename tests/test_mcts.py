@@ -0,0 +1,26 @@
+from Connect4_Utilities import Board
+from Connect4_GameLogic import GameLogic
+from Connect4_RLPlayers import MonteCarloPlayer
+
+
+def start_board():
+    board = Board(6, 7, headless=True)
+    game_logic = GameLogic(board)
+    board.insert_piece(3, 2, game_logic)
+    return (board, game_logic)
+
+
+def test_playouts_are_counted():
+    (board, game_logic) = start_board()
+    player = MonteCarloPlayer(1, 1, itermax=30)
+    move = player.choose_action(board.get_state(), board.get_available_actions(), None, board, game_logic, None)
+    assert move in board.get_available_actions() and player.playouts == 30
+
+
+def test_no_playouts_still_plays_a_move():
+    (board, game_logic) = start_board()
+    for num_workers in (None, 2):
+        player = MonteCarloPlayer(1, 1, num_workers=num_workers, itermax=0)
+        move = player.choose_action(board.get_state(), board.get_available_actions(), None, board, game_logic, None)
+        assert move in board.get_available_actions() and player.playouts == 0
+        player.close()
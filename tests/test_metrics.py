@@ -0,0 +1,26 @@
+from Connect4_Metrics import GameMetrics, read_metrics
+
+
+def record_games(path, num_games, **kwargs):
+    metrics = GameMetrics(str(path), **kwargs)
+    for game in range(num_games):
+        metrics.record_game(game % 3, 0.01)
+    metrics.close()
+    return metrics
+
+
+def test_blocking_sink_writes_every_row(tmp_path):
+    path = tmp_path / 'metrics.csv'
+    metrics = record_games(path, 2000, max_queue=4)
+    rows = read_metrics(str(path))
+    assert metrics.sink.dropped == 0
+    assert rows['game'].tolist() == list(range(1, 2001))
+
+
+def test_dropping_sink_counts_the_rows_it_drops(tmp_path):
+    path = tmp_path / 'metrics.jsonl'
+    metrics = record_games(path, 2000, max_queue=1, block=False)
+    rows = read_metrics(str(path))
+    assert len(rows['game']) + metrics.sink.dropped == 2000
+    # the rows that were kept are written in order
+    assert sorted(rows['game'].tolist()) == rows['game'].tolist()
@@ -0,0 +1,33 @@
+import pytest
+
+from Connect4_ParallelTrainer import merge_q_tables
+
+
+def worker_tables():
+    # both workers updated 'shared', each updated one key of its own
+    first = ({'shared': 1.0, 'first': 0.5}, {'shared': 3, 'first': 2})
+    second = ({'shared': -1.0, 'second': 2.0}, {'shared': 1, 'second': 4})
+    return [first, second]
+
+
+def test_average_weights_by_visits():
+    master = {'untouched': 0.25, 'first': 9.0}
+    visits = merge_q_tables(master, worker_tables(), 'average')
+    assert master['shared'] == pytest.approx((3 * 1.0 + 1 * -1.0) / 4)
+    # keys of only one worker take its value, the others are left alone
+    assert master['first'] == 0.5 and master['second'] == 2.0 and master['untouched'] == 0.25
+    assert visits == {'shared': 4, 'first': 2, 'second': 4}
+
+
+def test_max_and_latest():
+    master = {}
+    merge_q_tables(master, worker_tables(), 'max')
+    assert master == {'shared': 1.0, 'first': 0.5, 'second': 2.0}
+    master = {}
+    merge_q_tables(master, worker_tables(), 'latest')
+    assert master == {'shared': -1.0, 'first': 0.5, 'second': 2.0}
+
+
+def test_unknown_rule():
+    with pytest.raises(ValueError):
+        merge_q_tables({}, worker_tables(), 'median')
@@ -0,0 +1,58 @@
+from Connect4_RLPlayers import ComputerPlayer
+from Connect4_Headless import HeadlessMatch
+from Connect4_Utilities import Board
+from Connect4_GameLogic import GameLogic
+
+
+def test_pondering_stops_when_the_game_ends():
+    p1 = ComputerPlayer(1, 'minimax', ponder=True)
+    board = Board(6, 7, headless=True)
+    game_logic = GameLogic(board)
+    p1.play_move(board, game_logic)
+    thread = p1.player.ponder_thread
+    assert thread is not None
+    p1.finish_game(board, game_logic)
+    assert p1.player.ponder_thread is None and not thread.is_alive()
+    assert not p1.player.stop_event.is_set()
+
+
+def test_headless_matches_do_not_ponder_by_default():
+    p1 = ComputerPlayer(1, 'minimax', ponder=True)
+    p2 = ComputerPlayer(2, 'montecarlo', ponder=True)
+    HeadlessMatch(p1, p2)
+    assert not p1.ponder and not p2.ponder
+    p1 = ComputerPlayer(1, 'minimax', ponder=True)
+    p1.player.depth = 1
+    p2 = ComputerPlayer(2, 'random')
+    match = HeadlessMatch(p1, p2, ponder=True)
+    assert p1.ponder
+    for _ in range(3):
+        match.play_game()
+        assert p1.player.ponder_thread is None
+    match.close()
+
+
+def test_game_view_passes_ponder_to_the_computer():
+    from Connect4_GameView import GameView
+    from Connect4_Players import HumanPlayer
+    view = GameView()
+    view.trainedComputer = ComputerPlayer(1, 'minimax')
+    view.ponder = True
+    view.initialize_game_variables('single', HumanPlayer(1), None, 0.2, 0.3, 0.9, 1)
+    computer = view.p2
+    assert computer is view.trainedComputer and computer.ponder
+    computer.play_move(view.game_board, view.game_logic)
+    thread = computer.player.ponder_thread
+    assert thread is not None
+    computer.finish_game(view.game_board, view.game_logic)
+    assert computer.player.ponder_thread is None and not thread.is_alive()
+    view.ponder = False
+    view.initialize_game_variables('single', HumanPlayer(1), None, 0.2, 0.3, 0.9, 1)
+    assert not computer.ponder
+    view.ponder = True
+    view.initialize_game_variables('single', HumanPlayer(1), None, 0.2, 0.3, 0.9, 1)
+    computer.play_move(view.game_board, view.game_logic)
+    thread = computer.player.ponder_thread
+    assert thread is not None
+    view.quit()
+    assert computer.player.ponder_thread is None and not thread.is_alive()
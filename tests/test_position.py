@@ -0,0 +1,81 @@
+import random
+
+from Connect4_Utilities import Position, Board
+from Connect4_GameLogic import GameLogic
+
+
+def has_four(state, piece):
+    rows = len(state)
+    cols = len(state[0])
+    for i in range(rows):
+        for j in range(cols):
+            for (di, dj) in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+                cells = [(i + k * di, j + k * dj) for k in range(4)]
+                if all(0 <= r < rows and 0 <= c < cols and state[r][c] == piece for (r, c) in cells):
+                    return True
+    return False
+
+
+def random_games(num_games, seed=0):
+    generator = random.Random(seed)
+    for _ in range(num_games):
+        position = Position(6, 7)
+        piece = 1
+        while position.get_available_actions():
+            position.make_move(generator.choice(position.get_available_actions()), piece)
+            yield position
+            if position.is_last_move_win():
+                break
+            piece = 3 - piece
+
+
+def test_win_detection_matches_brute_force():
+    for position in random_games(200):
+        state = position.get_state()
+        assert position.is_winning_move(1) == has_four(state, 1)
+        assert position.is_winning_move(2) == has_four(state, 2)
+        assert position.is_last_move_win() == has_four(state, position.prev_player)
+
+
+def test_undo_move_restores_the_position():
+    generator = random.Random(1)
+    position = Position(6, 7)
+    snapshots = []
+    piece = 1
+    for _ in range(30):
+        snapshots.append((position.masks[:], position.heights[:], position.zobrist_hash,
+                          list(position.available_actions), position.num_moves, position.get_state()))
+        position.make_move(generator.choice(position.get_available_actions()), piece)
+        piece = 3 - piece
+    for snapshot in reversed(snapshots):
+        position.undo_move()
+        assert (position.masks, position.heights, position.zobrist_hash,
+                position.available_actions, position.num_moves, position.get_state()) == snapshot
+
+
+def test_board_agrees_with_game_logic():
+    generator = random.Random(2)
+    for _ in range(100):
+        board = Board(6, 7, headless=True)
+        game_logic = GameLogic(board)
+        piece = 1
+        game_over = False
+        while not game_over:
+            game_over = board.insert_piece(generator.choice(board.get_available_actions()), piece, game_logic)
+            assert game_over == (board.is_last_move_win() or board.check_board_filled())
+            piece = 3 - piece
+        winner = game_logic.get_winner()
+        assert winner == (board.prev_player if board.is_last_move_win() else 0)
+        assert winner == 0 or has_four(board.get_representation(), winner)
+
+
+def test_board_copy_is_a_position():
+    board = Board(6, 7, headless=True)
+    game_logic = GameLogic(board)
+    for col in (3, 3, 4):
+        board.insert_piece(col, board.current_player or 1, game_logic)
+    position = board.copy()
+    assert type(position) is Position
+    position.make_move(5, position.current_player)
+    assert board.num_moves == 3 and board.played_columns == [3, 3, 4]
+    assert position.get_state() != board.get_representation()
@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+
+from Connect4_Utilities import Position
+from Connect4_QTable import pack_state, unpack_state, save_q_table, load_q_table
+
+
+def random_states(num_states, seed=0):
+    generator = random.Random(seed)
+    states = []
+    for _ in range(num_states):
+        position = Position(6, 7)
+        piece = generator.randint(1, 2)
+        for _ in range(generator.randrange(43)):
+            if not position.get_available_actions():
+                break
+            position.make_move(generator.choice(position.get_available_actions()), piece)
+            piece = 3 - piece
+        states.append(position.get_state())
+    return states
+
+
+def random_q(num_entries, seed=0):
+    generator = random.Random(seed)
+    return {(state, generator.randrange(7)): generator.uniform(-2, 1) for state in random_states(num_entries, seed)}
+
+
+def test_pack_state_round_trip():
+    states = random_states(500)
+    keys = [pack_state(state) for state in states]
+    assert [unpack_state(key) for key in keys] == states
+    assert all(0 < key < 2**64 for key in keys)
+    # different states never share a key
+    assert len(set(keys)) == len(set(states))
+
+
+def test_saved_table_matches_dict(tmp_path):
+    q = random_q(300)
+    path = str(tmp_path / 'q.bin')
+    save_q_table(q, path, 'QLearningPlayer', 0.2, 0.3, 0.9)
+    table = load_q_table(path)
+    assert table.metadata == {'player_type': 'QLearningPlayer', 'epsilon': 0.2, 'alpha': 0.3, 'gamma': 0.9}
+    for (key, value) in q.items():
+        assert np.isclose(table.get(key), value)
+    assert len(table) == len(q)
+    assert table.get((random_states(1, seed=99)[0], 0), 1.0) == 1.0
+    # writes go to the overlay and leave the file untouched
+    key = next(iter(q))
+    table[key] = 5.0
+    assert table[key] == 5.0 and np.isclose(table.get_saved(key), q[key])
+    assert len(table) == len(q)
+    assert dict(table.items())[key] == 5.0
+    table.close()
+
+
+def test_len_counts_each_written_entry_once(tmp_path):
+    q = random_q(200)
+    path = str(tmp_path / 'q.bin')
+    save_q_table(q, path)
+    table = load_q_table(path)
+    new_keys = [(state, 3) for state in random_states(20, seed=7) if (state, 3) not in q]
+    for key in new_keys + new_keys:
+        table[key] = 0.5
+    for key in list(q)[:50]:
+        table[key] = 0.5
+    assert table.num_saved is None
+    assert len(table) == len(q) + len(set(new_keys)) == len(dict(table.items()))
+    table.close()
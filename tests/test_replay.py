@@ -0,0 +1,125 @@
+import random
+
+import numpy as np
+import pytest
+
+from Connect4_Utilities import Board
+from Connect4_GameLogic import GameLogic
+from Connect4_GameLog import GameLogWriter, GameLog
+from Connect4_RLPlayers import ComputerPlayer
+from Connect4_Replay import ReplayBuffer, OfflineTrainer
+from test_gamelog import random_game
+
+PLAYERS = [(player_type, symmetric) for player_type in ('qlearner', 'sarsalearner') for symmetric in (False, True)]
+
+
+@pytest.fixture(scope='module')
+def game_log(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('replay') / 'games.c4log')
+    generator = random.Random(0)
+    writer = GameLogWriter(path)
+    for _ in range(200):
+        writer.append(*random_game(generator)[:3])
+    writer.close()
+    log = GameLog(path)
+    yield log
+    log.close()
+
+
+def replay_moves(log, player):
+    # the moves of the player's coin type as the live game hands them to update
+    transitions = []
+    for (moves, winner, first_type) in log:
+        board = Board(log.num_rows, log.num_columns, headless=True)
+        game_logic = GameLogic(board)
+        piece = first_type
+        for col in moves:
+            actions = board.get_available_actions()
+            prev_state = board.get_state()
+            game_over = board.insert_piece(col, piece, game_logic)
+            if piece == player.get_coin_type():
+                reward = player.get_reward(game_over, game_logic.get_winner())
+                transitions.append((prev_state, col, reward, board.get_state(), actions))
+            piece = 3 - piece
+    return transitions
+
+
+def make_player(player_type, symmetric):
+    return ComputerPlayer(1, player_type, 0.0, 0.3, 0.9, symmetric=symmetric).player
+
+
+@pytest.mark.parametrize('player_type, symmetric', PLAYERS)
+def test_buffer_holds_the_replayed_moves(game_log, player_type, symmetric):
+    player = make_player(player_type, symmetric)
+    buffer = ReplayBuffer(player)
+    buffer.add_game_log(game_log, batch_size=64)
+    (states, actions, rewards, next_states, next_actions, legal_moves) = buffer.get_arrays()
+    transitions = replay_moves(game_log, player)
+    assert len(buffer) == len(transitions)
+    generator = np.random.default_rng(0)
+    for (prev_state, col, reward, result_state, legal) in transitions[::3]:
+        player.setQ(prev_state, col, float(generator.random()))
+    trainer = OfflineTrainer(player, buffer)
+    errors = trainer.get_errors(np.arange(len(transitions)))
+    for (i, (prev_state, col, reward, result_state, legal)) in enumerate(transitions):
+        assert (buffer.states[states[i]], actions[i]) == player.get_key(prev_state, col)
+        assert rewards[i] == reward
+        if player_type == 'qlearner':
+            future = max(player.getQ(result_state, a) for a in legal)
+        else:
+            future = player.getQ(result_state, col)
+        assert errors[i] == pytest.approx(reward + player.gamma * future - player.getQ(prev_state, col))
+
+
+@pytest.mark.parametrize('player_type, symmetric', PLAYERS)
+def test_offline_updates_match_live_updates(game_log, player_type, symmetric):
+    offline = make_player(player_type, symmetric)
+    live = make_player(player_type, symmetric)
+    buffer = ReplayBuffer(offline)
+    buffer.add_game_log(game_log)
+    transitions = replay_moves(game_log, live)
+    for transition in transitions:
+        live.update(*transition)
+
+    # one transition per batch, in the order they were played
+    trainer = OfflineTrainer(offline, buffer, batch_size=1)
+    order = iter(range(len(transitions)))
+    trainer.sample = lambda: (np.array([next(order)]), 1.0)
+    trainer.train(len(transitions))
+    assert trainer.commit() == len(live.q)
+    for (key, value) in live.q.items():
+        assert offline.q[key] == pytest.approx(value)
+
+
+@pytest.mark.parametrize('player_type, symmetric', PLAYERS)
+def test_repeated_transitions_in_a_large_batch(tmp_path, player_type, symmetric):
+    # a log of one game played again and again, so that a batch holds every
+    # transition many times
+    path = str(tmp_path / 'same.c4log')
+    (moves, winner, first_type, state) = random_game(random.Random(4))
+    writer = GameLogWriter(path)
+    for _ in range(50):
+        writer.append(moves, winner, 1)
+    writer.close()
+    log = GameLog(path)
+    offline = make_player(player_type, symmetric)
+    live = make_player(player_type, symmetric)
+    buffer = ReplayBuffer(offline)
+    buffer.add_game_log(log)
+    transitions = replay_moves(log, live)
+    # the moves of the first game, the others are the same
+    transitions = transitions[:len(transitions) // 50]
+    for _ in range(300):
+        for transition in transitions:
+            live.update(*transition)
+    log.close()
+
+    trainer = OfflineTrainer(offline, buffer, batch_size=4096, seed=0)
+    for _ in range(300):
+        trainer.train_batch()
+        # no entry moves past the values the rewards can reach
+        assert np.abs(trainer.q).max() <= 1 / (1 - offline.gamma)
+    trainer.commit()
+    assert set(offline.q) == set(live.q)
+    for (key, value) in live.q.items():
+        assert offline.q[key] == pytest.approx(value, abs=1e-6)
@@ -0,0 +1,41 @@
+import random
+
+from Connect4_RLPlayers import MonteCarloPlayer
+from Connect4_Utilities import Board
+
+
+def search_tree():
+    random.seed(0)
+    board = Board(6, 7, headless=True)
+    player = MonteCarloPlayer(1, 1.4, itermax=2000, timeout=60)
+    player.choose_action(None, board.get_available_actions(), None, board, None, None)
+    return player.tree
+
+
+def get_subtree(tree, node):
+    """
+    Return the (move, player, visits, wins) of the nodes of a subtree and
+    of their children, depth first
+    """
+    children = [get_subtree(tree, child) for child in tree.get_children(node).tolist()] if tree.is_expanded(node) else None
+    return (int(tree.move[node]), int(tree.player[node]), int(tree.visits[node]), float(tree.wins[node]), children)
+
+
+def test_extract_copies_the_subtree():
+    tree = search_tree()
+    assert tree.get_subtree_size(0) == tree.size
+    for child in tree.get_children(0).tolist():
+        subtree = tree.extract(child)
+        assert subtree.size == tree.get_subtree_size(child)
+        (move, player, visits, wins, children) = get_subtree(tree, child)
+        assert get_subtree(subtree, 0)[1:] == (player, visits, wins, children)
+        assert subtree.parent[0] == -1
+
+
+def test_extract_frees_the_rest_of_the_tree():
+    tree = search_tree()
+    for child in tree.get_children(0).tolist():
+        subtree = tree.extract(child)
+        # room for the subtree and as much again, not for the whole tree
+        assert subtree.capacity == 2 * subtree.size
+        assert subtree.nbytes() < tree.nbytes()
@@ -0,0 +1,97 @@
+import random
+
+from Connect4_Utilities import Position
+from Connect4_Solver import Solver, OpeningBook, build_opening_book
+
+
+def brute_force(position, piece):
+    # plain negamax over every move, with the scores of Solver
+    (rows, cols) = position.get_dimensions()
+    total_slots = rows * cols
+    actions = position.get_available_actions()
+    if not actions:
+        return 0
+    best = -total_slots
+    for col in actions:
+        position.make_move(col, piece)
+        if position.is_last_move_win():
+            score = (total_slots + 1 - (position.num_moves - 1)) // 2
+        else:
+            score = -brute_force(position, 3 - piece)
+        position.undo_move()
+        best = max(best, score)
+    return best
+
+
+def random_positions(num_rows, num_columns, num_positions, min_moves, max_moves=None, seed=0):
+    generator = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        position = Position(num_rows, num_columns)
+        piece = 1
+        for _ in range(generator.randint(min_moves, max_moves if max_moves is not None else num_rows * num_columns - 1)):
+            position.make_move(generator.choice(position.get_available_actions()), piece)
+            if position.is_last_move_win():
+                break
+            piece = 3 - piece
+        else:
+            positions.append((position, piece))
+    return positions
+
+
+def test_solver_scores_match_brute_force():
+    for (num_rows, num_columns, min_moves) in ((4, 5, 10), (6, 7, 32)):
+        for (position, piece) in random_positions(num_rows, num_columns, 40, min_moves):
+            solver = Solver(num_rows, num_columns, tt_size=1 << 12)
+            current = position.masks[piece]
+            mask = position.masks[1] | position.masks[2]
+            expected = brute_force(position, piece)
+            assert solver.solve(current, mask, position.num_moves) == expected
+            (col, score) = solver.best_move(current, mask, position.num_moves)
+            assert score == expected
+            position.make_move(col, piece)
+            if not position.is_last_move_win():
+                assert -brute_force(position, 3 - piece) == expected
+
+
+def test_opening_book_holds_exact_scores(tmp_path):
+    path = str(tmp_path / 'book.bin')
+    count = build_opening_book(path, 2, 4, 4, num_workers=1)
+    book = OpeningBook(path)
+    solver = Solver(4, 4)
+    assert book.depth == 2 and book.num_positions == count
+    for (position, piece) in random_positions(4, 4, 30, 0, 2, seed=1):
+        if solver.can_win_next(position.masks[piece], position.masks[1] | position.masks[2]):
+            continue
+        current = position.masks[piece]
+        mask = position.masks[1] | position.masks[2]
+        key = min(solver.get_key(current, mask), solver.get_mirrored_key(current, mask))
+        assert book.get(key) == Solver(4, 4).solve(current, mask, position.num_moves)
+    book.close()
+
+
+def test_positions_not_solved_in_time_are_left_out(tmp_path):
+    path = str(tmp_path / 'book.bin')
+    assert build_opening_book(path, 1, 4, 5, num_workers=1, time_limit=0) == 0
+    book = OpeningBook(path)
+    assert book.num_positions == 0 and book.get(0) is None
+    book.close()
+
+
+def test_solver_player_counts_its_fallback_moves():
+    from Connect4_RLPlayers import SolverPlayer
+    from Connect4_Instrumentation import get_player_counters
+    player = SolverPlayer(1, time_budget=0, book_path=None)
+    position = Position(6, 7)
+    actions = position.get_available_actions()
+    col = player.choose_action(position.get_state(), actions, None, position, None, None)
+    assert col in actions
+    assert player.last_source == 'minimax' and player.last_score is None
+    assert player.fallback_moves == 1 and get_player_counters(player)['fallback_moves'] == 1
+    # a nearly full board is solved within any budget
+    (position, piece) = random_positions(6, 7, 1, 36, 38, seed=3)[0]
+    player = SolverPlayer(piece, time_budget=5, book_path=None)
+    actions = position.get_available_actions()
+    player.choose_action(position.get_state(), actions, None, position, None, None)
+    assert player.last_source == 'solver' and player.fallback_moves == 0
+    assert player.last_score == brute_force(position, piece)
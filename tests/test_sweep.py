@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from Connect4_Sweep import (Sweep, SweepResults, grid_search_space, random_search_space, load_sweep_results,
+                            parse_values)
+
+
+def make_run(params, seed, p1_wins, rate):
+    return {'params': params, 'seed': seed, 'p1_wins': p1_wins, 'p2_wins': [0] * len(p1_wins),
+            'draws': [0] * len(p1_wins), 'game_time': [0.1] * len(p1_wins),
+            'p1_win_rate': rate, 'p2_win_rate': 1 - rate, 'draw_rate': 0.0}
+
+
+def test_grid_search_space():
+    settings = grid_search_space({'gamma': [0.9, 0.5], 'alpha': [0.1, 0.2, 0.3]})
+    assert len(settings) == 6
+    assert settings[0] == {'alpha': 0.1, 'gamma': 0.9}
+    assert settings[1] == {'alpha': 0.1, 'gamma': 0.5}
+    assert sorted((s['alpha'], s['gamma']) for s in settings) == sorted((a, g) for a in (0.1, 0.2, 0.3) for g in (0.9, 0.5))
+
+
+def test_random_search_space():
+    space = {'alpha': (0.1, 0.5), 'gamma': [0.8, 0.9]}
+    settings = random_search_space(space, 20, seed=3)
+    assert settings == random_search_space(space, 20, seed=3)
+    assert all(0.1 <= s['alpha'] <= 0.5 and s['gamma'] in (0.8, 0.9) for s in settings)
+    assert parse_values('alpha=0.1:0.5') == ('alpha', (0.1, 0.5))
+    assert parse_values('gamma=0.8,0.9') == ('gamma', [0.8, 0.9])
+
+
+def test_results_are_aggregated_over_seeds(tmp_path):
+    results = SweepResults()
+    results.add(make_run({'alpha': 0.1, 'gamma': 0.9}, 0, [100, 50, 50], 0.5))
+    results.add(make_run({'alpha': 0.1, 'gamma': 0.9}, 1, [0, 50, 100 / 3], 1 / 3))
+    results.add(make_run({'alpha': 0.3, 'gamma': 0.9}, 2, [100, 100, 100], 1.0))
+    results.add(make_run({'alpha': 0.3, 'gamma': 0.5}, 3, [0, 0, 0], 0.0))
+    summary = results.get_summary()
+    assert [row['params'] for row in summary] == [{'alpha': 0.3, 'gamma': 0.9}, {'alpha': 0.1, 'gamma': 0.9},
+                                                  {'alpha': 0.3, 'gamma': 0.5}]
+    assert summary[1]['runs'] == 2
+    assert abs(summary[1]['mean'] - 5 / 12) < 1e-12 and abs(summary[1]['std'] - 1 / 12) < 1e-12
+    assert results.get_values('alpha') == [0.1, 0.3]
+    groups = results.group_by('alpha', gamma=0.9)
+    (games, mean, std, num_runs) = groups[0.1]
+    assert games.tolist() == [1, 2, 3] and num_runs == 2
+    assert np.allclose(mean, [50, 50, 125 / 3]) and np.allclose(std, [50, 0, 25 / 3])
+    assert groups[0.3][3] == 1 and np.allclose(groups[0.3][1], 100)
+    assert set(results.group_by('alpha')) == {0.1, 0.3} and results.group_by('alpha')[0.3][3] == 2
+    path = str(tmp_path / 'sweep.json')
+    results.save(path)
+    assert load_sweep_results(path).get_summary() == summary
+
+
+def test_sweep_with_one_worker_is_reproducible():
+    sweep = Sweep('qlearner', 'random', num_workers=1)
+    settings = grid_search_space({'alpha': [0.1, 0.5], 'epsilon': [0.2]})
+    seen = []
+    results = sweep.run(settings, num_games=4, num_seeds=2, seed=7, callback=seen.append)
+    assert seen == results.runs and len(results.runs) == 4
+    assert sorted(run['seed'] for run in results.runs) == [7, 8, 9, 10]
+    for run in results.runs:
+        assert len(run['p1_wins']) == len(run['game_time']) == 4
+    summary = results.get_summary()
+    assert sorted(row['params']['alpha'] for row in summary) == [0.1, 0.5]
+    assert all(row['runs'] == 2 for row in summary)
+    again = sweep.run(settings, num_games=4, num_seeds=2, seed=7)
+    strip = lambda runs: sorted(((run['seed'], run['p1_wins'], run['draws']) for run in runs))
+    assert strip(again.runs) == strip(results.runs)
+    with pytest.raises(ValueError):
+        sweep.run([{'depth': 3}], num_games=1, num_seeds=1)
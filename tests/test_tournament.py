@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from Connect4_Tournament import (Tournament, parse_player, count_results, compute_ratings, logistic,
+                                 bayes_elo_gradient, ELO_SCALE)
+
+
+def match_games(a, b, wins, draws, losses):
+    # the same results with a and b taking turns moving first
+    games = []
+    for (first, second) in ((a, b), (b, a)):
+        (win, loss) = (1.0, 0.0) if first == a else (0.0, 1.0)
+        games += [{'first': first, 'second': second, 'score': win}] * wins
+        games += [{'first': first, 'second': second, 'score': 0.5}] * draws
+        games += [{'first': first, 'second': second, 'score': loss}] * losses
+    return games
+
+
+def test_count_results():
+    games = [{'first': 'a', 'second': 'b', 'score': 1.0}, {'first': 'a', 'second': 'b', 'score': 0.5},
+             {'first': 'b', 'second': 'a', 'score': 0.0}, {'first': 'b', 'second': 'a', 'score': 0.0}]
+    counts = count_results(games, ['a', 'b'])
+    assert counts[:, 0, 1].tolist() == [1, 1, 0]
+    assert counts[:, 1, 0].tolist() == [0, 0, 2]
+    assert counts[:, 0, 0].sum() == counts[:, 1, 1].sum() == 0
+
+
+def test_logistic():
+    assert logistic(0) == 0.5
+    assert abs(logistic(ELO_SCALE) - 10 / 11) < 1e-12
+    assert abs(logistic(-200) + logistic(200) - 1) < 1e-12
+
+
+def test_elo_ratings_of_fixed_results():
+    # three wins out of four is 400 * log10(3) = 191 Elo, a little less with
+    # the prior draws
+    (table, extra) = compute_ratings(match_games('a', 'b', 300, 0, 100), ['b', 'a'], model='elo')
+    assert extra == {}
+    assert [row['name'] for row in table] == ['a', 'b']
+    assert abs(table[0]['rating'] + table[1]['rating']) < 1e-6
+    assert 185 < table[0]['rating'] - table[1]['rating'] < 400 * np.log10(3)
+    assert table[0]['games'] == table[1]['games'] == 800
+    assert (table[0]['score'], table[1]['score']) == (0.75, 0.25)
+    for row in table:
+        assert row['lower'] < row['rating'] < row['upper']
+    # a chain of results gives evenly spaced ratings, the interval of the
+    # player with more games being narrower
+    games = match_games('a', 'b', 30, 0, 10) + match_games('b', 'c', 30, 0, 10)
+    (table, extra) = compute_ratings(games, ['a', 'b', 'c'], model='elo')
+    (a, b, c) = table
+    assert (a['name'], b['name'], c['name']) == ('a', 'b', 'c')
+    assert abs(b['rating']) < 1e-6 and abs(a['rating'] + c['rating']) < 1e-6
+    assert b['upper'] - b['lower'] < a['upper'] - a['lower']
+    assert compute_ratings(games, ['a', 'b', 'c'], model='elo', confidence=0.99)[0][0]['upper'] > a['upper']
+
+
+@pytest.mark.parametrize('draws', [0, 100])
+def test_bayes_elo_ratings_of_fixed_results(draws):
+    games = match_games('a', 'b', 250, draws, 50) + [{'first': 'a', 'second': 'b', 'score': 1.0}] * 50
+    (table, extra) = compute_ratings(games, ['a', 'b'])
+    assert [row['name'] for row in table] == ['a', 'b']
+    assert table[0]['rating'] > 0 > table[1]['rating']
+    assert extra['advantage'] > 0
+    # the draw width stays positive even when no game is drawn
+    assert extra['draw_elo'] > 0
+    assert (extra['draw_elo'] > 100) == (draws > 0)
+    params = np.array([table[0]['rating'], table[1]['rating'], extra['advantage'], extra['draw_elo']])
+    assert np.abs(bayes_elo_gradient(params, count_results(games, ['a', 'b']), 2)).max() < 1e-6
+
+
+def test_tournament_plays_every_pairing_both_ways():
+    players = [parse_player('r1=random'), parse_player('r2=random'), parse_player('q=qlearner:epsilon=0.5')]
+    assert players[2] == {'name': 'q', 'type': 'qlearner', 'epsilon': 0.5}
+    tournament = Tournament(players, num_workers=2, games_per_job=2, seed=1)
+    jobs = tournament.get_jobs(5)
+    assert sum(job[2] for job in jobs) == 15 and max(job[2] for job in jobs) == 2
+    for (a, b) in (('r1', 'r2'), ('r1', 'q'), ('r2', 'q')):
+        assert sum(job[2] for job in jobs if (job[0]['name'], job[1]['name']) == (a, b)) == 3
+        assert sum(job[2] for job in jobs if (job[0]['name'], job[1]['name']) == (b, a)) == 2
+    seen = []
+    (table, extra) = tournament.run(5, seen.append)
+    assert seen == tournament.games and len(seen) == 15
+    assert sorted(row['name'] for row in table) == ['q', 'r1', 'r2']
+    assert sum(row['games'] for row in table) == 30
+    with pytest.raises(ValueError):
+        Tournament([parse_player('random'), parse_player('random')])
@@ -0,0 +1,56 @@
+import pytest
+
+from Connect4_Utilities import Board
+from Connect4_GameLogic import GameLogic
+from Connect4_RLPlayers import ComputerPlayer
+
+
+def play(player, moves, first_type=2):
+    # play the columns in order, the player learning from its own moves
+    board = Board(6, 7, headless=True)
+    game_logic = GameLogic(board)
+    player.start_game(board)
+    piece = first_type
+    states = []
+    for col in moves:
+        actions = board.get_available_actions()
+        if piece == player.get_coin_type():
+            states.append(board.get_state())
+        game_over = board.insert_piece(col, piece, game_logic)
+        if piece == player.get_coin_type():
+            player.learn(board, actions, col, game_over, game_logic)
+        piece = 3 - piece
+    return (board, game_logic, states)
+
+
+@pytest.mark.parametrize('player_type', ['qlearner', 'sarsalearner'])
+def test_lambda_returns_of_a_lost_game(player_type):
+    player = ComputerPlayer(1, player_type, 0.0, 0.5, 0.9, trace_decay=0.5).player
+    # the opponent fills column 3 while the player answers in columns 0, 1, 0
+    (board, game_logic, (s0, s1, s2)) = play(player, [3, 0, 3, 1, 3, 0, 3])
+    assert player.episode and game_logic.get_winner() == 2
+    player.finish_game(board, game_logic)
+    assert player.episode == []
+    # the loss is worth -2, the unvisited values are 1.0
+    ret2 = -2
+    ret1 = 0.9 * (0.5 * 1.0 + 0.5 * ret2)
+    ret0 = 0.9 * (0.5 * 1.0 + 0.5 * ret1)
+    assert player.getQ(s2, 0) == pytest.approx(1.0 + 0.5 * (ret2 - 1.0))
+    assert player.getQ(s1, 1) == pytest.approx(1.0 + 0.5 * (ret1 - 1.0))
+    assert player.getQ(s0, 0) == pytest.approx(1.0 + 0.5 * (ret0 - 1.0))
+    assert player.getQ(s0, 0) == pytest.approx(0.62375)
+    assert len(player.q) == 3
+
+
+def test_start_game_forgets_a_game_left_unfinished():
+    computer = ComputerPlayer(1, 'qlearner', 0.0, 0.5, 0.9, trace_decay=0.5)
+    player = computer.player
+    play(player, [3, 0, 3, 1])
+    assert len(player.episode) == 2
+    computer.start_game(Board(6, 7, headless=True))
+    assert player.episode == []
+    # the player moves first here, so its second move is after two moves
+    (board, game_logic, states) = play(player, [0, 3, 1, 3, 2, 3, 6, 3], first_type=1)
+    assert len(player.episode) == 4
+    player.finish_game(board, game_logic)
+    assert player.episode == [] and len(player.q) == 4
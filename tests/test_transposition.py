@@ -0,0 +1,48 @@
+from Connect4_Utilities import Position, TranspositionTable
+
+
+def test_zobrist_hash_depends_only_on_the_position():
+    first = Position(6, 7)
+    for (col, piece) in ((3, 1), (2, 2), (4, 1), (2, 2)):
+        first.make_move(col, piece)
+    second = Position(6, 7)
+    for (col, piece) in ((4, 1), (2, 2), (3, 1), (2, 2)):
+        second.make_move(col, piece)
+    assert first.get_state() == second.get_state()
+    assert first.zobrist_hash == second.zobrist_hash
+    second.undo_move()
+    assert first.zobrist_hash != second.zobrist_hash
+
+
+def test_lookup_counts_probes_and_hits():
+    table = TranspositionTable(size=16)
+    assert table.lookup(5) is None
+    table.store(5, 3, TranspositionTable.EXACT, 0.5, 2)
+    assert table.lookup(5) == (5, 3, TranspositionTable.EXACT, 0.5, 2, 0)
+    # a different position in the same slot is not a hit
+    assert table.lookup(21) is None
+    assert (table.probes, table.hits) == (3, 1)
+    assert table.get_hit_rate() == 1 / 3
+
+
+def test_deeper_searches_replace_shallower_ones():
+    table = TranspositionTable(size=16)
+    table.store(5, 4, TranspositionTable.EXACT, 1, 0)
+    # a shallower search of another position keeps the deeper entry
+    table.store(21, 2, TranspositionTable.LOWER, 2, 1)
+    assert table.lookup(5)[1] == 4 and table.lookup(21) is None
+    table.store(21, 4, TranspositionTable.UPPER, 3, 1)
+    assert table.lookup(21)[1:5] == (4, TranspositionTable.UPPER, 3, 1) and table.lookup(5) is None
+    # the same position is always updated, even by a shallower search
+    table.store(21, 1, TranspositionTable.EXACT, 4, 6)
+    assert table.lookup(21)[1:5] == (1, TranspositionTable.EXACT, 4, 6)
+
+
+def test_entries_of_older_searches_are_replaced_first():
+    table = TranspositionTable(size=16)
+    table.store(5, 8, TranspositionTable.EXACT, 1, 0)
+    table.new_search()
+    table.store(21, 1, TranspositionTable.EXACT, 2, 3)
+    assert table.lookup(21) == (21, 1, TranspositionTable.EXACT, 2, 3, 1)
+    table.clear()
+    assert table.lookup(21) is None and (table.probes, table.hits) == (1, 0)